@@ -0,0 +1,63 @@
+"""Compara encolar una playlist track por track vs. en una sola operación.
+
+Uso:
+    python -m benchmarks.bench_enqueue
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import wavelink
+
+from cogs.music_cog import Music
+from utils.track_codec import TrackRow, unpack_track
+
+SIZES = (1_000, 10_000)
+ROUNDS = 5
+
+
+class _BenchPlayer:
+    def __init__(self) -> None:
+        self.queue = wavelink.Queue()
+
+
+def _make_tracks(count: int) -> list[wavelink.Playable]:
+    return [
+        unpack_track(
+            TrackRow(f"QAAA{i:08d}", f"id{i:09d}", f"Track {i}", "Artist", 180_000, None, "youtube")
+        )
+        for i in range(count)
+    ]
+
+
+async def _per_track(tracks: list[wavelink.Playable]) -> float:
+    player = _BenchPlayer()
+    start = time.perf_counter()
+    for track in tracks:
+        await player.queue.put_wait(track)
+    return time.perf_counter() - start
+
+
+async def _bulk(tracks: list[wavelink.Playable], shuffle: bool) -> float:
+    player = _BenchPlayer()
+    start = time.perf_counter()
+    await Music._enqueue_bulk(player, tracks, shuffle=shuffle)
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    print(f"{'tracks':>8} {'per-track':>12} {'bulk':>12} {'bulk+shuffle':>14} {'speedup':>8}")
+    for size in SIZES:
+        tracks = _make_tracks(size)
+        per_track = min([await _per_track(tracks) for _ in range(ROUNDS)])
+        bulk = min([await _bulk(tracks, shuffle=False) for _ in range(ROUNDS)])
+        bulk_shuffled = min([await _bulk(tracks, shuffle=True) for _ in range(ROUNDS)])
+        print(
+            f"{size:>8} {per_track * 1000:>10.2f}ms {bulk * 1000:>10.2f}ms "
+            f"{bulk_shuffled * 1000:>12.2f}ms {per_track / bulk:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
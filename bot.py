@@ -8,6 +8,9 @@ from discord.ext import commands
 from dotenv import load_dotenv
 import wavelink
 
+from utils.lavalink_nodes import NodeBalancer, NodeConfig, parse_node_configs
+from utils.lavalink_sessions import LavalinkSessionStore
+from utils.lavalink_supervisor import LavalinkSupervisor
 from utils.ui import build_error_embed, MusicControlView
 
 # Load environment variables from the .env file
@@ -34,6 +37,11 @@ def _parse_guild_ids(raw: str | None) -> list[int]:
 
 
 GUILD_IDS = _parse_guild_ids(os.getenv("GUILD_IDS"))
+DATA_DIR = os.getenv("DATA_DIR", "data")
+# Segundos que Lavalink mantiene viva la sesión (y el audio) tras perder al bot; 0 lo desactiva.
+LAVALINK_RESUME_TIMEOUT = int(os.getenv("LAVALINK_RESUME_TIMEOUT", "60"))
+# Tope (segundos) de la espera entre reintentos de conexión a un nodo de Lavalink.
+LAVALINK_RECONNECT_MAX_DELAY = float(os.getenv("LAVALINK_RECONNECT_MAX_DELAY", "60"))
 
 # Configure logging
 logging.basicConfig(
@@ -46,26 +54,84 @@ logger = logging.getLogger("ssj-bot")
 # Set intents to receive message content and member events
 intents = discord.Intents.all()
 
+def _log_lavalink_task_error(task: asyncio.Task) -> None:
+    """Registra el error de la conexión a Lavalink en vez de perderlo con la tarea."""
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error("No se pudo iniciar la conexión a Lavalink", exc_info=error)
+
+
 class SSJBot(commands.Bot):
+    # Reparte los players nuevos entre los nodos de Lavalink según su carga.
+    lavalink_nodes: NodeBalancer | None = None
+    lavalink_sessions: LavalinkSessionStore | None = None
+    # Reconecta los nodos caídos; expone el estado y el ETA del próximo reintento.
+    lavalink_supervisor: LavalinkSupervisor | None = None
+
+    _lavalink_task: asyncio.Task | None = None
+
     async def setup_hook(self):
+        # Una config de nodos inválida corta el arranque acá, no dentro de una tarea suelta.
+        configs = parse_node_configs(
+            os.getenv("LAVALINK_URI", "http://lavalink:2333"),
+            os.getenv("LAVALINK_PASSWORD", "youshallnotpass"),
+        )
         await self.load_extension("cogs.music_cog")
         await self.load_extension("cogs.reminders_cog")
         self.add_view(MusicControlView(bot=self))
 
         # Conectar a Lavalink en segundo plano
-        asyncio.create_task(self._connect_lavalink())
-
-    async def _connect_lavalink(self):
-        """Conectar nodo Lavalink para reproducción de música."""
-        lavalink_uri = os.getenv("LAVALINK_URI", "http://lavalink:2333")
-        lavalink_password = os.getenv("LAVALINK_PASSWORD", "youshallnotpass")
-        node = wavelink.Node(uri=lavalink_uri, password=lavalink_password)
+        self._lavalink_task = asyncio.create_task(self._connect_lavalink(configs))
+        self._lavalink_task.add_done_callback(_log_lavalink_task_error)
+
+    async def _connect_lavalink(self, configs: list[NodeConfig]):
+        """Conectar los nodos Lavalink para reproducción de música.
+
+        ``LAVALINK_URI`` y ``LAVALINK_PASSWORD`` aceptan listas separadas por
+        comas; cada URI es un nodo más en el pool. Cada nodo hace un solo
+        intento por conexión (``retries=0``): los reintentos los agenda
+        ``LavalinkSupervisor`` con backoff exponencial, así que un Lavalink
+        que tarda en arrancar no deja la música caída hasta reiniciar el bot.
+        """
+        nodes = [
+            wavelink.Node(
+                identifier=c.identifier,
+                uri=c.uri,
+                password=c.password,
+                resume_timeout=LAVALINK_RESUME_TIMEOUT,
+                retries=0,
+            )
+            for c in configs
+        ]
+        if LAVALINK_RESUME_TIMEOUT > 0:
+            self.lavalink_sessions = LavalinkSessionStore(os.path.join(DATA_DIR, "ssj-bot.sqlite3"))
+            try:
+                saved = await self.lavalink_sessions.load()
+            except Exception as e:
+                logger.warning("No se pudieron leer las sesiones de Lavalink guardadas: %s", e)
+                saved = {}
+            for node in nodes:
+                # Wavelink manda este ID en el header Session-Id y Lavalink retoma la sesión.
+                node._session_id = saved.get(node.identifier)
+        # El supervisor repone los players de un nodo caído y recién ahí avisa al balanceador.
+        self.lavalink_nodes = NodeBalancer(nodes, client=self, watch_connections=False)
+        self.lavalink_supervisor = LavalinkSupervisor(
+            self, nodes, cap=LAVALINK_RECONNECT_MAX_DELAY, on_lost=self.lavalink_nodes.node_lost
+        )
+        self.lavalink_supervisor.start()
+        self.lavalink_nodes.start()
+        logger.info("Wavelink: conectando a %d nodo(s) de Lavalink", len(nodes))
+
+    async def on_wavelink_node_ready(self, payload: wavelink.NodeReadyEventPayload):
+        """Guarda el session ID para poder retomarlo tras un reinicio del bot."""
+        if self.lavalink_sessions is None:
+            return
         try:
-            await wavelink.Pool.connect(nodes=[node], client=self, cache_capacity=100)
-            logger.info("Wavelink: conectado a Lavalink exitosamente")
+            await self.lavalink_sessions.save(payload.node.identifier, payload.session_id)
         except Exception as e:
-            logger.error(f"Wavelink: no se pudo conectar a Lavalink: {e}")
-            logger.warning("Los comandos de música no estarán disponibles hasta que Lavalink esté activo")
+            logger.warning("No se pudo guardar la sesión de Lavalink: %s", e)
 
 
 # Initialize the bot with a command prefix and intents
@@ -2,12 +2,15 @@
 from __future__ import annotations
 
 import asyncio
+import difflib
+import functools
 import logging
 import math
 import os
 import random
+import time
 from contextlib import suppress
-from typing import Optional
+from typing import Callable, Iterable, NamedTuple, Optional
 
 import discord
 from discord import app_commands
@@ -15,13 +18,20 @@ from discord.app_commands import Choice
 import wavelink
 from discord.ext import commands
 
+from utils.compact_queue import CompactQueue, QueueListing
+from utils.lavalink_supervisor import ConnectionState
+from utils.music_state import GuildMusicState, GuildStateRegistry
+from utils.outbound import OutboundScheduler
+from utils.playlist_snapshots import PlaylistSnapshotStore
+from utils.queue_store import QueueStateWriter, QueueStore, SavedQueue
+from utils.search_cache import SearchCache, SingleFlight, TTLCache
+from utils.track_codec import TrackRow, unpack_track
 from utils.ui import (
     QueuePaginationView,
     build_added_to_queue_embed,
     build_error_embed,
     build_info_embed,
     build_now_playing_embed,
-    build_queue_embed,
     build_search_results_embed,
     build_warning_embed,
     make_music_control_view,
@@ -29,6 +39,48 @@ from utils.ui import (
 
 logger = logging.getLogger(__name__)
 
+# Orden de prioridad de búsqueda para queries que no son URL.
+SEARCH_SOURCES = (
+    wavelink.TrackSource.YouTubeMusic,
+    wavelink.TrackSource.YouTube,
+    wavelink.TrackSource.SoundCloud,
+)
+# Segundos que se espera a una fuente antes de lanzar también la siguiente.
+SEARCH_HEDGE_DELAY = float(os.getenv("SEARCH_HEDGE_DELAY", "0.25"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "600"))
+SEARCH_CACHE_NEGATIVE_TTL = float(os.getenv("SEARCH_CACHE_NEGATIVE_TTL", "60"))
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+DBZ_PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLy0A50xAkMqRZLl2JDYG9R1vdBaVnJhM"
+ANIME_PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLHPZvFJe7-ufMte_SHOhl1qncTTzjpkO7"
+# Edad (segundos) a partir de la cual un snapshot se sirve igual pero se refresca en segundo plano.
+PLAYLIST_SNAPSHOT_MAX_AGE = float(os.getenv("PLAYLIST_SNAPSHOT_MAX_AGE", str(6 * 3600)))
+# Ventana (segundos) en la que se pliegan los pedidos de re-publicar el now-playing.
+NOW_PLAYING_DEBOUNCE = float(os.getenv("NOW_PLAYING_DEBOUNCE", "0.5"))
+# Tracks que se encolan por vuelta del event loop al cargar una playlist en segundo plano.
+PLAYLIST_LOAD_CHUNK = 250
+# Segundos que un aviso de "canción saltada" espera en cola para fundirse con los siguientes.
+SKIP_NOTICE_HOLD = 1.5
+# Segundos que se juntan cambios de cola/reproducción antes de guardarlos en SQLite.
+QUEUE_SAVE_DELAY = float(os.getenv("QUEUE_SAVE_DELAY", "5"))
+# Espera máxima, al arrancar, a que cada nodo retome sus players antes de retomar las colas guardadas.
+RESTORE_NODES_WAIT = 30.0
+RESTORE_NODES_POLL = 0.5
+# Segundos antes del final del track actual en que se verifica y prepara el siguiente.
+PREFETCH_LEAD = float(os.getenv("PREFETCH_LEAD", "10"))
+# Espera máxima del prefetch hasta el primer playerUpdate del track (Lavalink los manda cada 5s).
+PREFETCH_UPDATE_WAIT = 5.0
+# Entradas no reproducibles seguidas que se descartan como mucho antes de dejar de buscar.
+MAX_UNAVAILABLE_IN_A_ROW = 5
+# Segundos que se recuerda un track no disponible (y su reemplazo, si se encontró).
+FAILED_TRACK_TTL = float(os.getenv("FAILED_TRACK_TTL", "1800"))
+FAILED_TRACK_CACHE_SIZE = 512
+# Parecido mínimo (0-1) entre títulos para aceptar un track de otra fuente como reemplazo.
+ALTERNATE_MIN_SIMILARITY = 0.6
+# Diferencia de duración tolerada para un reemplazo: la mayor entre estos segundos y el 10 %.
+ALTERNATE_MAX_LENGTH_DELTA = 15
+
 
 def _track_to_song(track: wavelink.Playable) -> dict:
     """Convierte un wavelink.Playable al dict que esperan los embeds de utils/ui.py."""
@@ -43,6 +95,22 @@ def _track_to_song(track: wavelink.Playable) -> dict:
     }
 
 
+def _song_key(channel: discord.abc.Messageable, song: dict) -> tuple:
+    """Identidad de un render de now-playing, para no repetir uno idéntico."""
+    return getattr(channel, "id", None), song.get("url"), song.get("title")
+
+
+def _as_playable(item: wavelink.Playable | TrackRow) -> wavelink.Playable:
+    return item if isinstance(item, wavelink.Playable) else unpack_track(item)
+
+
+def _queue_encoded(queue: wavelink.Queue) -> list[str]:
+    """``encoded`` de cada track en cola, leyendo la columna si la cola es compacta."""
+    if isinstance(queue, CompactQueue):
+        return list(queue.columns.encoded)
+    return [track.encoded for track in queue]
+
+
 def _is_track_unavailable(exception: dict | str | None) -> bool:
     """Detecta si la excepción de Wavelink indica que la canción no está disponible."""
     if not exception:
@@ -57,6 +125,73 @@ def _is_track_unavailable(exception: dict | str | None) -> bool:
     return any(p in msg_lower for p in patterns)
 
 
+def _without_previews(
+    tracks: list[wavelink.Playable] | wavelink.Playlist,
+) -> list[wavelink.Playable] | wavelink.Playlist | None:
+    """Descarta los previews de 30s de SoundCloud."""
+    if isinstance(tracks, wavelink.Playlist):
+        tracks.tracks = [t for t in tracks.tracks if "/preview/" not in (t.uri or "")]
+        return tracks if tracks.tracks else None
+    full_tracks = [t for t in tracks if "/preview/" not in (t.uri or "")]
+    return full_tracks if full_tracks else None
+
+
+def _normalize_title(text: str | None) -> str:
+    return " ".join((text or "").casefold().split())
+
+
+def _alternate_query(track: wavelink.Playable) -> str:
+    """Búsqueda de texto para encontrar el mismo tema en otra fuente."""
+    author = (track.author or "").removesuffix(" - Topic")
+    return f"{author} {track.title}".strip()
+
+
+def _match_score(track: wavelink.Playable, candidate: wavelink.Playable) -> float:
+    """Qué tanto se parece ``candidate`` a ``track`` (0-1); 0 si la duración no cuadra."""
+    if track.length and candidate.length:
+        tolerance = max(ALTERNATE_MAX_LENGTH_DELTA * 1000, track.length * 0.1)
+        if abs(track.length - candidate.length) > tolerance:
+            return 0.0
+    title = difflib.SequenceMatcher(
+        None, _normalize_title(track.title), _normalize_title(candidate.title)
+    ).ratio()
+    # En SoundCloud el título suele traer el artista adelante ("Artista - Tema").
+    with_author = difflib.SequenceMatcher(
+        None, _normalize_title(_alternate_query(track)), _normalize_title(candidate.title)
+    ).ratio()
+    return max(title, with_author)
+
+
+def _sources_after(track: wavelink.Playable) -> tuple[wavelink.TrackSource, ...]:
+    """Fuentes de ``SEARCH_SOURCES`` posteriores a la del track que falló.
+
+    Lavalink reporta como "youtube" tanto lo encontrado en YouTube Music como
+    en YouTube, así que un track de YouTube sigue por SoundCloud. Si la fuente
+    no está en la cadena se prueba la cadena completa.
+    """
+    names = {
+        wavelink.TrackSource.YouTubeMusic: "youtubemusic",
+        wavelink.TrackSource.YouTube: "youtube",
+        wavelink.TrackSource.SoundCloud: "soundcloud",
+    }
+    for index in range(len(SEARCH_SOURCES) - 1, -1, -1):
+        if names.get(SEARCH_SOURCES[index]) == track.source:
+            return SEARCH_SOURCES[index + 1:]
+    return SEARCH_SOURCES
+
+
+async def _search_source(
+    query: str, source: wavelink.TrackSource
+) -> list[wavelink.Playable] | wavelink.Playlist | None:
+    """Busca en una sola fuente. Devuelve None si no hay resultados útiles."""
+    tracks: wavelink.Search = await wavelink.Playable.search(query, source=source)
+    if not tracks:
+        return None
+    if source == wavelink.TrackSource.SoundCloud:
+        return _without_previews(tracks)
+    return tracks
+
+
 class _PlayerStateAdapter:
     """Minimal adapter to satisfy MusicControlView's _state() API."""
     def __init__(self, player: wavelink.Player | None):
@@ -93,8 +228,33 @@ class _QueueAdapter:
             self._player.queue.clear()
 
 
+class _PlaybackSnapshot(NamedTuple):
+    """Lo necesario para retomar la reproducción de un player en otro nodo."""
+
+    track: wavelink.Playable | None
+    position: int
+    volume: int
+    paused: bool
+
+
 class _FixedPlayer(wavelink.Player):
-    """Wavelink 3.4.1 no envía channelId a Lavalink 4.x. Este parche lo agrega."""
+    """Wavelink 3.4.1 no envía channelId a Lavalink 4.x. Este parche lo agrega.
+
+    También ubica el player en el nodo menos cargado según el balanceador del
+    bot (``bot.lavalink_nodes``) en vez de contar solo players por nodo.
+    """
+
+    def __init__(self, client=discord.utils.MISSING, channel=discord.utils.MISSING, *, nodes=None) -> None:
+        if nodes is None:
+            balancer = getattr(client, "lavalink_nodes", None)
+            best = balancer.best_node() if balancer is not None else None
+            if best is not None:
+                nodes = [best]
+        super().__init__(client, channel, nodes=nodes)
+        # Cola por columnas: los Playable se arman recién al sacar cada track.
+        self.queue = CompactQueue()
+        # Estado congelado al perder el nodo, para retomarlo al migrar.
+        self.pending_snapshot: _PlaybackSnapshot | None = None
 
     async def on_voice_state_update(self, data, /) -> None:  # type: ignore[override]
         channel_id = data["channel_id"]
@@ -106,8 +266,7 @@ class _FixedPlayer(wavelink.Player):
         self._voice_state["voice"]["channel_id"] = channel_id  # guardamos para el PATCH
         self.channel = self.client.get_channel(int(channel_id))  # type: ignore
 
-    async def _dispatch_voice_update(self) -> None:
-        assert self.guild is not None
+    def _voice_payload(self) -> dict | None:
         data = self._voice_state["voice"]
         session_id = data.get("session_id")
         token = data.get("token")
@@ -115,7 +274,7 @@ class _FixedPlayer(wavelink.Player):
         channel_id = data.get("channel_id")
 
         if not session_id or not token or not endpoint:
-            return
+            return None
 
         voice_payload: dict = {
             "sessionId": session_id,
@@ -124,6 +283,13 @@ class _FixedPlayer(wavelink.Player):
         }
         if channel_id:
             voice_payload["channelId"] = str(channel_id)
+        return voice_payload
+
+    async def _dispatch_voice_update(self) -> None:
+        assert self.guild is not None
+        voice_payload = self._voice_payload()
+        if voice_payload is None:
+            return
 
         request = {"voice": voice_payload}
         try:
@@ -134,16 +300,75 @@ class _FixedPlayer(wavelink.Player):
             return
         self._connection_event.set()
 
+    def snapshot(self) -> _PlaybackSnapshot:
+        return _PlaybackSnapshot(self.current, self.position, self.volume, self.paused)
+
+    async def migrate_to(self, node: wavelink.Node, *, snapshot: _PlaybackSnapshot | None = None) -> None:
+        """Mueve el player a ``node`` sin desconectarse de Discord.
+
+        Reenvía el estado de voz al nodo nuevo y retoma el track actual en la
+        misma posición, con el mismo volumen y estado de pausa. La cola vive
+        en el propio player, así que viaja con él. Si el nodo viejo sigue
+        conectado (drenado) se borra allí el player para no duplicar audio.
+        """
+        assert self.guild is not None
+        snap = snapshot or self.snapshot()
+        guild_id = self.guild.id
+        old = self._node
+        old._players.pop(guild_id, None)
+        if old is not node and old.status is wavelink.NodeStatus.CONNECTED:
+            with suppress(Exception):
+                await old._destroy_player(guild_id)
+
+        self._node = node
+        node._players[guild_id] = self
+        voice_payload = self._voice_payload()
+        if voice_payload is not None:
+            await node._update_player(guild_id, data={"voice": voice_payload})
+        if snap.track is not None:
+            await self.play(
+                snap.track,
+                start=snap.position,
+                volume=snap.volume,
+                paused=snap.paused,
+                add_history=False,
+            )
+        else:
+            await self.set_volume(snap.volume)
+
 
 class Music(commands.Cog):
     """Cog de música usando Wavelink + Lavalink."""
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
-        self._text_channels: dict[int, discord.TextChannel] = {}
-        self._now_playing_messages: dict[int, discord.Message] = {}
-        self._now_playing_locks: dict[int, asyncio.Lock] = {}
-        self._np_just_published: set[int] = set()
+        # Todo el estado por guild (canal de texto, NP, tareas) vive en un solo registro.
+        self._guilds = GuildStateRegistry(is_active=self._has_player)
+        self._outbound = OutboundScheduler.for_client(bot)
+        self._search_cache = SearchCache(
+            maxsize=SEARCH_CACHE_SIZE,
+            ttl=SEARCH_CACHE_TTL,
+            negative_ttl=SEARCH_CACHE_NEGATIVE_TTL,
+        )
+        self._search_flights = SingleFlight()
+        self._snapshots = PlaylistSnapshotStore(os.path.join(DATA_DIR, "ssj-bot.sqlite3"))
+        self._snapshot_refreshes: dict[str, asyncio.Task] = {}
+        # Cola y reproducción por guild, para retomarlas tras reiniciar el bot.
+        self._queue_store = QueueStore(os.path.join(DATA_DIR, "ssj-bot.sqlite3"))
+        self._queue_writer = QueueStateWriter(self._queue_store, self._saved_queue, delay=QUEUE_SAVE_DELAY)
+        self._queues_restored = False
+        # Nodos cuyo node_ready ya se procesó (players retomados o repuestos).
+        self._ready_nodes: set[str] = set()
+        # identifier de tracks que fallaron -> reemplazo encontrado (o None si no hubo).
+        self._failed_tracks = TTLCache(FAILED_TRACK_CACHE_SIZE, FAILED_TRACK_TTL)
+
+    async def cog_load(self) -> None:
+        self._guilds.start()
+
+    async def cog_unload(self) -> None:
+        self._guilds.close()
+        # discord.py descarga los cogs antes de cortar la voz: se guarda el estado final.
+        await self._queue_writer.close()
 
     # ── Compatibility shims for MusicControlView ──────────────────────────
 
@@ -156,52 +381,136 @@ class Music(commands.Cog):
         return _PlayerStateAdapter(player)
 
     def _cleanup_state(self, guild_id: int) -> None:
-        """Compatibility shim for MusicControlView."""
-        self._text_channels.pop(guild_id, None)
-        getattr(self, "_now_playing_messages", {}).pop(guild_id, None)
-        getattr(self, "_now_playing_locks", {}).pop(guild_id, None)
-        getattr(self, "_np_just_published", set()).discard(guild_id)
+        """Descarta todo el estado de la guild (tareas incluidas). Único camino de limpieza."""
+        self._guilds.discard(guild_id)
+        self._mark_queue_dirty(guild_id)
+        outbound = getattr(self, "_outbound", None)
+        if outbound is not None:
+            outbound.discard(("now-playing", guild_id))
+
+    def _cancel_playlist_load(self, guild_id: int) -> None:
+        state = self._guilds.get(guild_id)
+        if state is not None and state.loading_task is not None:
+            state.loading_task.cancel()
+            state.loading_task = None
 
     def update_activity(self, ctx_or_guild) -> None:
-        """Compatibility shim for MusicControlView. No-op in wavelink."""
-        pass
+        """Marca actividad en la guild para que no se desaloje su estado."""
+        guild = ctx_or_guild.guild if hasattr(ctx_or_guild, "guild") else ctx_or_guild
+        if guild is not None:
+            self._guilds.touch(guild.id)
+            self._mark_queue_dirty(guild.id)
 
     # ── Internal helpers ────────────────────────────────────────────────────
 
+    def _has_player(self, guild_id: int) -> bool:
+        return any(
+            getattr(vc.guild, "id", None) == guild_id for vc in self.bot.voice_clients
+        )
+
     def _get_text_channel(self, guild_id: int) -> discord.TextChannel | None:
-        return self._text_channels.get(guild_id)
+        state = self._guilds.get(guild_id)
+        if state is None or state.text_channel_id is None:
+            return None
+        return self.bot.get_channel(state.text_channel_id)
 
     def _set_text_channel(self, ctx: commands.Context) -> None:
         if ctx.guild:
-            self._text_channels[ctx.guild.id] = ctx.channel
+            self._guilds.touch(ctx.guild.id).text_channel_id = ctx.channel.id
 
     def _get_np_lock(self, guild_id: int) -> asyncio.Lock:
-        if guild_id not in self._now_playing_locks:
-            self._now_playing_locks[guild_id] = asyncio.Lock()
-        return self._now_playing_locks[guild_id]
+        state = self._guilds.ensure(guild_id)
+        if state.np_lock is None:
+            state.np_lock = asyncio.Lock()
+        return state.np_lock
 
     async def _publish_now_playing(self, channel: discord.TextChannel, song: dict) -> None:
-        """Publica o actualiza el mensaje de now-playing en el canal, asegurando solo uno visible."""
+        """Publica o actualiza el mensaje de now-playing en el canal, asegurando solo uno visible.
+
+        Si el NP anterior sigue siendo el último mensaje del canal se edita en
+        el lugar (una sola llamada REST). Solo si otros mensajes lo empujaron
+        hacia arriba se borra y se reenvía al fondo.
+
+        Pasa por la cola de salida del canal: si llega un render más nuevo
+        mientras este espera turno, el viejo se descarta sin tocar Discord.
+        Cada llamada del render toma su propio token del canal.
+        """
+        guild_id = channel.guild.id
+        await self._outbound.run(
+            channel,
+            lambda: self._render_now_playing(channel, song),
+            replace_key=("now-playing", guild_id),
+        )
+
+    async def _render_now_playing(self, channel: discord.TextChannel, song: dict) -> None:
         guild_id = channel.guild.id
         lock = self._get_np_lock(guild_id)
         async with lock:
-            old_msg = self._now_playing_messages.get(guild_id)
-            if old_msg is not None:
+            embed = build_now_playing_embed(song)
+            view = make_music_control_view(self.bot, music_cog=self)
+            state = self._guilds.ensure(guild_id)
+            old_id = state.now_playing_message_id
+
+            if old_id is not None and channel.last_message_id == old_id:
+                try:
+                    await self._outbound.throttle(channel)
+                    await channel.get_partial_message(old_id).edit(embed=embed, view=view)
+                    state.np_rendered = _song_key(channel, song)
+                    return
+                except discord.NotFound:
+                    state.now_playing_message_id = None
+                    old_id = None
+                except discord.HTTPException:
+                    logger.warning("No se pudo editar el NP para guild %s; se reenvía", guild_id)
+
+            if old_id is not None:
                 try:
-                    await old_msg.delete()
+                    await self._outbound.throttle(channel)
+                    await channel.get_partial_message(old_id).delete()
                 except discord.NotFound:
                     pass
                 except discord.HTTPException:
                     logger.warning("No se pudo borrar el NP anterior para guild %s; se omite envío", guild_id)
-                    self._now_playing_messages.pop(guild_id, None)
+                    state.now_playing_message_id = None
                     return
-            embed = build_now_playing_embed(song)
-            view = make_music_control_view(self.bot, music_cog=self)
+            await self._outbound.throttle(channel)
             new_msg = await channel.send(embed=embed, view=view)
-            self._now_playing_messages[guild_id] = new_msg
-            # NOTE: NO agregamos guild_id a _np_just_published aquí
-            # porque este método también es llamado por on_wavelink_track_start
-            # y por cog_after_invoke. Cada caller gestiona el flag según corresponda.
+            state.now_playing_message_id = new_msg.id
+            state.np_rendered = _song_key(channel, song)
+
+    def _request_now_playing(self, channel: discord.abc.Messageable, player: wavelink.Player) -> None:
+        """Pide re-publicar el now-playing de la guild con debounce.
+
+        Los pedidos que llegan dentro de la ventana (track start, after_invoke,
+        /play...) se pliegan en un solo render del estado más reciente del player.
+        """
+        guild_id = channel.guild.id
+        state = self._guilds.touch(guild_id)
+        state.np_request = (channel, player)
+        if state.np_task is None or state.np_task.done():
+            state.np_task = asyncio.create_task(
+                self._run_now_playing_publisher(state), name=f"now-playing:{guild_id}"
+            )
+
+    async def _run_now_playing_publisher(self, state: GuildMusicState) -> None:
+        guild_id = state.guild_id
+        while state.np_request is not None:
+            await asyncio.sleep(NOW_PLAYING_DEBOUNCE)
+            request, state.np_request = state.np_request, None
+            if request is None:
+                return
+            channel, player = request
+            if player.current is None:
+                continue
+            song = _track_to_song(player.current)
+            unchanged = state.np_rendered == _song_key(channel, song)
+            at_bottom = state.now_playing_message_id == getattr(channel, "last_message_id", None)
+            if unchanged and at_bottom:
+                continue
+            try:
+                await self._publish_now_playing(channel, song)
+            except Exception:
+                logger.exception("No se pudo publicar el now-playing para guild %s", guild_id)
 
     async def _respond(
         self,
@@ -229,6 +538,30 @@ class Music(commands.Cog):
 
         return await interaction.followup.send(embed=embed, view=view, ephemeral=ephemeral, wait=True)
 
+    @staticmethod
+    async def _enqueue_bulk(
+        player: wavelink.Player,
+        tracks: Iterable[wavelink.Playable | TrackRow],
+        *,
+        shuffle: bool = False,
+    ) -> int:
+        """Encola una lista de tracks en una sola operación.
+
+        ``Queue.put_wait`` con una lista extiende la cola de una vez y despierta
+        a los waiters una sola vez, en vez de un await por track. Una
+        ``CompactQueue`` recibe las filas de un snapshot tal cual; a otras
+        colas se les pasan ``Playable``.
+        """
+        track_list = list(tracks)
+        if shuffle:
+            random.shuffle(track_list)
+        if not track_list:
+            return 0
+        if not isinstance(player.queue, CompactQueue):
+            track_list = [_as_playable(item) for item in track_list]
+        await player.queue.put_wait(track_list)
+        return len(track_list)
+
     @staticmethod
     def _is_lavalink_available() -> bool:
         try:
@@ -237,6 +570,16 @@ class Music(commands.Cog):
         except Exception:
             return False
 
+    def _lavalink_unavailable_embed(self) -> discord.Embed:
+        """Error para comandos de música sin Lavalink, con el ETA del próximo reintento si lo hay."""
+        supervisor = getattr(self.bot, "lavalink_supervisor", None)
+        eta = supervisor.retry_eta() if supervisor is not None else None
+        if eta is None:
+            return build_error_embed("El sistema de música no está disponible ahora.")
+        return build_error_embed(
+            f"El sistema de música se está reconectando; próximo intento en ~{math.ceil(eta)}s."
+        )
+
     async def _get_player(self, ctx: commands.Context) -> wavelink.Player | None:
         return ctx.voice_client  # type: ignore
 
@@ -267,23 +610,142 @@ class Music(commands.Cog):
         if ctx.guild is None:
             return
 
-        # Issue 2: skip ya gatilla on_wavelink_track_start, no republicar el track viejo
-        if ctx.command and ctx.command.name == "skip":
-            self._np_just_published.discard(ctx.guild.id)  # limpiar flag stale
+        self._mark_queue_dirty(ctx.guild.id)
+        player: wavelink.Player | None = ctx.voice_client  # type: ignore
+        if player is None or player.current is None:
             return
+        self._set_text_channel(ctx)  # sync active channel
+        self._request_now_playing(ctx.channel, player)
+
+    # ── Persistencia de colas ──────────────────────────────────────────────
+
+    def _mark_queue_dirty(self, guild_id: int, *, queue: bool = True) -> None:
+        writer = getattr(self, "_queue_writer", None)
+        if writer is not None:
+            writer.mark_dirty(guild_id, queue=queue)
+
+    def _saved_queue(self, guild_id: int, with_queue: bool = True) -> SavedQueue | None:
+        """Estado a guardar de la guild; None si ya no hay nada que retomar.
+
+        Sin ``with_queue`` la cola no se lee (``queue=None``): el store deja la guardada.
+        """
+        guild = self.bot.get_guild(guild_id)
+        player: wavelink.Player | None = guild.voice_client if guild is not None else None  # type: ignore
+        if player is None or (player.current is None and player.queue.is_empty):
+            return None
+        state = self._guilds.get(guild_id)
+        return SavedQueue(
+            guild_id=guild_id,
+            voice_channel_id=player.channel.id if player.channel is not None else None,
+            text_channel_id=state.text_channel_id if state is not None else None,
+            current=player.current.encoded if player.current is not None else None,
+            position=int(player.position),
+            volume=player.volume,
+            paused=player.paused,
+            loop_mode=player.queue.mode.value,
+            queue=_queue_encoded(player.queue) if with_queue else None,
+        )
 
-        # Issue 1: si el comando ya publicó (play path inmediato, nowplaying), no duplicar
-        if ctx.guild.id in self._np_just_published:
-            self._np_just_published.discard(ctx.guild.id)
+    @staticmethod
+    async def _decode_tracks(node: wavelink.Node, encoded: list[str]) -> list[wavelink.Playable]:
+        """Reconstruye tracks desde sus ``encoded`` con un solo ``POST /v4/decodetracks``."""
+        if not encoded:
+            return []
+        data = await node.send("POST", path="v4/decodetracks", data=encoded)
+        return [wavelink.Playable(item) for item in data]
+
+    async def _restore_saved_queues(self) -> None:
+        """Retoma las colas guardadas antes del último reinicio (una vez por proceso)."""
+        if self._queues_restored:
+            return
+        self._queues_restored = True
+        await self.bot.wait_until_ready()
+        await self._wait_for_nodes()
+        try:
+            saved = await self._queue_store.load_all()
+        except Exception:
+            logger.exception("No se pudieron leer las colas guardadas")
             return
 
-        player: wavelink.Player | None = ctx.voice_client  # type: ignore
-        if player is None or player.current is None:
+        stale: list[int] = []
+        for entry in saved:
+            try:
+                restored = await self._restore_queue(entry)
+            except Exception:
+                logger.exception("No se pudo retomar la cola de guild %s", entry.guild_id)
+                restored = False
+            if not restored:
+                stale.append(entry.guild_id)
+        if stale:
+            try:
+                await self._queue_store.write(deleted=stale)
+            except Exception:
+                logger.exception("No se pudieron borrar las colas que no se retomaron")
+
+    async def _wait_for_nodes(self) -> None:
+        """Espera a que cada nodo configurado retome sus players o falle al conectar.
+
+        Si no, una guild cuyo player sigue vivo en un nodo que todavía está
+        retomando su sesión se volvería a conectar en otro nodo, y el player
+        remoto quedaría huérfano. ``RESTORE_NODES_WAIT`` acota la espera por
+        si un nodo queda colgado conectando.
+        """
+        supervisor = getattr(self.bot, "lavalink_supervisor", None)
+        if supervisor is None:
             return
-        channel = ctx.channel
-        self._text_channels[ctx.guild.id] = channel  # sync active channel
-        song = _track_to_song(player.current)
-        await self._publish_now_playing(channel, song)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + RESTORE_NODES_WAIT
+        while True:
+            pending = [
+                identifier
+                for identifier, state in supervisor.states.items()
+                if identifier not in self._ready_nodes
+                and state in (ConnectionState.CONNECTING, ConnectionState.CONNECTED)
+            ]
+            if not pending:
+                return
+            if loop.time() >= deadline:
+                logger.warning("Se retoman las colas sin esperar a los nodos %s", ", ".join(pending))
+                return
+            await asyncio.sleep(RESTORE_NODES_POLL)
+
+    async def _restore_queue(self, entry: SavedQueue) -> bool:
+        """Retoma la cola de una guild. Devuelve False si ya no hay dónde retomarla.
+
+        Si el player sobrevivió (sesión de Lavalink retomada) solo le faltan la
+        cola y el canal de texto. Si no, se vuelve a entrar al canal de voz,
+        siempre que quede alguien escuchando, y se retoma el track en la
+        posición guardada.
+        """
+        guild = self.bot.get_guild(entry.guild_id)
+        if guild is None:
+            return False
+        player: wavelink.Player | None = guild.voice_client  # type: ignore
+        if player is None:
+            channel = guild.get_channel(entry.voice_channel_id) if entry.voice_channel_id else None
+            if channel is None or not any(not member.bot for member in channel.members):
+                return False
+            if entry.current is None and not entry.queue:
+                return False
+            player = await channel.connect(cls=_FixedPlayer)
+            encoded = ([entry.current] if entry.current is not None else []) + entry.queue
+        else:
+            encoded = list(entry.queue) if player.queue.is_empty else []
+
+        state = self._guilds.touch(entry.guild_id)
+        if entry.text_channel_id is not None:
+            state.text_channel_id = entry.text_channel_id
+
+        tracks = await self._decode_tracks(player.node, encoded)
+        player.queue.mode = wavelink.QueueMode(entry.loop_mode)
+        if player.current is None and tracks:
+            start = entry.position if entry.current is not None else 0
+            await self._enqueue_bulk(player, tracks[1:])
+            await player.play(tracks[0], start=start, volume=entry.volume, paused=entry.paused, add_history=False)
+        else:
+            await self._enqueue_bulk(player, tracks)
+        logger.info("Cola retomada en guild %s (%d canciones en cola)", entry.guild_id, player.queue.count)
+        return True
 
     # ── Wavelink events ────────────────────────────────────────────────────
 
@@ -291,38 +753,125 @@ class Music(commands.Cog):
     async def on_wavelink_node_ready(self, payload: wavelink.NodeReadyEventPayload) -> None:
         if payload.resumed:
             logger.info(f"Lavalink node reconnected (session resumed): {payload.node!r}")
+            await self._adopt_resumed_players(payload.node)
+            self._ready_nodes.add(payload.node.identifier)
+            await self._restore_saved_queues()
             return
-        logger.warning(f"Lavalink node reconnected (new session), disconnecting active players")
-        for player in list(self.bot.voice_clients):
-            if not isinstance(player, wavelink.Player):
+        logger.warning(f"Lavalink node reconnected (new session), restoring its players: {payload.node!r}")
+        # Acá quedan solo los players que no se pudieron mover a otro nodo cuando este se cayó.
+        balancer = getattr(self.bot, "lavalink_nodes", None)
+        for player in list(payload.node.players.values()):
+            target = (balancer.best_node() if balancer is not None else None) or payload.node
+            if isinstance(player, _FixedPlayer) and await self._migrate_player(player, target):
                 continue
+            guild_id = player.guild.id
+            self._cancel_playlist_load(guild_id)
             player.queue.clear()
             await player.disconnect()
-            guild_id = player.guild.id
-            self._text_channels.pop(guild_id, None)
-            getattr(self, "_now_playing_messages", {}).pop(guild_id, None)
-            getattr(self, "_now_playing_locks", {}).pop(guild_id, None)
-            getattr(self, "_np_just_published", set()).discard(guild_id)
+            self._cleanup_state(guild_id)
+        self._ready_nodes.add(payload.node.identifier)
+        await self._restore_saved_queues()
+
+    async def _adopt_resumed_players(self, node: wavelink.Node) -> None:
+        """Recrea los players de una sesión retomada tras reiniciar el bot.
+
+        Lavalink siguió reproduciendo, pero este proceso no tiene objetos
+        ``Player`` para esas guilds. Se reconecta a cada una al canal de voz en
+        el que Discord todavía tiene al bot, sobre el mismo nodo, y se copia
+        el track, posición, volumen y pausa que informa Lavalink. Si la guild
+        ya tiene un player en otro nodo (se retomó o se movió mientras este
+        nodo no estaba), el remoto sobra y se destruye.
+        """
+        await self.bot.wait_until_ready()
+        try:
+            remote_players = await node.fetch_players()
+        except Exception:
+            logger.exception("No se pudieron leer los players retomados de %r", node)
+            return
+
+        for info in remote_players:
+            guild = self.bot.get_guild(info.guild_id)
+            if guild is not None and guild.voice_client is not None:
+                if guild.voice_client.node is not node:
+                    with suppress(Exception):
+                        await node._destroy_player(info.guild_id)
+                continue  # reconexión dentro del mismo proceso: el player sigue vivo
+            me = guild.me if guild is not None else None
+            channel = me.voice.channel if me is not None and me.voice is not None else None
+            if channel is None:
+                with suppress(Exception):
+                    await node._destroy_player(info.guild_id)
+                continue
+            try:
+                player = await channel.connect(cls=functools.partial(_FixedPlayer, nodes=[node]))
+            except Exception:
+                logger.exception("No se pudo retomar el player de guild %s", info.guild_id)
+                continue
+            player._current = info.track
+            player._volume = info.volume
+            player._paused = info.paused
+            player._last_position = info.state.position
+            player._last_update = time.monotonic_ns()
+            self._guilds.touch(info.guild_id)
+            logger.info("Player retomado en guild %s (%s)", info.guild_id, getattr(info.track, "title", "sin track"))
+
+    @commands.Cog.listener()
+    async def on_lavalink_node_unavailable(self, node: wavelink.Node) -> None:
+        """Un nodo se cayó o se está drenando: mover sus players a otro nodo sano."""
+        players = [p for p in list(node.players.values()) if isinstance(p, _FixedPlayer)]
+        if not players:
+            return
+        lost = node.status is not wavelink.NodeStatus.CONNECTED
+        balancer = getattr(self.bot, "lavalink_nodes", None)
+        target = balancer.best_node(exclude=node) if balancer is not None else None
+        if target is None:
+            logger.warning("No hay otro nodo de Lavalink para mover %d player(s) de %r", len(players), node)
+        migrations = []
+        for player in players:
+            if lost and player.pending_snapshot is None:
+                player.pending_snapshot = player.snapshot()
+            if target is not None:
+                migrations.append(self._migrate_player(player, target))
+        await asyncio.gather(*migrations)
+
+    async def _migrate_player(self, player: _FixedPlayer, node: wavelink.Node) -> bool:
+        snapshot = player.pending_snapshot or player.snapshot()
+        try:
+            await player.migrate_to(node, snapshot=snapshot)
+        except Exception:
+            logger.exception("No se pudo mover el player de guild %s a %r", player.guild.id, node)
+            return False
+        player.pending_snapshot = None
+        logger.info("Player de guild %s movido a %r", player.guild.id, node)
+        return True
 
     @commands.Cog.listener()
     async def on_wavelink_track_start(self, payload: wavelink.TrackStartEventPayload) -> None:
         player = payload.player
         if player is None:
             return
+        self._mark_queue_dirty(player.guild.id)
+        self._schedule_prefetch(player)
         channel = self._get_text_channel(player.guild.id)
         if channel is None:
             return
-        song = _track_to_song(payload.track)
-        await self._publish_now_playing(channel, song)
+        self._request_now_playing(channel, player)
+
+    @commands.Cog.listener()
+    async def on_wavelink_player_update(self, payload: wavelink.PlayerUpdateEventPayload) -> None:
+        # Lavalink manda la posición cada pocos segundos: solo cambia la reproducción, no la cola.
+        if payload.player is not None and payload.player.guild is not None:
+            self._mark_queue_dirty(payload.player.guild.id, queue=False)
 
     @commands.Cog.listener()
     async def on_wavelink_track_end(self, payload: wavelink.TrackEndEventPayload) -> None:
         player = payload.player
         if player is None:
             return
-        if not player.queue.is_empty:
-            next_track = player.queue.get()
-            await player.play(next_track)
+        if payload.reason == "loadFailed":
+            # Lavalink manda antes el TrackExceptionEvent; ese handler decide qué sigue.
+            return
+        await self._play_next(player)
 
     @commands.Cog.listener()
     async def on_wavelink_track_exception(self, payload: wavelink.TrackExceptionEventPayload) -> None:
@@ -333,61 +882,453 @@ class Music(commands.Cog):
         channel = self._get_text_channel(player.guild.id)
 
         if _is_track_unavailable(payload.exception):
+            failed = payload.track
+            alternate = await self._recover_track(failed) if failed is not None else None
+            if alternate is not None:
+                logger.warning(f"Track unavailable, playing alternate from {alternate.source}: {payload.exception}")
+                if channel:
+                    self._outbound.post(
+                        channel,
+                        embed=build_info_embed(
+                            "🔁 Fuente alternativa",
+                            f"«{failed.title}» no está disponible; suena «{alternate.title}» ({alternate.source}).",
+                        ),
+                    )
+                await player.play(alternate)
+                return
             logger.warning(f"Track unavailable, skipping: {payload.exception}")
             if channel:
-                await channel.send(embed=build_info_embed("⏭️ Canción saltada", "Canción no disponible, saltando..."))
+                self._post_skip_notice(channel, player.guild.id)
         else:
             logger.error(f"Track exception: {payload.exception}")
             if channel:
                 msg = payload.exception.get("message", "Error desconocido") if isinstance(payload.exception, dict) else str(payload.exception)
-                await channel.send(embed=build_error_embed(f"Error al reproducir la canción: {msg}"))
+                self._outbound.post(channel, embed=build_error_embed(f"Error al reproducir la canción: {msg}"))
+
+        await self._play_next(player)
+
+    def _post_skip_notice(self, channel: discord.abc.Messageable, guild_id: int) -> None:
+        # Los avisos seguidos de una misma guild se funden en uno solo.
+        self._outbound.post(
+            channel,
+            embed=build_info_embed("⏭️ Canción saltada", "Canción no disponible, saltando..."),
+            merge_key=("track-skipped", guild_id),
+            merge=lambda n: build_info_embed(
+                "⏭️ Canciones saltadas", f"{n} canciones no disponibles, saltando..."
+            ),
+            hold=SKIP_NOTICE_HOLD,
+        )
 
-        if not player.queue.is_empty:
+    async def _play_next(self, player: wavelink.Player) -> None:
+        """Pasa al siguiente track; usa el que dejó listo el prefetch si sigue siendo el primero.
+
+        Los tracks que ya fallaron hace poco se cambian por su reemplazo sin
+        volver a intentarlos, o se saltan si no se les encontró ninguno.
+        """
+        state = self._guilds.get(player.guild.id)
+        prefetched = state.prefetched if state is not None else None
+        if state is not None:
+            state.prefetched = None
+        for _ in range(MAX_UNAVAILABLE_IN_A_ROW + 1):
+            if player.queue.is_empty:
+                return
             next_track = player.queue.get()
+            if prefetched is not None and prefetched[0] == next_track.encoded:
+                next_track = prefetched[1]
+            elif next_track.identifier in self._failed_tracks:
+                replacement = self._failed_tracks.get(next_track.identifier)
+                if replacement is None:
+                    channel = self._get_text_channel(player.guild.id)
+                    if channel is not None:
+                        self._post_skip_notice(channel, player.guild.id)
+                    continue
+                next_track = replacement
             await player.play(next_track)
+            return
+
+    async def _recover_track(self, track: wavelink.Playable) -> wavelink.Playable | None:
+        """Busca ``track`` en las fuentes siguientes de la cadena y devuelve el mejor reemplazo.
+
+        El resultado (también "sin reemplazo") queda en ``_failed_tracks`` por
+        ``FAILED_TRACK_TTL`` segundos, así que un mismo video roto no se vuelve
+        a intentar ni a buscar en cada repetición.
+        """
+        if track.identifier in self._failed_tracks:
+            return self._failed_tracks.get(track.identifier)
+        query = _alternate_query(track)
+        best: wavelink.Playable | None = None
+        for source in _sources_after(track):
+            try:
+                results = await _search_source(query, source)
+            except Exception as exc:
+                logger.debug("Búsqueda alternativa en %s falló: %s", source, exc)
+                continue
+            if not results or isinstance(results, wavelink.Playlist):
+                continue
+            scored = [
+                (_match_score(track, candidate), candidate)
+                for candidate in results
+                if candidate.identifier != track.identifier
+            ]
+            score, candidate = max(scored, key=lambda pair: pair[0], default=(0.0, None))
+            if candidate is not None and score >= ALTERNATE_MIN_SIMILARITY:
+                best = candidate
+                break
+        self._failed_tracks.set(track.identifier, best)
+        return best
+
+    # ── Prefetch del siguiente track ───────────────────────────────────────
+
+    def _schedule_prefetch(self, player: wavelink.Player) -> None:
+        """Programa la verificación del siguiente track para ``PREFETCH_LEAD`` segundos antes del final."""
+        state = self._guilds.ensure(player.guild.id)
+        if state.prefetch_task is not None:
+            state.prefetch_task.cancel()
+        state.prefetched = None
+        current = player.current
+        if current is None or current.is_stream or not current.length:
+            state.prefetch_task = None
+            return
+        state.prefetch_task = asyncio.create_task(
+            self._run_prefetch(player, state, current, time.monotonic_ns()),
+            name=f"prefetch-{player.guild.id}",
+        )
+
+    async def _run_prefetch(
+        self,
+        player: wavelink.Player,
+        state: GuildMusicState,
+        current: wavelink.Playable,
+        started_ns: int,
+    ) -> None:
+        try:
+            # Se recalcula al despertar: en pausa la posición no avanza y se vuelve a esperar.
+            while player.current is current:
+                last_update = player._last_update
+                if last_update is not None and last_update >= started_ns:
+                    wait = (current.length - player.position) / 1000 - PREFETCH_LEAD
+                else:
+                    # wavelink no resetea _last_position/_last_update en play(): hasta el
+                    # primer playerUpdate de este track, player.position extrapola el
+                    # anterior. Se estima desde el inicio y se vuelve a mirar pronto por
+                    # si arrancó con seek (restauración, migración de nodo).
+                    elapsed = (time.monotonic_ns() - started_ns) / 1e9
+                    wait = current.length / 1000 - elapsed - PREFETCH_LEAD
+                    wait = min(wait, PREFETCH_UPDATE_WAIT)
+                if wait <= 0:
+                    await self._prefetch_next(player, state)
+                    return
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falló el prefetch del siguiente track en guild %s", player.guild.id)
+        finally:
+            if state.prefetch_task is asyncio.current_task():
+                state.prefetch_task = None
+
+    async def _prefetch_next(self, player: wavelink.Player, state: GuildMusicState) -> None:
+        """Verifica el siguiente track de la cola y lo deja listo para ``_play_next``.
+
+        Las entradas que Lavalink ya no puede cargar se cambian por un reemplazo
+        de otra fuente o, si no lo hay, se quitan de la cola ahora, mientras
+        suena el track actual, en vez de fallar cuando les toque. Si la
+        verificación falla por otra causa (nodo caído, timeout) la cola queda
+        como estaba y el track se intenta reproducir igual.
+        """
+        queue = player.queue
+        if queue.mode is wavelink.QueueMode.loop:
+            return
+        skipped = 0
+        while not queue.is_empty and skipped < MAX_UNAVAILABLE_IN_A_ROW:
+            track = queue.peek(0)
+            if track.identifier in self._failed_tracks:
+                ready = self._failed_tracks.get(track.identifier)
+            else:
+                try:
+                    ready = await self._load_for_playback(track, player.node)
+                    if ready is None:
+                        ready = await self._recover_track(track)
+                except Exception as exc:
+                    logger.debug("No se pudo verificar %r: %s", track.title, exc)
+                    break
+                if queue.is_empty or queue.peek(0).encoded != track.encoded:
+                    # La cola cambió mientras se verificaba; el próximo track_start vuelve a programar.
+                    break
+            if ready is not None:
+                state.prefetched = (track.encoded, ready)
+                break
+            logger.warning("Track no disponible y sin reemplazo, se quita de la cola: %r", track.title)
+            queue.delete(0)
+            skipped += 1
+
+        if skipped:
+            self._mark_queue_dirty(player.guild.id)
+            channel = self._get_text_channel(player.guild.id)
+            if channel is not None:
+                for _ in range(skipped):
+                    self._post_skip_notice(channel, player.guild.id)
+
+    @staticmethod
+    async def _load_for_playback(track: wavelink.Playable, node: wavelink.Node) -> wavelink.Playable | None:
+        """Vuelve a cargar ``track`` desde su URI. Devuelve None si ya no se puede reproducir.
+
+        Los errores que no indican un track no disponible se propagan.
+        """
+        if not track.uri:
+            return track
+        try:
+            result = await wavelink.Pool.fetch_tracks(track.uri, node=node)
+        except wavelink.LavalinkLoadException as exc:
+            if exc.severity == "common" or _is_track_unavailable(exc.error):
+                return None
+            raise
+        tracks = result.tracks if isinstance(result, wavelink.Playlist) else result
+        if not tracks:
+            return None
+        return next((t for t in tracks if t.identifier == track.identifier), tracks[0])
 
     @commands.Cog.listener()
     async def on_wavelink_inactive_player(self, player: wavelink.Player) -> None:
         channel = self._get_text_channel(player.guild.id)
         if channel:
-            await channel.send(embed=build_info_embed("Desconectado", "Sin actividad por inactividad."))
+            self._outbound.post(channel, embed=build_info_embed("Desconectado", "Sin actividad por inactividad."))
+        self._cancel_playlist_load(player.guild.id)
         await player.disconnect()
-        self._text_channels.pop(player.guild.id, None)
-        getattr(self, "_now_playing_messages", {}).pop(player.guild.id, None)
-        getattr(self, "_now_playing_locks", {}).pop(player.guild.id, None)
-        getattr(self, "_np_just_published", set()).discard(player.guild.id)
+        self._cleanup_state(player.guild.id)
 
     # ── Search helper ────────────────────────────────────────────────────────
 
     @staticmethod
-    async def _search(query: str) -> list[wavelink.Playable] | wavelink.Playlist | None:
-        # 1. YouTube Music
-        tracks: wavelink.Search = await wavelink.Playable.search(
-            query, source=wavelink.TrackSource.YouTubeMusic
-        )
-        if tracks:
-            return tracks
+    async def _search(
+        query: str, hedge_delay: float | None = SEARCH_HEDGE_DELAY
+    ) -> list[wavelink.Playable] | wavelink.Playlist | None:
+        """Busca en YTM → YouTube → SoundCloud con búsquedas "hedged".
+
+        Se lanza la fuente de mayor prioridad; si no responde en ``hedge_delay``
+        segundos se lanza además la siguiente, y si responde vacía se lanza la
+        siguiente de inmediato. Gana el primer resultado no vacío en orden de
+        prioridad y el resto se cancela. ``hedge_delay=0`` lanza todo a la vez;
+        ``None`` desactiva el hedging (solo avanza ante un resultado vacío).
+        """
+        tasks: list[asyncio.Task | None] = [None] * len(SEARCH_SOURCES)
+
+        def launch(index: int) -> None:
+            tasks[index] = asyncio.create_task(
+                _search_source(query, SEARCH_SOURCES[index]),
+                name=f"search:{SEARCH_SOURCES[index].name}",
+            )
 
-        # 2. YouTube (fallback si YTM no tiene resultados)
-        tracks = await wavelink.Playable.search(
-            query, source=wavelink.TrackSource.YouTube
-        )
-        if tracks:
+        launch(0)
+        best = 0  # fuente de mayor prioridad que aún puede ganar
+        try:
+            while best < len(tasks):
+                current = tasks[best]
+                assert current is not None
+                if current.done():
+                    result = current.result()
+                    if result:
+                        return result
+                    best += 1
+                    if best < len(tasks) and tasks[best] is None:
+                        launch(best)
+                    continue
+
+                next_index = next((i for i, t in enumerate(tasks) if t is None), None)
+                timeout = hedge_delay if next_index is not None else None
+                running = {t for t in tasks if t is not None and not t.done()}
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done and next_index is not None:
+                    launch(next_index)
+            return None
+        finally:
+            for task in tasks:
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # marcar como recuperada para no ensuciar el log
+
+    async def _lookup(self, query: str) -> list[wavelink.Playable] | wavelink.Playlist | None:
+        """Resuelve una URL o una búsqueda de texto pasando por la caché.
+
+        Lookups idénticos concurrentes (de uno o varios servidores) comparten
+        una sola petición a Lavalink; cada caller recibe su propia lista.
+        """
+        source = "url" if query.startswith("http") else "auto"
+        cached = self._search_cache.get(query, source)
+        if cached is not SearchCache.MISS:
+            logger.debug("Search cache hit (%s): %r %s", source, query, self._search_cache.stats())
+            return cached
+
+        async def fetch() -> list[wavelink.Playable] | wavelink.Playlist | None:
+            if source == "url":
+                tracks = await wavelink.Playable.search(query)
+            else:
+                tracks = await self._search(query)
+            self._search_cache.put(query, source, tracks)
+            logger.debug("Search cache miss (%s): %r %s", source, query, self._search_cache.stats())
             return tracks
 
-        # 3. SoundCloud — filtrar previews
-        tracks = await wavelink.Playable.search(
-            query, source=wavelink.TrackSource.SoundCloud
+        return await self._search_flights.do(SearchCache.key(query, source), fetch)
+
+    # ── Carga de playlists ─────────────────────────────────────────────────
+
+    async def _load_playlist(
+        self,
+        ctx: commands.Context,
+        player: wavelink.Player,
+        items: Iterable[wavelink.Playable | TrackRow],
+        *,
+        shuffle: bool,
+        embed_for: Callable[[int, bool], discord.Embed],
+    ) -> None:
+        """Encola una playlist empezando a sonar con el primer track.
+
+        Si el player está libre, el primer track (del orden ya mezclado) suena
+        de inmediato y el resto se encola en segundo plano por bloques; la
+        respuesta se edita con el total al terminar. Así el tiempo hasta el
+        primer sonido no depende del tamaño de la playlist. ``items`` puede
+        traer filas compactas de un snapshot, que se convierten a ``Playable``
+        recién al encolarlas.
+        """
+        item_list = list(items)
+        if shuffle:
+            random.shuffle(item_list)
+
+        if player.playing or player.paused:
+            added = await self._enqueue_bulk(player, item_list)
+            await self._respond(ctx, embed=embed_for(added, True))
+            return
+
+        if not player.queue.is_empty:
+            added = await self._enqueue_bulk(player, item_list)
+            await self._respond(ctx, embed=embed_for(added, True))
+            await player.play(player.queue.get())
+            return
+
+        await player.play(_as_playable(item_list[0]))
+        rest = item_list[1:]
+        if not rest:
+            await self._respond(ctx, embed=embed_for(len(item_list), True))
+            return
+
+        message = await self._respond(ctx, embed=embed_for(len(item_list), False))
+        guild_id = ctx.guild.id
+        self._cancel_playlist_load(guild_id)
+        state = self._guilds.touch(guild_id)
+        task = asyncio.create_task(
+            self._finish_playlist_load(ctx, player, rest, message, embed_for),
+            name=f"playlist-load:{guild_id}",
+        )
+        state.loading_task = task
+        task.add_done_callback(
+            lambda finished_task, st=state: self._forget_loading_task(st, finished_task)
         )
-        if tracks:
-            if isinstance(tracks, wavelink.Playlist):
-                tracks.tracks = [t for t in tracks.tracks if "/preview/" not in (t.uri or "")]
-                return tracks if tracks.tracks else None
-            else:
-                full_tracks = [t for t in tracks if "/preview/" not in (t.uri or "")]
-                return full_tracks if full_tracks else None
 
-        return None
+    @staticmethod
+    def _forget_loading_task(state: GuildMusicState, task: asyncio.Task) -> None:
+        if state.loading_task is task:
+            state.loading_task = None
+
+    async def _finish_playlist_load(
+        self,
+        ctx: commands.Context,
+        player: wavelink.Player,
+        rest: list[wavelink.Playable | TrackRow],
+        message: discord.Message | None,
+        embed_for: Callable[[int, bool], discord.Embed],
+    ) -> None:
+        added = 1
+        try:
+            for start in range(0, len(rest), PLAYLIST_LOAD_CHUNK):
+                added += await self._enqueue_bulk(player, rest[start:start + PLAYLIST_LOAD_CHUNK])
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falló la carga en segundo plano de la playlist")
+        self._mark_queue_dirty(ctx.guild.id)
+
+        final_embed = embed_for(added, True)
+        try:
+            if ctx.interaction is not None:
+                await self._respond(ctx, embed=final_embed)
+            elif message is not None:
+                await message.edit(embed=final_embed)
+        except discord.HTTPException:
+            logger.warning("No se pudo actualizar el mensaje de la playlist", exc_info=True)
+
+    # ── Playlists atajo (/dbz, /anime) ─────────────────────────────────────
+
+    async def _refresh_snapshot(self, url: str) -> list[wavelink.Playable]:
+        """Resuelve la playlist en Lavalink y guarda el snapshot en disco."""
+        tracks = await self._lookup(url)
+        if not tracks:
+            return []
+        if isinstance(tracks, wavelink.Playlist):
+            name, track_list = tracks.name, list(tracks.tracks)
+        else:
+            name, track_list = None, list(tracks)
+        try:
+            await self._snapshots.save(url, name, track_list)
+        except Exception:
+            logger.exception("No se pudo guardar el snapshot de %s", url)
+        return track_list
+
+    def _schedule_snapshot_refresh(self, url: str) -> None:
+        task = self._snapshot_refreshes.get(url)
+        if task is not None and not task.done():
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._refresh_snapshot(url)
+            except Exception:
+                logger.warning("Falló el refresco en segundo plano de %s", url, exc_info=True)
+
+        self._snapshot_refreshes[url] = asyncio.create_task(refresh(), name=f"snapshot:{url}")
+
+    async def _load_shortcut_playlist(self, url: str) -> list[wavelink.Playable | TrackRow]:
+        """Sirve la playlist desde el snapshot en disco; si no hay, la resuelve.
+
+        Un snapshot viejo se sirve igual y se refresca en segundo plano, así el
+        comando sigue funcionando aunque YouTube esté lento o limitando.
+        """
+        try:
+            snapshot = await self._snapshots.load(url)
+        except Exception:
+            logger.exception("No se pudo leer el snapshot de %s", url)
+            snapshot = None
+        if snapshot is not None and len(snapshot):
+            if snapshot.age > PLAYLIST_SNAPSHOT_MAX_AGE:
+                self._schedule_snapshot_refresh(url)
+            return list(snapshot.rows)
+        return await self._refresh_snapshot(url)
+
+    async def _play_shortcut(self, ctx: commands.Context, url: str, title: str, label: str) -> None:
+        if not self._is_lavalink_available():
+            await ctx.send(embed=self._lavalink_unavailable_embed())
+            return
+        self._set_text_channel(ctx)
+        player = await self._ensure_connected(ctx)
+        if player is None:
+            return
+        await ctx.defer()
+        items = await self._load_shortcut_playlist(url)
+        if not items:
+            await self._respond(ctx, embed=build_error_embed(f"No se pudo cargar la playlist de {label}."))
+            return
+
+        def embed_for(count: int, done: bool) -> discord.Embed:
+            if done:
+                return build_info_embed(title, f"Playlist añadida con {count} canciones.")
+            return build_info_embed(title, f"▶️ Ya suena la primera; cargando {count} canciones…")
+
+        await self._load_playlist(ctx, player, items, shuffle=True, embed_for=embed_for)
 
     # ── Comandos slash ───────────────────────────────────────────────────────
 
@@ -402,38 +1343,34 @@ class Music(commands.Cog):
     ])
     async def play(self, ctx: commands.Context, query: str, shuffle: Optional[Choice[str]] = None) -> None:
         if not self._is_lavalink_available():
-            await ctx.send(embed=build_error_embed("El sistema de música no está disponible ahora."))
+            await ctx.send(embed=self._lavalink_unavailable_embed())
             return
         self._set_text_channel(ctx)
         await ctx.defer()
         player = await self._ensure_connected(ctx)
         if player is None:
             return
-        if query.startswith("http"):
-            tracks: wavelink.Search = await wavelink.Playable.search(query)
-        else:
-            tracks = await self._search(query)
+        tracks = await self._lookup(query)
         if not tracks:
             await self._respond(ctx, embed=build_warning_embed("No se encontraron resultados."))
             return
         if isinstance(tracks, wavelink.Playlist):
-            tracks_list = list(tracks.tracks)
             should_shuffle = shuffle is not None and shuffle.value == "shuffle"
-            if should_shuffle:
-                random.shuffle(tracks_list)
-            for track in tracks_list:
-                await player.queue.put_wait(track)
             shuffle_label = " (aleatorizada 🔀)" if should_shuffle else ""
-            await self._respond(
-                ctx,
-                embed=build_info_embed(
-                    "✅ Playlist añadida",
-                    f"**{tracks.name}** — {len(tracks_list)} canciones añadidas a la cola{shuffle_label}.",
-                ),
-            )
-            if not player.playing and not player.paused and not player.queue.is_empty:
-                next_track = player.queue.get()
-                await player.play(next_track)
+            playlist_name = tracks.name
+
+            def embed_for(count: int, done: bool) -> discord.Embed:
+                if done:
+                    return build_info_embed(
+                        "✅ Playlist añadida",
+                        f"**{playlist_name}** — {count} canciones añadidas a la cola{shuffle_label}.",
+                    )
+                return build_info_embed(
+                    "⏳ Cargando playlist",
+                    f"**{playlist_name}** — ya suena la primera; cargando {count} canciones{shuffle_label}…",
+                )
+
+            await self._load_playlist(ctx, player, tracks.tracks, shuffle=should_shuffle, embed_for=embed_for)
         else:
             track = tracks[0]
             if player.current is not None or player.playing or player.paused or not player.queue.is_empty:
@@ -443,7 +1380,6 @@ class Music(commands.Cog):
             else:
                 await player.play(track)
                 song = _track_to_song(track)
-                self._np_just_published.add(ctx.guild.id)
                 await self._publish_now_playing(ctx.channel, song)
                 if ctx.interaction:
                     try:
@@ -454,11 +1390,11 @@ class Music(commands.Cog):
     @commands.hybrid_command(name="search", description="Busca canciones y muestra resultados para elegir.")
     async def search(self, ctx: commands.Context, *, query: str) -> None:
         if not self._is_lavalink_available():
-            await ctx.send(embed=build_error_embed("El sistema de música no está disponible ahora."))
+            await ctx.send(embed=self._lavalink_unavailable_embed())
             return
         self._set_text_channel(ctx)
         await ctx.defer(ephemeral=True)
-        tracks = await self._search(query)
+        tracks = await self._lookup(query)
         if not tracks or isinstance(tracks, wavelink.Playlist):
             await ctx.send(embed=build_warning_embed("No se encontraron resultados."), ephemeral=True)
             return
@@ -483,13 +1419,11 @@ class Music(commands.Cog):
         if player is None:
             await ctx.send(embed=build_warning_embed("No estoy en un canal de voz."))
             return
+        self._cancel_playlist_load(ctx.guild.id)
         player.queue.clear()
         await player.stop()
         await player.disconnect()
-        self._text_channels.pop(ctx.guild.id, None)
-        getattr(self, "_now_playing_messages", {}).pop(ctx.guild.id, None)
-        getattr(self, "_now_playing_locks", {}).pop(ctx.guild.id, None)
-        getattr(self, "_np_just_published", set()).discard(ctx.guild.id)
+        self._cleanup_state(ctx.guild.id)
         await ctx.send(embed=build_info_embed("⏹ Detenido", "Reproducción detenida y cola vaciada."))
 
     @commands.hybrid_command(name="pause", description="Pausa la reproducción.")
@@ -516,11 +1450,11 @@ class Music(commands.Cog):
         if player is None or (player.queue.is_empty and not player.playing):
             await ctx.send(embed=build_warning_embed("La cola está vacía."))
             return
-        now_playing = player.current.title if player.current else "Nada"
-        queue_songs = [_track_to_song(t) for t in player.queue]
-        view = QueuePaginationView(queue_songs, now_playing)
-        embed = build_queue_embed(queue_songs, now_playing)
-        msg = await ctx.send(embed=embed, view=view)
+        view = QueuePaginationView(
+            QueueListing(player.queue),
+            lambda: player.current.title if player.current else "Nada",
+        )
+        msg = await ctx.send(embed=view.render(), view=view)
         view.message = msg
 
     @commands.hybrid_command(name="nowplaying", description="Muestra la canción actual.")
@@ -530,7 +1464,6 @@ class Music(commands.Cog):
             await ctx.send(embed=build_warning_embed("No hay nada reproduciéndose."))
             return
         song = _track_to_song(player.current)
-        self._np_just_published.add(ctx.guild.id)
         await self._publish_now_playing(ctx.channel, song)
 
     @commands.hybrid_command(name="shuffle", description="Mezcla la cola de reproducción.")
@@ -548,14 +1481,55 @@ class Music(commands.Cog):
         if player is None or player.queue.is_empty:
             await ctx.send(embed=build_warning_embed("La cola está vacía."))
             return
-        queue_list = list(player.queue)
-        if position < 1 or position > len(queue_list):
-            await ctx.send(embed=build_error_embed(f"Posición inválida. La cola tiene {len(queue_list)} canción(es)."))
+        count = player.queue.count
+        if position < 1 or position > count:
+            await ctx.send(embed=build_error_embed(f"Posición inválida. La cola tiene {count} canción(es)."))
             return
-        track = queue_list[position - 1]
-        player.queue.remove(track)
+        track = player.queue[position - 1]
+        player.queue.delete(position - 1)
         await ctx.send(embed=build_info_embed("🗑 Eliminado", f"**{track.title}** eliminado de la cola."))
 
+    @commands.hybrid_command(name="move", description="Mueve una canción de la cola a otra posición.")
+    @app_commands.describe(from_position="Posición actual", to_position="Posición nueva")
+    async def move(self, ctx: commands.Context, from_position: int, to_position: int) -> None:
+        player = await self._get_player(ctx)
+        if player is None or player.queue.is_empty:
+            await ctx.send(embed=build_warning_embed("La cola está vacía."))
+            return
+        count = player.queue.count
+        if not (1 <= from_position <= count and 1 <= to_position <= count):
+            await ctx.send(embed=build_error_embed(f"Posición inválida. La cola tiene {count} canción(es)."))
+            return
+        player.queue.move(from_position - 1, to_position - 1)
+        title = player.queue.titles(to_position - 1, to_position)[0]
+        await ctx.send(embed=build_info_embed("↕️ Movido", f"**{title}** ahora está en la posición {to_position}."))
+
+    @commands.hybrid_command(name="removerange", description="Elimina de la cola un rango de posiciones.")
+    @app_commands.describe(start="Primera posición a eliminar", end="Última posición a eliminar")
+    async def removerange(self, ctx: commands.Context, start: int, end: int) -> None:
+        player = await self._get_player(ctx)
+        if player is None or player.queue.is_empty:
+            await ctx.send(embed=build_warning_embed("La cola está vacía."))
+            return
+        count = player.queue.count
+        if not 1 <= start <= end <= count:
+            await ctx.send(embed=build_error_embed(f"Rango inválido. La cola tiene {count} canción(es)."))
+            return
+        removed = player.queue.delete_range(start - 1, end)
+        await ctx.send(embed=build_info_embed("🗑 Eliminadas", f"{removed} canción(es) eliminadas de la cola."))
+
+    @commands.hybrid_command(name="dedupe", description="Quita las canciones repetidas de la cola.")
+    async def dedupe(self, ctx: commands.Context) -> None:
+        player = await self._get_player(ctx)
+        if player is None or player.queue.is_empty:
+            await ctx.send(embed=build_warning_embed("La cola está vacía."))
+            return
+        removed = player.queue.dedupe()
+        if not removed:
+            await ctx.send(embed=build_info_embed("✨ Sin repetidas", "La cola no tiene canciones repetidas."))
+            return
+        await ctx.send(embed=build_info_embed("✨ Repetidas quitadas", f"{removed} canción(es) repetidas eliminadas."))
+
     @commands.hybrid_command(name="volume", description="Ajusta el volumen (0-100).")
     async def volume(self, ctx: commands.Context, level: int) -> None:
         player = await self._get_player(ctx)
@@ -570,69 +1544,43 @@ class Music(commands.Cog):
 
     @commands.hybrid_command(name="dbz", description="Reproduce la playlist de Dragon Ball Z")
     async def dbz(self, ctx: commands.Context) -> None:
-        DBZ_PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLy0A50xAkMqRZLl2JDYG9R1vdBaVnJhM"
-        if not self._is_lavalink_available():
-            await ctx.send(embed=build_error_embed("El sistema de música no está disponible ahora."))
-            return
-        self._set_text_channel(ctx)
-        player = await self._ensure_connected(ctx)
-        if player is None:
-            return
-        await ctx.defer()
-        tracks: wavelink.Search = await wavelink.Playable.search(DBZ_PLAYLIST_URL)
-        if not tracks:
-            await self._respond(ctx, embed=build_error_embed("No se pudo cargar la playlist de DBZ."))
-            return
-        if isinstance(tracks, wavelink.Playlist):
-            track_list = list(tracks.tracks)
-            random.shuffle(track_list)
-            for track in track_list:
-                await player.queue.put_wait(track)
-            await self._respond(ctx, embed=build_info_embed("🐉 Dragon Ball Z", f"Playlist añadida con {len(track_list)} canciones."))
-        else:
-            random.shuffle(tracks)
-            for track in tracks:
-                await player.queue.put_wait(track)
-            await self._respond(ctx, embed=build_info_embed("🐉 Dragon Ball Z", f"Añadidas {len(tracks)} canciones."))
-        if not player.playing and not player.paused:
-            next_track = player.queue.get()
-            await player.play(next_track)
+        await self._play_shortcut(ctx, DBZ_PLAYLIST_URL, "🐉 Dragon Ball Z", "DBZ")
 
     @commands.hybrid_command(name="anime", description="Reproduce la playlist de Anime")
     async def anime(self, ctx: commands.Context) -> None:
-        ANIME_PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLHPZvFJe7-ufMte_SHOhl1qncTTzjpkO7"
-        if not self._is_lavalink_available():
-            await ctx.send(embed=build_error_embed("El sistema de música no está disponible ahora."))
-            return
-        self._set_text_channel(ctx)
-        player = await self._ensure_connected(ctx)
-        if player is None:
-            return
-        await ctx.defer()
-        tracks: wavelink.Search = await wavelink.Playable.search(ANIME_PLAYLIST_URL)
-        if not tracks:
-            await self._respond(ctx, embed=build_error_embed("No se pudo cargar la playlist de Anime."))
-            return
-        if isinstance(tracks, wavelink.Playlist):
-            track_list = list(tracks.tracks)
-            random.shuffle(track_list)
-            for track in track_list:
-                await player.queue.put_wait(track)
-            await self._respond(ctx, embed=build_info_embed("🎌 Anime", f"Playlist añadida con {len(track_list)} canciones."))
-        else:
-            random.shuffle(tracks)
-            for track in tracks:
-                await player.queue.put_wait(track)
-            await self._respond(ctx, embed=build_info_embed("🎌 Anime", f"Añadidas {len(tracks)} canciones."))
-        if not player.playing and not player.paused:
-            next_track = player.queue.get()
-            await player.play(next_track)
+        await self._play_shortcut(ctx, ANIME_PLAYLIST_URL, "🎌 Anime", "Anime")
 
     @commands.hybrid_command(name="coin", description="Lanza una moneda.")
     async def coin(self, ctx: commands.Context) -> None:
         result = random.choice(["Cara", "Sello"])
         await ctx.send(embed=build_info_embed("🪙 Moneda", f"Resultado: **{result}**"))
 
+    # ── Operación de nodos (solo el dueño del bot, por mención) ─────────────
+
+    @commands.command(name="drain", hidden=True)
+    @commands.is_owner()
+    async def drain_node(self, ctx: commands.Context, identifier: str) -> None:
+        """Saca un nodo de Lavalink de rotación y mueve sus players a otro."""
+        balancer = getattr(self.bot, "lavalink_nodes", None)
+        node = balancer.get(identifier) if balancer is not None else None
+        if node is None:
+            await ctx.send(embed=build_error_embed(f"No existe el nodo `{identifier}`."))
+            return
+        count = len(node.players)
+        balancer.drain(node)
+        await ctx.send(embed=build_info_embed("🚰 Drenando", f"Moviendo {count} player(s) fuera de `{identifier}`."))
+
+    @commands.command(name="undrain", hidden=True)
+    @commands.is_owner()
+    async def undrain_node(self, ctx: commands.Context, identifier: str) -> None:
+        balancer = getattr(self.bot, "lavalink_nodes", None)
+        node = balancer.get(identifier) if balancer is not None else None
+        if node is None:
+            await ctx.send(embed=build_error_embed(f"No existe el nodo `{identifier}`."))
+            return
+        balancer.undrain(node)
+        await ctx.send(embed=build_info_embed("✅ Nodo activo", f"`{identifier}` vuelve a recibir players."))
+
 
 # ── Search select view ────────────────────────────────────────────────────────
 
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
 import asyncio
-import contextlib
 import logging
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
 import discord
 from discord import app_commands
+from discord.app_commands import Choice
 from discord.ext import commands
 
-from utils.reminders_store import RemindersStore, parse_when
+from utils.outbound import OutboundScheduler
+from utils.reminder_index import PendingReminderIndex
+from utils.reminder_scheduler import ReminderScheduler
+from utils.reminders_store import (
+    ReminderDoneWriter,
+    ReminderPage,
+    RemindersStore,
+    parse_when,
+)
 from utils.ui import COLOR_INFO, COLOR_SUCCESS, build_error_embed, build_info_embed
 
 logger = logging.getLogger(__name__)
@@ -19,6 +27,16 @@ DISPLAY_TZ = "America/Santiago"
 TARGET_CHOICE_ERROR = "Valor inválido en 'Para'. Usa: yo, ella o ambos"
 MISSING_YO_ID_ERROR = "Falta configurar REMINDER_USER_YO_ID"
 MISSING_ELLA_ID_ERROR = "Falta configurar REMINDER_USER_ELLA_ID"
+# Segundos hacia adelante que se mantienen en memoria; lo más lejano se carga al acercarse.
+REMINDER_HORIZON = float(os.getenv("REMINDER_HORIZON", "3600"))
+# Segundos hacia atrás que se entregan al arrancar; lo vencido antes se marca hecho sin enviarlo.
+REMINDER_CATCHUP = float(os.getenv("REMINDER_CATCHUP", "3600"))
+# Cada cuántos segundos se compara el índice local con Supabase.
+REMINDER_RECONCILE_INTERVAL = float(os.getenv("REMINDER_RECONCILE_INTERVAL", "600"))
+# Segundos que se juntan entregas antes de marcarlas como hechas en Supabase.
+REMINDER_DONE_DELAY = float(os.getenv("REMINDER_DONE_DELAY", "1"))
+# Filas por consulta al llenar en memoria los pendientes de un usuario.
+REMINDER_FETCH_BATCH = 100
 
 SPANISH_WEEKDAYS = [
     "lunes",
@@ -128,15 +146,9 @@ def build_reminder_delivery_embed(reminder: dict) -> discord.Embed:
     )
 
 
-def filter_user_reminders(reminders: list[dict], user_id: int | str) -> list[dict]:
-    return [
-        reminder
-        for reminder in reminders
-        if str(reminder.get("created_by")) == str(user_id)
-    ]
-
-
-def build_reminders_list_embed(reminders: list[dict]) -> discord.Embed:
+def build_reminders_list_embed(
+    reminders: list[dict], page: int | None = None
+) -> discord.Embed:
     if not reminders:
         return discord.Embed(
             title="⏰ Tus recordatorios",
@@ -152,11 +164,14 @@ def build_reminders_list_embed(reminders: list[dict]) -> discord.Embed:
             f"{build_target_mentions(reminder['target_ids'])}"
         )
 
-    return discord.Embed(
+    embed = discord.Embed(
         title="⏰ Tus recordatorios",
         description="\n\n".join(lines),
         colour=COLOR_INFO,
     )
+    if page is not None:
+        embed.set_footer(text=f"Página {page}")
+    return embed
 
 
 class CancelReminderButton(discord.ui.Button):
@@ -215,6 +230,64 @@ class ReminderActionsView(discord.ui.View):
         return True
 
 
+class ReminderListView(ReminderActionsView):
+    """Una página de ``/reminders``: botones de cancelar más anterior/siguiente.
+
+    Cada página se pide al store con el cursor de la anterior; ``cursors``
+    guarda el cursor que abrió cada página ya vista (None para la primera)
+    para poder volver atrás.
+    """
+
+    def __init__(
+        self,
+        cog: "Reminders",
+        page: ReminderPage,
+        owner_id: str,
+        *,
+        cursors: list[tuple[str, str] | None],
+        target_id: str | None = None,
+    ) -> None:
+        super().__init__(cog, page.items, owner_id)
+        self.page = page
+        self.cursors = cursors
+        self.target_id = target_id
+        if len(cursors) == 1 and page.next_cursor is None:
+            return
+
+        prev_button = discord.ui.Button(
+            emoji="⬅️",
+            style=discord.ButtonStyle.secondary,
+            custom_id="reminders:prev",
+            disabled=len(cursors) == 1,
+            row=1,
+        )
+        prev_button.callback = self.prev_page
+        next_button = discord.ui.Button(
+            emoji="➡️",
+            style=discord.ButtonStyle.secondary,
+            custom_id="reminders:next",
+            disabled=page.next_cursor is None,
+            row=1,
+        )
+        next_button.callback = self.next_page
+        self.add_item(prev_button)
+        self.add_item(next_button)
+
+    async def prev_page(self, interaction: discord.Interaction) -> None:
+        await self.cog.show_reminders_page(
+            interaction, self.owner_id, self.cursors[:-1], self.target_id, edit=True
+        )
+
+    async def next_page(self, interaction: discord.Interaction) -> None:
+        await self.cog.show_reminders_page(
+            interaction,
+            self.owner_id,
+            [*self.cursors, self.page.next_cursor],
+            self.target_id,
+            edit=True,
+        )
+
+
 class ReminderModal(discord.ui.Modal):
     def __init__(self, cog: "Reminders") -> None:
         super().__init__(title="Crear recordatorio")
@@ -270,7 +343,21 @@ class Reminders(commands.Cog):
         self.reminder_user_yo_id = os.getenv("REMINDER_USER_YO_ID")
         self.reminder_user_ella_id = os.getenv("REMINDER_USER_ELLA_ID")
         self.store = RemindersStore(self.supabase_url, self.supabase_key)
-        self.tasks: dict[str, asyncio.Task[None]] = {}
+        # Un solo task despacha todos los recordatorios agendados, en orden de fire_at.
+        self.scheduler = ReminderScheduler(self._deliver_reminder)
+        # Las entregas se marcan done por lotes, no con un UPDATE cada una.
+        self.done_writer = ReminderDoneWriter(self.store, delay=REMINDER_DONE_DELAY)
+        # Hasta dónde (fire_at) ya se leyó del store; lo posterior se pagina por ventanas.
+        self.loaded_until: datetime | None = None
+        # Límite inferior de la primera ventana: lo anterior ya no se entrega.
+        self.loaded_from: datetime | None = None
+        self.horizon = REMINDER_HORIZON
+        self.catchup = REMINDER_CATCHUP
+        self._horizon_task: asyncio.Task | None = None
+        # Copia local (write-through) de los pendientes; ver PendingReminderIndex.
+        self.index = PendingReminderIndex()
+        self._reconcile_task: asyncio.Task | None = None
+        self.outbound = OutboundScheduler.for_client(bot)
 
     def is_configured(self) -> bool:
         return bool(
@@ -282,81 +369,185 @@ class Reminders(commands.Cog):
             logger.warning("Reminders deshabilitados: falta configuración")
             return
 
+        await self.load_next_window()
+        self._horizon_task = asyncio.create_task(
+            self._run_horizon(), name="reminders:horizon"
+        )
+        self._reconcile_task = asyncio.create_task(
+            self._run_reconcile(), name="reminders:reconcile"
+        )
+
+    async def cog_unload(self) -> None:
+        for task in (self._horizon_task, self._reconcile_task):
+            if task is not None:
+                task.cancel()
+        self._horizon_task = self._reconcile_task = None
+        self.scheduler.close()
+        # Lo ya entregado se marca antes de soltar el cog para no repetirlo al volver.
+        await self.done_writer.close()
+
+    async def load_next_window(self) -> None:
+        """Agenda los pendientes que vencen antes de ``ahora + horizon``.
+
+        Solo se consulta el tramo nuevo (``loaded_until < fire_at <= until``).
+        La primera vez arranca ``catchup`` segundos atrás, así entran los que
+        vencieron con el bot apagado hace poco; los más viejos se marcan
+        hechos sin enviarlos, para no publicar de golpe avisos que ya no
+        sirven. ``loaded_until`` se corre antes de la consulta para que un
+        recordatorio creado mientras tanto se agende directo; si la consulta
+        falla se vuelve atrás y se reintenta después.
+        """
+        previous = self.loaded_until
+        now = datetime.now(timezone.utc)
+        until = now + timedelta(seconds=self.horizon)
+        after = previous
+        if after is None:
+            after = self.loaded_from = now - timedelta(seconds=self.catchup)
+            try:
+                expired = await self.store.expire_overdue(after)
+            except Exception:
+                logger.exception("No se pudieron descartar los recordatorios vencidos")
+            else:
+                if expired:
+                    logger.warning("Se descartaron %d recordatorio(s) vencidos hace más de %.0fs", expired, self.catchup)
+        self.loaded_until = until
         try:
-            pending = await self.store.get_pending()
+            reminders = await self.store.get_due_before(until, after=after)
         except Exception:
-            logger.exception("No se pudieron recargar los recordatorios pendientes")
+            self.loaded_until = previous
+            logger.exception("No se pudieron cargar los recordatorios pendientes")
             return
 
-        for reminder in pending:
-            task = self.schedule_reminder(reminder)
-            if task is None:
-                # Recordatorio vencido: entregar de inmediato
-                asyncio.create_task(
-                    self._deliver_reminder(reminder),
-                    name=f"reminder:overdue:{reminder['id']}",
-                )
+        for reminder in reminders:
+            self.index.add(reminder)
+            self.schedule_reminder(reminder)
+
+    async def _run_horizon(self) -> None:
+        # Se adelanta la ventana a mitad de camino para que nunca quede un hueco sin cargar.
+        while True:
+            await asyncio.sleep(self.horizon / 2)
+            await self.load_next_window()
+
+    async def reconcile(self) -> None:
+        """Vuelve a leer del store la ventana cargada y los usuarios completos del índice.
+
+        Lo que el store ya no tiene pendiente se saca del índice y del
+        scheduler. Lo que falta o cambió de hora se agrega y se reagenda.
+        Una fila puede venir vieja si se entregó mientras corría la
+        consulta, así que se ignoran los ids que se están entregando,
+        los que esperan su lote de ``done`` y los que se marcaron durante
+        la consulta.
+        """
+        if self.loaded_until is not None:
+            until = self.loaded_until
+            # Lo marcado antes de la consulta ya no puede volver como pendiente.
+            self.done_writer.take_written()
+            fetched = await self.store.get_due_before(until, after=self.loaded_from)
+            written = self.done_writer.take_written()
+            rows = [
+                row
+                for row in fetched
+                if not self._delivered(str(row["id"])) and str(row["id"]) not in written
+            ]
+            changed, removed = self.index.replace_window(until.timestamp(), rows)
+            for reminder in removed:
+                self.scheduler.cancel(str(reminder["id"]))
+            changed_ids = {str(reminder["id"]) for reminder in changed}
+            for reminder in rows:
+                reminder_id = str(reminder["id"])
+                if reminder_id in changed_ids or reminder_id not in self.scheduler:
+                    self.schedule_reminder(reminder)
+
+        for creator in list(self.index.complete_creators):
+            self.index.replace_creator(creator, await self._fetch_user_reminders(creator))
+
+    async def _run_reconcile(self) -> None:
+        while True:
+            await asyncio.sleep(REMINDER_RECONCILE_INTERVAL)
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("No se pudo reconciliar el índice de recordatorios")
+
+    async def _fetch_user_reminders(self, created_by: str) -> list[dict]:
+        """Todos los pendientes de ``created_by``, recorriendo el listado del store."""
+        reminders: list[dict] = []
+        cursor = None
+        while True:
+            page = await self.store.list_for_user(
+                created_by, cursor=cursor, limit=REMINDER_FETCH_BATCH
+            )
+            reminders.extend(page.items)
+            if page.next_cursor is None:
+                return reminders
+            cursor = page.next_cursor
 
-    def cog_unload(self) -> None:
-        for task in self.tasks.values():
-            task.cancel()
-        self.tasks.clear()
+    async def reminders_page(
+        self,
+        created_by: str,
+        *,
+        target_id: str | None = None,
+        cursor: tuple[str, str] | None = None,
+    ) -> ReminderPage:
+        """Página del listado servida desde el índice; la primera vez llena al usuario desde el store."""
+        if created_by not in self.index.complete_creators:
+            self.index.replace_creator(
+                created_by, await self._fetch_user_reminders(created_by)
+            )
+        return self.index.page_for_creator(
+            created_by, target_id=target_id, cursor=cursor
+        )
 
-    def _forget_task(self, reminder_id: str, task: asyncio.Task[None]) -> None:
-        if self.tasks.get(reminder_id) is task:
-            self.tasks.pop(reminder_id, None)
+    def is_loaded(self, reminder: dict) -> bool:
+        """El recordatorio cae dentro de la ventana que ya está en memoria."""
+        return (
+            self.loaded_until is not None
+            and coerce_utc_datetime(reminder["fire_at"]) <= self.loaded_until
+        )
 
-    def schedule_reminder(self, reminder: dict) -> asyncio.Task[None] | None:
-        reminder_id = str(reminder["id"])
+    def schedule_reminder(self, reminder: dict) -> bool:
+        """Agenda (o reprograma) la entrega. Devuelve False si ya venció y sale de inmediato."""
         fire_at = coerce_utc_datetime(reminder["fire_at"])
-        delay = (fire_at - datetime.now(timezone.utc)).total_seconds()
-
-        if delay <= 0:
-            return None
-
-        existing = self.tasks.pop(reminder_id, None)
-        if existing is not None:
-            existing.cancel()
+        self.scheduler.schedule(str(reminder["id"]), fire_at.timestamp(), reminder)
+        return fire_at > datetime.now(timezone.utc)
 
-        task = asyncio.create_task(
-            self._run_scheduled_reminder(reminder, delay),
-            name=f"reminder:{reminder_id}",
-        )
-        self.tasks[reminder_id] = task
-        task.add_done_callback(
-            lambda finished_task, rid=reminder_id: self._forget_task(rid, finished_task)
-        )
-        return task
-
-    async def _run_scheduled_reminder(self, reminder: dict, delay: float) -> None:
-        try:
-            await asyncio.sleep(delay)
-            await self._deliver_reminder(reminder)
-        except asyncio.CancelledError:
-            raise
-        except Exception:
-            logger.exception("Falló la ejecución del recordatorio %s", reminder["id"])
+    def _delivered(self, reminder_id: str) -> bool:
+        """Ya se despachó: se está entregando o espera que el store lo marque."""
+        return self.scheduler.in_flight(reminder_id) or reminder_id in self.done_writer
 
     async def _deliver_reminder(self, reminder: dict) -> None:
+        reminder_id = str(reminder["id"])
         channel = None
         channel_id = str(reminder["channel_id"])
         if channel_id.isdigit():
             channel = self.bot.get_channel(int(channel_id))
             if channel is None:
-                with contextlib.suppress(
-                    discord.HTTPException, discord.Forbidden, discord.NotFound
-                ):
+                try:
                     channel = await self.bot.fetch_channel(int(channel_id))
+                except (discord.NotFound, discord.Forbidden):
+                    pass
+                except discord.HTTPException:
+                    # Falla pasajera de Discord: queda pendiente y la reconciliación lo reintenta.
+                    logger.warning(
+                        "No se pudo leer el canal %s del recordatorio %s", channel_id, reminder_id
+                    )
+                    return
 
         if channel is None:
-            logger.error("No se encontró el canal de recordatorios %s", channel_id)
-            return
-
-        await channel.send(
-            content=build_target_mentions(reminder["target_ids"]),
-            embed=build_reminder_delivery_embed(reminder),
-        )
-        await self.store.mark_done(str(reminder["id"]))
+            # El canal no existe o no es accesible: reintentar no lo arregla.
+            logger.error(
+                "No se encontró el canal de recordatorios %s; se descarta el recordatorio %s",
+                channel_id,
+                reminder_id,
+            )
+        else:
+            await self.outbound.send(
+                channel,
+                content=build_target_mentions(reminder["target_ids"]),
+                embed=build_reminder_delivery_embed(reminder),
+            )
+        self.done_writer.mark_done(reminder_id)
+        self.index.remove(reminder_id)
 
     @app_commands.command(name="remind", description="Crea un recordatorio")
     async def remind(self, interaction: discord.Interaction) -> None:
@@ -374,7 +565,13 @@ class Reminders(commands.Cog):
     @app_commands.command(
         name="reminders", description="Muestra tus recordatorios pendientes"
     )
-    async def show_reminders(self, interaction: discord.Interaction) -> None:
+    @app_commands.describe(para="Solo los que mencionan a esta persona")
+    @app_commands.choices(
+        para=[Choice(name="yo", value="yo"), Choice(name="ella", value="ella")]
+    )
+    async def show_reminders(
+        self, interaction: discord.Interaction, para: Choice[str] | None = None
+    ) -> None:
         if not self.is_configured():
             await interaction.response.send_message(
                 embed=build_error_embed(
@@ -384,8 +581,36 @@ class Reminders(commands.Cog):
             )
             return
 
+        target_id = None
+        if para is not None:
+            try:
+                target_id = resolve_target_ids(
+                    para.value, self.reminder_user_yo_id, self.reminder_user_ella_id
+                )[0]
+            except ValueError as exc:
+                await interaction.response.send_message(
+                    embed=build_error_embed(str(exc)), ephemeral=True
+                )
+                return
+
+        await self.show_reminders_page(
+            interaction, str(interaction.user.id), [None], target_id
+        )
+
+    async def show_reminders_page(
+        self,
+        interaction: discord.Interaction,
+        owner_id: str,
+        cursors: list[tuple[str, str] | None],
+        target_id: str | None = None,
+        *,
+        edit: bool = False,
+    ) -> None:
+        """Muestra la página que abre ``cursors[-1]`` (o reemplaza la actual)."""
         try:
-            pending = await self.store.get_pending()
+            page = await self.reminders_page(
+                owner_id, target_id=target_id, cursor=cursors[-1]
+            )
         except Exception:
             logger.exception("No se pudieron listar los recordatorios")
             await interaction.response.send_message(
@@ -396,21 +621,23 @@ class Reminders(commands.Cog):
             )
             return
 
-        reminders = filter_user_reminders(pending, interaction.user.id)
-        if not reminders:
+        paged = len(cursors) > 1 or page.next_cursor is not None
+        embed = build_reminders_list_embed(
+            page.items, page=len(cursors) if paged else None
+        )
+        view = None
+        if page.items:
+            view = ReminderListView(
+                self, page, owner_id, cursors=cursors, target_id=target_id
+            )
+        if edit:
+            await interaction.response.edit_message(embed=embed, view=view)
+        elif view is None:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        else:
             await interaction.response.send_message(
-                embed=build_reminders_list_embed([]),
-                ephemeral=True,
+                embed=embed, view=view, ephemeral=True
             )
-            return
-
-        await interaction.response.send_message(
-            embed=build_reminders_list_embed(reminders),
-            view=ReminderActionsView(
-                self, reminders, owner_id=str(interaction.user.id)
-            ),
-            ephemeral=True,
-        )
 
     async def handle_modal_submit(
         self,
@@ -461,7 +688,9 @@ class Reminders(commands.Cog):
             )
             return
 
-        self.schedule_reminder(reminder)
+        self.index.add(reminder)
+        if self.is_loaded(reminder):
+            self.schedule_reminder(reminder)
 
         await interaction.response.send_message(
             embed=build_reminder_confirmation_embed(reminder),
@@ -472,13 +701,9 @@ class Reminders(commands.Cog):
         )
 
     async def cancel_reminder(self, reminder_id: str) -> None:
-        task = self.tasks.pop(reminder_id, None)
-        if task is not None:
-            task.cancel()
-            with contextlib.suppress(asyncio.CancelledError):
-                await task
-
+        self.scheduler.cancel(reminder_id)
         await self.store.mark_done(reminder_id)
+        self.index.remove(reminder_id)
 
 
 async def setup(bot: commands.Bot) -> None:
@@ -0,0 +1,16 @@
+-- Índices parciales sobre los recordatorios pendientes (done = false).
+
+-- /reminders: filtro por creador y paginación keyset por (fire_at, id).
+create index if not exists reminders_pending_by_creator
+  on reminders (created_by, fire_at, id)
+  where done = false;
+
+-- /reminders para: <yo|ella>: filtro por mencionado (target_ids @> '{id}').
+create index if not exists reminders_pending_by_target
+  on reminders using gin (target_ids)
+  where done = false;
+
+-- Carga por ventanas del scheduler: done = false and fire_at <= ?.
+create index if not exists reminders_pending_by_fire_at
+  on reminders (fire_at)
+  where done = false;
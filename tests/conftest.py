@@ -1 +1,49 @@
 """Shared pytest fixtures for ssj-bot tests."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+
+import pytest
+
+from utils.queue_store import QueueStateWriter
+
+
+class FakeClock:
+    """Reloj inyectable (``clock=``) que solo avanza cuando el test cambia ``now``."""
+
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def fake_clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+async def close_queue_writers(monkeypatch: pytest.MonkeyPatch):
+    """Cancela al final de cada test los writers de cola que quedaron esperando.
+
+    Cada ``Music`` crea un ``QueueStateWriter`` y cualquier evento lo marca;
+    sin esto su task sobrevive al event loop del test. No se hace flush para
+    no escribir en el ``DATA_DIR`` real.
+    """
+    writers: list[QueueStateWriter] = []
+    init = QueueStateWriter.__init__
+
+    def tracking_init(self, *args, **kwargs) -> None:
+        init(self, *args, **kwargs)
+        writers.append(self)
+
+    monkeypatch.setattr(QueueStateWriter, "__init__", tracking_init)
+    yield
+    for writer in writers:
+        task = writer._task
+        if task is not None and not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import wavelink
+
+from tests.test_playlist_snapshots import make_track
+from utils.compact_queue import CompactQueue, QueueListing, TrackColumns
+from utils.track_codec import pack_track
+from utils.ui import QueueJumpModal, QueuePaginationView, build_queue_embed
+
+
+def make_queue(count: int) -> CompactQueue:
+    queue = CompactQueue()
+    queue.put([make_track(f"id{i}", f"Song {i}") for i in range(count)])
+    return queue
+
+
+def test_get_rebuilds_playable_in_order() -> None:
+    queue = make_queue(3)
+
+    track = queue.get()
+
+    assert isinstance(track, wavelink.Playable)
+    assert (track.identifier, track.title, track.encoded) == ("id0", "Song 0", "QAAAid0")
+    assert track.length == 254000
+    assert track.artwork == "https://i.ytimg.com/vi/x/hq.jpg"
+    assert queue.count == 2
+
+
+def test_accepts_snapshot_rows_without_playables() -> None:
+    queue = CompactQueue()
+
+    queue.put([pack_track(make_track("a")), pack_track(make_track("b"))])
+
+    assert queue.titles() == ["Cha-La Head-Cha-La"] * 2
+    assert queue.columns.row(0).artwork == "https://i.ytimg.com/vi/x/hq.jpg"
+    restored = queue.get()
+    assert restored.identifier == "a"
+    assert restored.artwork == "https://i.ytimg.com/vi/x/hq.jpg"
+
+
+def test_rejects_other_items() -> None:
+    with pytest.raises(TypeError):
+        CompactQueue().put("not a track")
+
+
+def test_repeated_authors_and_sources_are_interned() -> None:
+    queue = make_queue(3)
+
+    authors = queue.columns.author
+    assert authors[0] is authors[1] is authors[2]
+
+
+def test_remove_and_delete_work_on_columns() -> None:
+    queue = make_queue(5)
+
+    assert queue.remove(make_track("id1")) == 1
+    queue.delete(0)
+
+    assert queue.titles() == ["Song 2", "Song 3", "Song 4"]
+    assert make_track("id3") in queue
+    assert queue.index(make_track("id4")) == 2
+
+
+def test_shuffle_keeps_columns_aligned() -> None:
+    queue = make_queue(50)
+
+    queue.shuffle()
+
+    for i in range(len(queue)):
+        identifier = queue.columns.identifier[i]
+        assert queue.columns.title[i] == f"Song {identifier[2:]}"
+        assert queue.columns.encoded[i] == f"QAAA{identifier}"
+
+
+def test_loop_all_refills_from_compact_history() -> None:
+    queue = make_queue(0)
+    queue.history.put([make_track("a"), make_track("b")])
+    queue.mode = wavelink.QueueMode.loop_all
+
+    assert queue.get().identifier == "a"
+    assert queue.count == 1
+    assert isinstance(queue.history, CompactQueue)
+
+
+def test_swap_and_put_at() -> None:
+    queue = make_queue(3)
+
+    queue.swap(0, 2)
+    queue.put_at(1, make_track("new", "New"))
+
+    assert queue.titles() == ["Song 2", "New", "Song 1", "Song 0"]
+
+
+def test_columns_use_less_memory_than_playables() -> None:
+    import sys
+
+    tracks = [make_track(f"id{i}", f"Song {i}") for i in range(200)]
+    playable_size = sum(sys.getsizeof(t) + sys.getsizeof(t.__dict__) + sys.getsizeof(t.raw_data) for t in tracks)
+
+    assert TrackColumns(tracks).memory_size() < playable_size
+
+
+def test_listing_reads_only_the_requested_page() -> None:
+    queue = make_queue(25)
+    listing = QueueListing(queue)
+
+    embed = build_queue_embed(listing, "Now", page=3)
+
+    assert len(listing) == 25
+    assert listing[20:25] == [{"title": f"Song {i}"} for i in range(20, 25)]
+    assert "21. Song 20" in embed.description
+    assert "Página 3/3 · 25 canciones en cola" in embed.footer.text
+
+
+def test_listing_is_live() -> None:
+    queue = make_queue(2)
+    listing = QueueListing(queue)
+
+    queue.put(make_track("late", "Late"))
+
+    assert listing[-1] == {"title": "Late"}
+
+
+def test_listing_works_with_plain_wavelink_queue() -> None:
+    queue = wavelink.Queue()
+    queue.put([make_track("a", "A"), make_track("b", "B")])
+
+    assert QueueListing(queue)[0:2] == [{"title": "A"}, {"title": "B"}]
+
+
+def test_move_shifts_the_rest() -> None:
+    queue = make_queue(4)
+
+    queue.move(3, 0)
+    queue.move(1, 2)
+
+    assert queue.titles() == ["Song 3", "Song 1", "Song 0", "Song 2"]
+
+
+def test_delete_range_is_end_exclusive() -> None:
+    queue = make_queue(6)
+
+    assert queue.delete_range(1, 4) == 3
+    assert queue.titles() == ["Song 0", "Song 4", "Song 5"]
+
+
+def test_dedupe_keeps_first_occurrence() -> None:
+    queue = CompactQueue()
+    queue.put([make_track(i, f"Song {i}") for i in ("a", "b", "a", "c", "b")])
+
+    assert queue.dedupe() == 2
+    assert queue.titles() == ["Song a", "Song b", "Song c"]
+    assert queue.dedupe() == 0
+
+
+def test_positional_delete_removes_the_right_duplicate() -> None:
+    queue = CompactQueue()
+    queue.put([make_track("a", "First"), make_track("b"), make_track("a", "Second")])
+
+    queue.delete(2)
+
+    assert queue.titles() == ["First", "Cha-La Head-Cha-La"]
+
+
+def test_positional_ops_on_large_queue_do_not_build_playables(monkeypatch: pytest.MonkeyPatch) -> None:
+    queue = make_queue(10_000)
+    monkeypatch.setattr(TrackColumns, "_playable", lambda self, i: pytest.fail("built a Playable"))
+
+    queue.move(9_999, 0)
+    queue.delete(5_000)
+    queue.delete_range(100, 200)
+    queue.dedupe()
+    queue.shuffle()
+
+    assert queue.count == 10_000 - 101
+
+
+def make_interaction() -> MagicMock:
+    interaction = MagicMock()
+    interaction.response.edit_message = AsyncMock()
+    interaction.response.send_message = AsyncMock()
+    interaction.response.send_modal = AsyncMock()
+    return interaction
+
+
+def shown_embed(interaction: MagicMock):
+    return interaction.response.edit_message.call_args.kwargs["embed"]
+
+
+@pytest.mark.asyncio
+async def test_pagination_first_last_and_jump() -> None:
+    view = QueuePaginationView(QueueListing(make_queue(45)), "Now")
+    interaction = make_interaction()
+
+    await view.last_button.callback(interaction)
+    assert "Página 5/5" in shown_embed(interaction).footer.text
+    assert view.next_button.disabled and view.last_button.disabled
+
+    await view.first_button.callback(interaction)
+    assert "1. Song 0" in shown_embed(interaction).description
+    assert view.first_button.disabled and view.prev_button.disabled
+
+    await view.jump_button.callback(interaction)
+    modal = interaction.response.send_modal.call_args.args[0]
+    assert isinstance(modal, QueueJumpModal)
+    modal.page_input._value = "3"
+    await modal.on_submit(interaction)
+    assert "21. Song 20" in shown_embed(interaction).description
+
+
+@pytest.mark.asyncio
+async def test_jump_clamps_and_rejects_non_numbers() -> None:
+    view = QueuePaginationView(QueueListing(make_queue(25)), "Now")
+    interaction = make_interaction()
+    modal = QueueJumpModal(view)
+
+    modal.page_input._value = "99"
+    await modal.on_submit(interaction)
+    assert view.current_page == 3
+
+    modal.page_input._value = "abc"
+    await modal.on_submit(interaction)
+    assert interaction.response.send_message.call_args.kwargs["ephemeral"] is True
+    assert view.current_page == 3
+
+
+@pytest.mark.asyncio
+async def test_pagination_follows_the_live_queue() -> None:
+    queue = make_queue(30)
+    current = {"title": "First"}
+    view = QueuePaginationView(QueueListing(queue), lambda: current["title"])
+    interaction = make_interaction()
+    await view.last_button.callback(interaction)
+
+    queue.delete_range(0, 25)
+    current["title"] = "Second"
+    await view.prev_button.callback(interaction)
+
+    embed = shown_embed(interaction)
+    assert view.current_page == 1
+    assert "▶ Ahora: Second" in embed.description
+    assert "1. Song 25" in embed.description
+    assert "Página 1/1 · 5 canciones en cola" in embed.footer.text
+
+
+@pytest.mark.asyncio
+async def test_page_render_cost_does_not_depend_on_queue_size(monkeypatch: pytest.MonkeyPatch) -> None:
+    queue = make_queue(5_000)
+    view = QueuePaginationView(QueueListing(queue), "Now")
+    monkeypatch.setattr(TrackColumns, "_playable", lambda self, i: pytest.fail("built a Playable"))
+    read: list[tuple] = []
+    titles = queue.titles
+    monkeypatch.setattr(queue, "titles", lambda start=0, stop=None: read.append((start, stop)) or titles(start, stop))
+
+    await view.last_button.callback(make_interaction())
+
+    assert read == [(4_990, 5_000)]
@@ -9,6 +9,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from cogs.music_cog import Music
+from utils.music_state import GuildStateRegistry
 
 
 # ---------------------------------------------------------------------------
@@ -111,7 +112,7 @@ async def test_pause_not_playing_sends_warning_embed():
 async def test_stop_happy_path_uses_info_embed():
     """!stop exitoso debe usar embed (info), no texto plano."""
     cog = Music.__new__(Music)
-    cog._text_channels = {}
+    cog._guilds = GuildStateRegistry()
 
     ctx = MagicMock()
     ctx.guild = MagicMock(id=1)
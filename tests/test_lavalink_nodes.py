@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import wavelink
+
+from utils.lavalink_nodes import (
+    NodeBalancer,
+    NodeConfig,
+    NodeHealth,
+    NodeLoad,
+    parse_node_configs,
+)
+
+
+def make_node(identifier: str, *, connected: bool = True, players: int = 0) -> MagicMock:
+    node = MagicMock(spec=wavelink.Node)
+    node.identifier = identifier
+    node.status = wavelink.NodeStatus.CONNECTED if connected else wavelink.NodeStatus.DISCONNECTED
+    node.players = {i: MagicMock() for i in range(players)}
+    node.fetch_stats = AsyncMock()
+    return node
+
+
+def make_stats(*, players=0, playing=0, system_load=0.0, deficit=0, nulled=0) -> MagicMock:
+    stats = MagicMock(spec=wavelink.StatsResponsePayload)
+    stats.players = players
+    stats.playing = playing
+    stats.cpu = MagicMock(system_load=system_load, cores=4)
+    stats.frames = MagicMock(deficit=deficit, nulled=nulled)
+    return stats
+
+
+class TestParseNodeConfigs:
+    def test_single_node(self):
+        assert parse_node_configs("http://lavalink:2333", "pw") == [
+            NodeConfig("lavalink:2333", "http://lavalink:2333", "pw")
+        ]
+
+    def test_shared_password_for_all_nodes(self):
+        configs = parse_node_configs("http://a:2333, http://b:2333", "pw")
+
+        assert [c.identifier for c in configs] == ["a:2333", "b:2333"]
+        assert {c.password for c in configs} == {"pw"}
+
+    def test_one_password_per_node(self):
+        configs = parse_node_configs("http://a:2333,http://b:2333", "one,two")
+
+        assert [c.password for c in configs] == ["one", "two"]
+
+    def test_mismatched_passwords_raise(self):
+        with pytest.raises(ValueError):
+            parse_node_configs("http://a:2333,http://b:2333,http://c:2333", "one,two")
+
+    def test_duplicate_hosts_get_unique_identifiers(self):
+        configs = parse_node_configs("http://a:2333,http://a:2333", "pw")
+
+        assert len({c.identifier for c in configs}) == 2
+
+
+class TestNodeLoad:
+    def test_penalty_grows_with_cpu_and_frame_loss(self):
+        idle = NodeLoad(playing=5)
+        busy_cpu = NodeLoad(playing=5, system_load=0.9)
+        dropping = NodeLoad(playing=5, deficit=1500)
+
+        assert idle.penalty() == pytest.approx(5)
+        assert busy_cpu.penalty() > idle.penalty()
+        assert dropping.penalty() > busy_cpu.penalty()
+
+
+class TestNodeBalancer:
+    @pytest.mark.asyncio
+    async def test_best_node_prefers_lowest_penalty(self):
+        a, b = make_node("a"), make_node("b")
+        a.fetch_stats.return_value = make_stats(playing=3, system_load=0.8)
+        b.fetch_stats.return_value = make_stats(playing=6, system_load=0.1)
+        balancer = NodeBalancer([a, b])
+
+        await balancer.refresh()
+
+        assert balancer.best_node() is b
+
+    def test_without_stats_falls_back_to_local_player_count(self):
+        a, b = make_node("a", players=4), make_node("b", players=1)
+
+        assert NodeBalancer([a, b]).best_node() is b
+
+    @pytest.mark.asyncio
+    async def test_players_placed_since_last_poll_count_as_load(self):
+        a, b = make_node("a"), make_node("b")
+        a.fetch_stats.return_value = make_stats(playing=0)
+        b.fetch_stats.return_value = make_stats(playing=2)
+        balancer = NodeBalancer([a, b])
+        await balancer.refresh()
+
+        a.players = {i: MagicMock() for i in range(5)}
+
+        assert balancer.best_node() is b
+
+    def test_disconnected_node_is_unhealthy_and_skipped(self):
+        a, b = make_node("a", connected=False), make_node("b", players=10)
+        balancer = NodeBalancer([a, b])
+
+        assert balancer.health(a) is NodeHealth.UNHEALTHY
+        assert balancer.best_node() is b
+
+    @pytest.mark.asyncio
+    async def test_failing_stats_mark_node_degraded(self):
+        a, b = make_node("a"), make_node("b", players=3)
+        a.fetch_stats.side_effect = RuntimeError("boom")
+        b.fetch_stats.return_value = make_stats(playing=3)
+        balancer = NodeBalancer([a, b])
+
+        await balancer.refresh()
+
+        assert balancer.health(a) is NodeHealth.DEGRADED
+        assert balancer.health(b) is NodeHealth.HEALTHY
+        assert balancer.best_node() is b
+
+    @pytest.mark.asyncio
+    async def test_degraded_node_used_when_nothing_healthy(self):
+        a = make_node("a")
+        a.fetch_stats.return_value = make_stats(deficit=3000)
+        balancer = NodeBalancer([a, make_node("b", connected=False)])
+
+        await balancer.refresh()
+
+        assert balancer.health(a) is NodeHealth.DEGRADED
+        assert balancer.best_node() is a
+
+    def test_no_connected_nodes(self):
+        assert NodeBalancer([make_node("a", connected=False)]).best_node() is None
+
+    @pytest.mark.asyncio
+    async def test_report_lists_every_node(self):
+        a = make_node("a")
+        a.fetch_stats.return_value = make_stats(playing=1, system_load=0.2)
+        balancer = NodeBalancer([a, make_node("b", connected=False)])
+        await balancer.refresh()
+
+        report = {row["identifier"]: row for row in balancer.report()}
+
+        assert report["a"]["health"] == "healthy"
+        assert report["a"]["playing"] == 1
+        assert report["b"]["health"] == "unhealthy"
+
+
+class TestDrainAndLoss:
+    def test_draining_node_gets_no_new_players(self):
+        a, b = make_node("a"), make_node("b", players=5)
+        balancer = NodeBalancer([a, b], client=MagicMock())
+
+        balancer.drain(a)
+
+        assert balancer.health(a) is NodeHealth.DRAINING
+        assert balancer.best_node() is b
+        balancer.client.dispatch.assert_called_once_with("lavalink_node_unavailable", a)
+
+        balancer.undrain(a)
+        assert balancer.best_node() is a
+
+    def test_best_node_can_exclude_a_node(self):
+        a, b = make_node("a"), make_node("b", players=5)
+
+        assert NodeBalancer([a, b]).best_node(exclude=a) is b
+
+    def test_check_connections_reports_lost_nodes_once(self):
+        a, b = make_node("a"), make_node("b")
+        client = MagicMock()
+        balancer = NodeBalancer([a, b], client=client)
+        balancer.check_connections()
+
+        a.status = wavelink.NodeStatus.CONNECTING
+        assert balancer.check_connections() == [a]
+        assert balancer.check_connections() == []
+
+        client.dispatch.assert_called_once_with("lavalink_node_unavailable", a)
+
+    def test_node_that_never_connected_is_not_reported(self):
+        client = MagicMock()
+        balancer = NodeBalancer([make_node("a", connected=False)], client=client)
+
+        assert balancer.check_connections() == []
+        client.dispatch.assert_not_called()
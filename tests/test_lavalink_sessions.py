@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import bot as bot_module
+from utils.lavalink_sessions import LavalinkSessionStore
+
+
+@pytest.mark.asyncio
+async def test_store_round_trip(tmp_path) -> None:
+    store = LavalinkSessionStore(str(tmp_path / "state" / "bot.sqlite3"))
+
+    assert await store.load() == {}
+
+    await store.save("lavalink:2333", "abc")
+    await store.save("lavalink-2:2333", "def")
+    await store.save("lavalink:2333", "xyz")
+
+    assert await LavalinkSessionStore(store.path).load() == {
+        "lavalink:2333": "xyz",
+        "lavalink-2:2333": "def",
+    }
+
+
+@pytest.mark.asyncio
+async def test_bot_saves_session_id_on_node_ready() -> None:
+    fake_bot = MagicMock()
+    fake_bot.lavalink_sessions = MagicMock()
+    fake_bot.lavalink_sessions.save = AsyncMock()
+    payload = MagicMock(session_id="abc")
+    payload.node.identifier = "lavalink:2333"
+
+    await bot_module.SSJBot.on_wavelink_node_ready(fake_bot, payload)
+
+    fake_bot.lavalink_sessions.save.assert_awaited_once_with("lavalink:2333", "abc")
+
+
+@pytest.mark.asyncio
+async def test_bot_ignores_session_save_errors() -> None:
+    fake_bot = MagicMock()
+    fake_bot.lavalink_sessions = MagicMock()
+    fake_bot.lavalink_sessions.save = AsyncMock(side_effect=OSError("read-only"))
+
+    await bot_module.SSJBot.on_wavelink_node_ready(fake_bot, MagicMock())
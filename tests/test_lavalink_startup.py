@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import bot as bot_module
+from bot import bot
+
+
+@pytest.mark.asyncio
+async def test_invalid_node_config_fails_setup_hook(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LAVALINK_URI", "http://a:2333,http://b:2333,http://c:2333")
+    monkeypatch.setenv("LAVALINK_PASSWORD", "uno,dos")
+
+    with patch.object(bot, "load_extension", AsyncMock()) as load_extension, \
+         patch.object(bot, "_connect_lavalink", AsyncMock()) as connect:
+        with pytest.raises(ValueError, match="LAVALINK_PASSWORD"):
+            await bot.setup_hook()
+
+    load_extension.assert_not_awaited()
+    connect.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_setup_hook_passes_parsed_nodes_to_the_connection_task(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("LAVALINK_URI", "http://a:2333,http://b:2333")
+    monkeypatch.setenv("LAVALINK_PASSWORD", "secreto")
+
+    with patch.object(bot, "load_extension", AsyncMock()), \
+         patch.object(bot, "add_view"), \
+         patch.object(bot, "_connect_lavalink", AsyncMock()) as connect:
+        await bot.setup_hook()
+        await bot._lavalink_task
+
+    configs, = connect.await_args.args
+    assert [c.identifier for c in configs] == ["a:2333", "b:2333"]
+
+
+@pytest.mark.asyncio
+async def test_connection_task_errors_are_logged(caplog: pytest.LogCaptureFixture) -> None:
+    async def broken() -> None:
+        raise RuntimeError("sqlite roto")
+
+    task = asyncio.create_task(broken())
+    task.add_done_callback(bot_module._log_lavalink_task_error)
+
+    with caplog.at_level(logging.ERROR, logger="ssj-bot"):
+        with pytest.raises(RuntimeError):
+            await task
+        await asyncio.sleep(0)
+
+    assert "No se pudo iniciar la conexión a Lavalink" in caplog.text
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import asyncio
+
+import pytest
+import wavelink
+
+from tests.conftest import FakeClock
+from utils import lavalink_supervisor as supervisor_module
+from utils.lavalink_nodes import NodeBalancer
+from utils.lavalink_supervisor import Backoff, ConnectionState, LavalinkSupervisor
+
+
+class StopLoop(Exception):
+    pass
+
+
+def make_node(identifier: str = "a:2333", *, connected: bool = False) -> MagicMock:
+    node = MagicMock(spec=wavelink.Node)
+    node.identifier = identifier
+    node.status = wavelink.NodeStatus.CONNECTED if connected else wavelink.NodeStatus.DISCONNECTED
+    node.session_id = "sess" if connected else None
+    node._session_id = node.session_id
+    node._players = {}
+    node._connect = AsyncMock()
+    return node
+
+
+def fake_sleep(clock: FakeClock, sleeps: list[float], *, limit: int):
+    async def sleep(delay: float) -> None:
+        sleeps.append(delay)
+        clock.now += delay
+        if len(sleeps) >= limit:
+            raise StopLoop
+
+    return sleep
+
+
+class TestBackoff:
+    def test_grows_exponentially_up_to_cap(self):
+        backoff = Backoff(base=1.0, cap=8.0, rand=lambda: 1.0)
+
+        assert [backoff.next_delay() for _ in range(6)] == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+
+    def test_jitter_keeps_at_least_half_the_delay(self):
+        backoff = Backoff(base=1.0, cap=60.0, rand=lambda: 0.0)
+
+        assert [backoff.next_delay() for _ in range(3)] == [0.5, 1.0, 2.0]
+
+    def test_reset_starts_over(self):
+        backoff = Backoff(base=1.0, cap=60.0, rand=lambda: 1.0)
+        backoff.next_delay()
+        backoff.next_delay()
+
+        backoff.reset()
+
+        assert backoff.next_delay() == 1.0
+
+
+class TestLavalinkSupervisor:
+    def test_retry_eta_only_while_reconnecting(self, fake_clock: FakeClock):
+        node = make_node()
+        supervisor = LavalinkSupervisor(MagicMock(), [node], clock=fake_clock)
+        watch = supervisor._watches[node.identifier]
+
+        assert supervisor.retry_eta() is None
+
+        watch.state = ConnectionState.RECONNECTING
+        watch.next_attempt_at = 10.0
+        fake_clock.now = 4.0
+
+        assert supervisor.retry_eta() == 6.0
+
+    def test_retry_eta_uses_the_soonest_node(self, fake_clock: FakeClock):
+        first, second = make_node("a:2333"), make_node("b:2333")
+        supervisor = LavalinkSupervisor(MagicMock(), [first, second], clock=fake_clock)
+        for identifier, at in (("a:2333", 30.0), ("b:2333", 5.0)):
+            watch = supervisor._watches[identifier]
+            watch.state = ConnectionState.RECONNECTING
+            watch.next_attempt_at = at
+
+        assert supervisor.retry_eta() == 5.0
+
+    def test_available_when_any_node_is_connected(self):
+        down, up = make_node("a:2333"), make_node("b:2333", connected=True)
+
+        assert LavalinkSupervisor(MagicMock(), [down, up]).available
+        assert not LavalinkSupervisor(MagicMock(), [down]).available
+
+    def test_restore_brings_back_session_and_players_still_on_the_node(self):
+        node, other = make_node(), make_node("b:2333", connected=True)
+        supervisor = LavalinkSupervisor(MagicMock(), [node])
+        watch = supervisor._watches[node.identifier]
+        stays, moved = MagicMock(_node=node), MagicMock(_node=other)
+        watch.session_id = "sess"
+        watch.players = {1: stays, 2: moved}
+
+        supervisor._restore(watch)
+
+        assert node._session_id == "sess"
+        assert node._players == {1: stays}
+
+    @pytest.mark.asyncio
+    async def test_retries_with_backoff_until_connected(self, monkeypatch: pytest.MonkeyPatch, fake_clock: FakeClock):
+        sleeps: list[float] = []
+        monkeypatch.setattr(supervisor_module.asyncio, "sleep", fake_sleep(fake_clock, sleeps, limit=4))
+        node = make_node()
+        attempts = 0
+
+        async def connect(*, client):
+            nonlocal attempts
+            attempts += 1
+            if attempts == 2:
+                node.status = wavelink.NodeStatus.CONNECTED
+                node.session_id = "new"
+
+        node._connect.side_effect = connect
+        supervisor = LavalinkSupervisor(MagicMock(), [node], base=1.0, cap=60.0, rand=lambda: 1.0, clock=fake_clock)
+        watch = supervisor._watches[node.identifier]
+
+        with patch.object(supervisor_module.wavelink.Pool, "connect", AsyncMock()) as pool_connect:
+            with pytest.raises(StopLoop):
+                await supervisor._supervise(watch)
+
+        pool_connect.assert_awaited_once()
+        # Dos esperas con backoff (1s, 2s), luego el ciclo de vigilancia del nodo conectado.
+        assert sleeps[:3] == [1.0, 2.0, supervisor.watch_interval]
+        assert supervisor.state(node) is ConnectionState.CONNECTED
+        assert watch.backoff.attempts == 0
+        assert watch.session_id == "new"
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_does_not_stop_the_loop(self, monkeypatch: pytest.MonkeyPatch, fake_clock: FakeClock):
+        sleeps: list[float] = []
+        monkeypatch.setattr(supervisor_module.asyncio, "sleep", fake_sleep(fake_clock, sleeps, limit=3))
+        node = make_node()
+        node._connect.side_effect = wavelink.NodeException()
+        supervisor = LavalinkSupervisor(MagicMock(), [node], rand=lambda: 1.0, clock=fake_clock)
+
+        with patch.object(supervisor_module.wavelink.Pool, "connect", AsyncMock(side_effect=RuntimeError)):
+            with pytest.raises(StopLoop):
+                await supervisor._supervise(supervisor._watches[node.identifier])
+
+        assert node._connect.await_count == 2
+        assert supervisor.state(node) is ConnectionState.RECONNECTING
+
+    @pytest.mark.asyncio
+    async def test_lost_node_is_reported_with_its_players_restored(self):
+        node = make_node(connected=True)
+        node.fetch_stats = AsyncMock(side_effect=RuntimeError("no stats"))
+        player = MagicMock(_node=node)
+        node._players = {1: player}
+        client = MagicMock()
+        seen: list[dict] = []
+        client.dispatch.side_effect = lambda event, lost: seen.append(dict(lost._players))
+        balancer = NodeBalancer([node], client=client, watch_interval=0.001, watch_connections=False)
+        supervisor = LavalinkSupervisor(
+            client, [node], watch_interval=0.001, base=60.0, on_lost=balancer.node_lost
+        )
+
+        with patch.object(supervisor_module.wavelink.Pool, "connect", AsyncMock()):
+            supervisor.start()
+            balancer.start()
+            await asyncio.sleep(0.02)
+            # Lo que hace Websocket.cleanup() de wavelink al caerse el socket con retries=0.
+            node.status = wavelink.NodeStatus.DISCONNECTED
+            node._session_id = None
+            node._players = {}
+            await asyncio.sleep(0.02)
+            await balancer.close()
+            await supervisor.close()
+
+        client.dispatch.assert_called_once_with("lavalink_node_unavailable", node)
+        assert seen == [{1: player}]
+        assert node._session_id == "sess"
+
+    @pytest.mark.asyncio
+    async def test_close_stops_tasks(self):
+        node = make_node(connected=True)
+        supervisor = LavalinkSupervisor(MagicMock(), [node], watch_interval=60.0)
+
+        with patch.object(supervisor_module.wavelink.Pool, "connect", AsyncMock()):
+            supervisor.start()
+            await supervisor.close()
+
+        assert supervisor.states == {node.identifier: ConnectionState.STOPPED}
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from utils.local_db import LocalDatabase
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+
+
+def test_creates_directory_and_schema(tmp_path) -> None:
+    db = LocalDatabase(str(tmp_path / "nested" / "bot.sqlite3"), SCHEMA)
+
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO items VALUES ('a', '1')")
+    with db.transaction() as conn:
+        assert conn.execute("SELECT value FROM items WHERE key = 'a'").fetchone() == ("1",)
+
+
+def test_connection_is_closed_after_the_transaction(tmp_path) -> None:
+    db = LocalDatabase(str(tmp_path / "bot.sqlite3"), SCHEMA)
+
+    with db.transaction() as conn:
+        pass
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+def test_failed_transaction_rolls_back_and_closes(tmp_path) -> None:
+    db = LocalDatabase(str(tmp_path / "bot.sqlite3"), SCHEMA)
+
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO items VALUES ('a', '1')")
+            raise RuntimeError("boom")
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    with db.transaction() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone() == (0,)
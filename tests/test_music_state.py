@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from tests.conftest import FakeClock
+from utils.music_state import GuildMusicState, GuildStateRegistry
+
+
+def test_state_uses_slots() -> None:
+    state = GuildMusicState(1, 0.0)
+
+    assert not hasattr(state, "__dict__")
+    with pytest.raises(AttributeError):
+        state.text_channel = object()  # type: ignore[attr-defined]
+
+
+def test_ensure_creates_state_once() -> None:
+    registry = GuildStateRegistry()
+
+    state = registry.ensure(1)
+
+    assert registry.ensure(1) is state
+    assert 1 in registry
+    assert len(registry) == 1
+
+
+def test_touch_bumps_last_activity(fake_clock: FakeClock) -> None:
+    registry = GuildStateRegistry(clock=fake_clock)
+    state = registry.ensure(1)
+
+    fake_clock.now = 42.0
+    registry.touch(1)
+
+    assert state.last_activity == 42.0
+
+
+def test_evict_idle_drops_only_stale_inactive_guilds(fake_clock: FakeClock) -> None:
+    active = {2}
+    registry = GuildStateRegistry(idle_ttl=10, is_active=active.__contains__, clock=fake_clock)
+    registry.ensure(1)
+    registry.ensure(2)
+    registry.ensure(3)
+
+    fake_clock.now = 5.0
+    registry.touch(3)
+    fake_clock.now = 11.0
+
+    assert registry.evict_idle() == [1]
+    assert 1 not in registry
+    assert 2 in registry and 3 in registry
+    assert registry.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_evict_idle_keeps_guilds_with_running_tasks(fake_clock: FakeClock) -> None:
+    registry = GuildStateRegistry(idle_ttl=10, clock=fake_clock)
+    state = registry.ensure(1)
+    state.loading_task = asyncio.create_task(asyncio.sleep(3600))
+
+    fake_clock.now = 60.0
+    assert registry.evict_idle() == []
+
+    registry.discard(1)
+    await asyncio.sleep(0)
+
+
+def test_ensure_sweeps_at_most_once_per_interval(fake_clock: FakeClock) -> None:
+    registry = GuildStateRegistry(idle_ttl=10, sweep_interval=30, clock=fake_clock)
+    registry.ensure(1)
+
+    fake_clock.now = 25.0
+    registry.ensure(2)
+    assert 1 in registry
+
+    fake_clock.now = 31.0
+    registry.ensure(3)
+    assert 1 not in registry
+    assert 2 in registry
+
+
+def test_touch_sweeps_without_new_guilds(fake_clock: FakeClock) -> None:
+    registry = GuildStateRegistry(idle_ttl=10, sweep_interval=30, clock=fake_clock)
+    registry.ensure(1)
+    registry.ensure(2)
+
+    fake_clock.now = 31.0
+    registry.touch(2)
+
+    assert 1 not in registry
+    assert 2 in registry
+
+
+@pytest.mark.asyncio
+async def test_periodic_sweep_evicts_with_no_activity(fake_clock: FakeClock) -> None:
+    registry = GuildStateRegistry(idle_ttl=10, sweep_interval=0.01, clock=fake_clock)
+    registry.ensure(1)
+    registry.start()
+
+    fake_clock.now = 11.0
+    await asyncio.sleep(0.05)
+    registry.close()
+
+    assert 1 not in registry
+    assert registry.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_discard_cancels_tasks() -> None:
+    registry = GuildStateRegistry()
+    state = registry.ensure(1)
+    np_task = asyncio.create_task(asyncio.sleep(3600))
+    loading_task = asyncio.create_task(asyncio.sleep(3600))
+    state.np_task = np_task
+    state.loading_task = loading_task
+    state.np_request = (object(), object())
+
+    assert registry.discard(1) is state
+    await asyncio.sleep(0)
+
+    assert np_task.cancelled() and loading_task.cancelled()
+    assert state.np_request is None
+    assert registry.discard(1) is None
+
+
+def test_memory_report_per_guild() -> None:
+    registry = GuildStateRegistry()
+    registry.ensure(1)
+    busy = registry.ensure(2)
+    busy.text_channel_id = 123456789012345678
+    busy.now_playing_message_id = 876543210987654321
+
+    report = registry.memory_report()
+
+    assert set(report) == {1, 2}
+    assert report[2] > report[1] > 0
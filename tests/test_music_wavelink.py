@@ -1,5 +1,8 @@
 """Tests para el Music cog con Wavelink."""
 import asyncio
+import sys
+import time
+from contextlib import suppress
 
 import discord
 import pytest
@@ -64,11 +67,19 @@ class TestMusicCogInit:
         from cogs.music_cog import Music
         bot = make_bot()
         cog = Music(bot)
-        assert hasattr(cog, "_text_channels")
-        assert isinstance(cog._text_channels, dict)
+        assert isinstance(cog._guilds, GuildStateRegistry)
+        assert len(cog._guilds) == 0
 
 
-from cogs.music_cog import Music, _track_to_song
+import cogs.music_cog as music_cog_module
+from utils.music_state import GuildStateRegistry
+from cogs.music_cog import Music, _song_key, _track_to_song
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """Los stores SQLite del cog escriben en un directorio temporal, nunca en ``data/``."""
+    monkeypatch.setattr(music_cog_module, "DATA_DIR", str(tmp_path))
 
 
 class TestTrackToSong:
@@ -134,6 +145,28 @@ class TestPlayCommand:
             await cog.play.callback(cog, ctx, query="test song")
         ctx.send.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_play_while_reconnecting_shows_retry_eta(self):
+        bot = make_bot()
+        bot.lavalink_supervisor.retry_eta.return_value = 3.2
+        cog = Music(bot)
+        ctx = make_ctx()
+        with patch.object(Music, "_is_lavalink_available", return_value=False):
+            await cog.play.callback(cog, ctx, query="test song")
+        embed = ctx.send.call_args.kwargs["embed"]
+        assert "~4s" in embed.description
+
+    @pytest.mark.asyncio
+    async def test_play_unavailable_without_scheduled_retry(self):
+        bot = make_bot()
+        bot.lavalink_supervisor = None
+        cog = Music(bot)
+        ctx = make_ctx()
+        with patch.object(Music, "_is_lavalink_available", return_value=False):
+            await cog.play.callback(cog, ctx, query="test song")
+        embed = ctx.send.call_args.kwargs["embed"]
+        assert embed.description == "El sistema de música no está disponible ahora."
+
     @pytest.mark.asyncio
     async def test_play_no_results(self):
         bot = make_bot()
@@ -253,12 +286,92 @@ class TestStopCommand:
         ctx = make_ctx()
         player = make_player()
         ctx.voice_client = player
-        cog._text_channels[123] = ctx.channel
+        cog._set_text_channel(ctx)
         await cog.stop.callback(cog, ctx)
         player.queue.clear.assert_called_once()
         player.stop.assert_called_once()
         player.disconnect.assert_called_once()
-        assert 123 not in cog._text_channels
+        assert 123 not in cog._guilds
+
+
+class TestQueueCommands:
+    def _player(self, count):
+        from tests.test_playlist_snapshots import make_track
+        from utils.compact_queue import CompactQueue
+        player = make_player()
+        player.playing = True
+        player.queue = CompactQueue()
+        player.queue.put([make_track(f"id{i}", f"Song {i}") for i in range(count)])
+        return player
+
+    @pytest.mark.asyncio
+    async def test_remove_deletes_by_position(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        ctx.voice_client = self._player(3)
+
+        await cog.remove.callback(cog, ctx, position=2)
+
+        assert ctx.voice_client.queue.titles() == ["Song 0", "Song 2"]
+        assert "Song 1" in ctx.send.call_args.kwargs["embed"].description
+
+    @pytest.mark.asyncio
+    async def test_move_uses_one_based_positions(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        ctx.voice_client = self._player(3)
+
+        await cog.move.callback(cog, ctx, from_position=3, to_position=1)
+
+        assert ctx.voice_client.queue.titles() == ["Song 2", "Song 0", "Song 1"]
+        assert "posición 1" in ctx.send.call_args.kwargs["embed"].description
+
+    @pytest.mark.asyncio
+    async def test_move_rejects_out_of_range(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        ctx.voice_client = self._player(3)
+
+        await cog.move.callback(cog, ctx, from_position=1, to_position=4)
+
+        assert ctx.voice_client.queue.titles() == ["Song 0", "Song 1", "Song 2"]
+        assert "inválida" in ctx.send.call_args.kwargs["embed"].description
+
+    @pytest.mark.asyncio
+    async def test_removerange_is_inclusive(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        ctx.voice_client = self._player(5)
+
+        await cog.removerange.callback(cog, ctx, start=2, end=4)
+
+        assert ctx.voice_client.queue.titles() == ["Song 0", "Song 4"]
+        assert ctx.send.call_args.kwargs["embed"].description.startswith("3 ")
+
+    @pytest.mark.asyncio
+    async def test_dedupe_reports_removed_count(self):
+        from tests.test_playlist_snapshots import make_track
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        ctx.voice_client = self._player(2)
+        ctx.voice_client.queue.put(make_track("id0", "Song 0"))
+
+        await cog.dedupe.callback(cog, ctx)
+
+        assert ctx.voice_client.queue.titles() == ["Song 0", "Song 1"]
+        assert ctx.send.call_args.kwargs["embed"].description.startswith("1 ")
+
+    @pytest.mark.asyncio
+    async def test_queue_lists_first_page_from_columns(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        ctx.voice_client = self._player(15)
+
+        await cog.queue.callback(cog, ctx)
+
+        embed = ctx.send.call_args.kwargs["embed"]
+        assert "10. Song 9" in embed.description
+        assert "11. Song 10" not in embed.description
 
 
 class TestVolumeCommand:
@@ -520,15 +633,368 @@ class TestSearch:
             assert result == [track]
 
 
+class TestHedgedSearch:
+    @pytest.mark.asyncio
+    async def test_hedge_launches_fallback_while_ytm_is_slow(self):
+        yt_track = MagicMock(spec=wavelink.Playable)
+        ytm_release = asyncio.Event()
+        started = []
+
+        async def mock_search(query, source=None):
+            started.append(source)
+            if source == wavelink.TrackSource.YouTubeMusic:
+                await ytm_release.wait()
+                return []
+            if source == wavelink.TrackSource.YouTube:
+                return [yt_track]
+            return []
+
+        async def release_later():
+            await asyncio.sleep(0.05)
+            ytm_release.set()
+
+        with patch("wavelink.Playable.search", side_effect=mock_search):
+            releaser = asyncio.create_task(release_later())
+            result = await Music._search("test query", hedge_delay=0.01)
+            await releaser
+
+        assert result == [yt_track]
+        assert started[:2] == [wavelink.TrackSource.YouTubeMusic, wavelink.TrackSource.YouTube]
+
+    @pytest.mark.asyncio
+    async def test_higher_priority_result_wins_over_faster_fallback(self):
+        ytm_track = MagicMock(spec=wavelink.Playable)
+        yt_track = MagicMock(spec=wavelink.Playable)
+
+        async def mock_search(query, source=None):
+            if source == wavelink.TrackSource.YouTubeMusic:
+                await asyncio.sleep(0.05)
+                return [ytm_track]
+            if source == wavelink.TrackSource.YouTube:
+                return [yt_track]
+            return []
+
+        with patch("wavelink.Playable.search", side_effect=mock_search):
+            result = await Music._search("test query", hedge_delay=0)
+
+        assert result == [ytm_track]
+
+    @pytest.mark.asyncio
+    async def test_losing_searches_are_cancelled(self):
+        ytm_track = MagicMock(spec=wavelink.Playable)
+        cancelled = asyncio.Event()
+
+        async def mock_search(query, source=None):
+            if source == wavelink.TrackSource.YouTubeMusic:
+                await asyncio.sleep(0.01)
+                return [ytm_track]
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return []
+
+        with patch("wavelink.Playable.search", side_effect=mock_search):
+            result = await Music._search("test query", hedge_delay=0)
+            await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        assert result == [ytm_track]
+
+    @pytest.mark.asyncio
+    async def test_miss_costs_one_round_trip_when_parallel(self):
+        sc_track = MagicMock()
+        sc_track.uri = "https://soundcloud.com/artist/track"
+
+        async def mock_search(query, source=None):
+            await asyncio.sleep(0.05)
+            if source == wavelink.TrackSource.SoundCloud:
+                return [sc_track]
+            return []
+
+        loop = asyncio.get_running_loop()
+        with patch("wavelink.Playable.search", side_effect=mock_search):
+            start = loop.time()
+            result = await Music._search("test query", hedge_delay=0)
+            elapsed = loop.time() - start
+
+        assert result == [sc_track]
+        assert elapsed < 0.12
+
+    @pytest.mark.asyncio
+    async def test_error_on_priority_source_propagates(self):
+        async def mock_search(query, source=None):
+            if source == wavelink.TrackSource.YouTubeMusic:
+                raise wavelink.LavalinkLoadException(data={"message": "boom", "severity": "common", "cause": "x"})
+            return []
+
+        with patch("wavelink.Playable.search", side_effect=mock_search):
+            with pytest.raises(wavelink.LavalinkLoadException):
+                await Music._search("test query", hedge_delay=0)
+
+
+class TestLookupCache:
+    @pytest.mark.asyncio
+    async def test_repeated_query_is_served_from_cache(self):
+        cog = Music(make_bot())
+        track = MagicMock(spec=wavelink.Playable)
+
+        with patch.object(Music, "_search", new_callable=AsyncMock, return_value=[track]) as mock_search:
+            first = await cog._lookup("Test Song")
+            second = await cog._lookup("  test song")
+
+        assert first == [track]
+        assert second == [track]
+        assert mock_search.await_count == 1
+        assert cog._search_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_url_lookups_skip_source_fallback(self):
+        cog = Music(make_bot())
+        track = MagicMock(spec=wavelink.Playable)
+        url = "https://www.youtube.com/watch?v=YnL70cee6qo"
+
+        with patch("wavelink.Playable.search", new_callable=AsyncMock, return_value=[track]) as mock_search, \
+             patch.object(Music, "_search", new_callable=AsyncMock) as mock_fallback:
+            await cog._lookup(url)
+            await cog._lookup(url)
+
+        mock_search.assert_awaited_once_with(url)
+        mock_fallback.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_empty_results_are_cached_negatively(self):
+        cog = Music(make_bot())
+
+        with patch.object(Music, "_search", new_callable=AsyncMock, return_value=None) as mock_search:
+            assert await cog._lookup("nada") is None
+            assert await cog._lookup("nada") is None
+
+        assert mock_search.await_count == 1
+        assert cog._search_cache.stats()["negative_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_lookups_share_one_request(self):
+        cog = Music(make_bot())
+        track = MagicMock(spec=wavelink.Playable)
+        url = "https://www.youtube.com/playlist?list=PLtest"
+
+        async def slow_search(query):
+            await asyncio.sleep(0.01)
+            return [track]
+
+        with patch("wavelink.Playable.search", side_effect=slow_search) as mock_search:
+            results = await asyncio.gather(*(cog._lookup(url) for _ in range(5)))
+
+        assert mock_search.call_count == 1
+        assert all(result == [track] for result in results)
+        assert len({id(result) for result in results}) == 5
+
+
+class TestBulkEnqueue:
+    @pytest.mark.asyncio
+    async def test_enqueue_bulk_uses_single_put(self):
+        player = MagicMock()
+        player.queue = wavelink.Queue()
+        tracks = [MagicMock(spec=wavelink.Playable) for _ in range(50)]
+
+        added = await Music._enqueue_bulk(player, tracks)
+
+        assert added == 50
+        assert list(player.queue) == tracks
+
+    @pytest.mark.asyncio
+    async def test_enqueue_bulk_shuffle_keeps_every_track(self):
+        player = MagicMock()
+        player.queue = wavelink.Queue()
+        tracks = [MagicMock(spec=wavelink.Playable) for _ in range(50)]
+
+        with patch("cogs.music_cog.random.shuffle", side_effect=lambda items: items.reverse()):
+            await Music._enqueue_bulk(player, tracks, shuffle=True)
+
+        assert list(player.queue) == list(reversed(tracks))
+        assert len(tracks) == 50
+
+    @pytest.mark.asyncio
+    async def test_play_playlist_enqueues_in_one_call(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        player = make_player()
+        player.channel = ctx.author.voice.channel
+        player.playing = True
+        ctx.voice_client = player
+        playlist = MagicMock(spec=wavelink.Playlist)
+        playlist.name = "Mix"
+        playlist.tracks = [MagicMock(spec=wavelink.Playable) for _ in range(3)]
+        playlist.__len__.return_value = 3
+
+        with patch.object(Music, "_is_lavalink_available", return_value=True), \
+             patch.object(cog, "_lookup", new_callable=AsyncMock, return_value=playlist):
+            await cog.play.callback(cog, ctx, query="https://www.youtube.com/playlist?list=PLmix")
+
+        player.queue.put_wait.assert_awaited_once_with(playlist.tracks)
+
+
+class TestStreamingPlaylistLoad:
+    def _rows(self, count):
+        from utils.track_codec import TrackRow
+
+        return [
+            TrackRow(f"QAAA{i}", f"id{i}", f"Track {i}", "Artist", 1000, None, "youtube")
+            for i in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_first_track_plays_before_rest_is_queued(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        player = make_player()
+        player.queue = wavelink.Queue()
+        queued_at_play = []
+        player.play = AsyncMock(side_effect=lambda track: queued_at_play.append(player.queue.count))
+        embeds = []
+
+        def embed_for(count, done):
+            embeds.append((count, done))
+            return MagicMock()
+
+        with patch.object(cog, "_respond", new_callable=AsyncMock):
+            await cog._load_playlist(ctx, player, self._rows(1000), shuffle=False, embed_for=embed_for)
+            assert queued_at_play == [0]
+            assert player.play.await_args.args[0].title == "Track 0"
+            await cog._guilds.get(ctx.guild.id).loading_task
+
+        assert player.queue.count == 999
+        assert player.queue[0].title == "Track 1"
+        assert embeds == [(1000, False), (1000, True)]
+        assert cog._guilds.get(ctx.guild.id).loading_task is None
+
+    @pytest.mark.asyncio
+    async def test_busy_player_queues_everything_at_once(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        player = make_player()
+        player.playing = True
+        player.queue = wavelink.Queue()
+
+        with patch.object(cog, "_respond", new_callable=AsyncMock):
+            await cog._load_playlist(
+                ctx, player, self._rows(10), shuffle=False, embed_for=lambda count, done: MagicMock()
+            )
+
+        player.play.assert_not_awaited()
+        assert player.queue.count == 10
+        assert cog._guilds.get(ctx.guild.id) is None
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_background_load(self):
+        cog = Music(make_bot())
+        ctx = make_ctx()
+        player = make_player()
+        player.queue = wavelink.Queue()
+        ctx.voice_client = player
+
+        with patch.object(cog, "_respond", new_callable=AsyncMock):
+            await cog._load_playlist(
+                ctx, player, self._rows(5000), shuffle=True, embed_for=lambda count, done: MagicMock()
+            )
+        task = cog._guilds.get(ctx.guild.id).loading_task
+        await cog.stop.callback(cog, ctx)
+        await asyncio.sleep(0)
+
+        assert task.cancelled()
+
+
+class TestShortcutPlaylists:
+    def _make_cog(self, tmp_path):
+        from utils.playlist_snapshots import PlaylistSnapshotStore
+
+        cog = Music(make_bot())
+        cog._snapshots = PlaylistSnapshotStore(str(tmp_path / "bot.sqlite3"))
+        return cog
+
+    def _make_ctx_with_player(self):
+        ctx = make_ctx()
+        player = make_player()
+        player.channel = ctx.author.voice.channel
+        player.queue.get = MagicMock(return_value=MagicMock())
+        ctx.voice_client = player
+        return ctx, player
+
+    @pytest.mark.asyncio
+    async def test_dbz_resolves_and_stores_snapshot_when_missing(self, tmp_path):
+        from tests.test_playlist_snapshots import make_track
+        DBZ_PLAYLIST_URL = music_cog_module.DBZ_PLAYLIST_URL
+
+        cog = self._make_cog(tmp_path)
+        ctx, player = self._make_ctx_with_player()
+        tracks = [make_track("aaaaaaaaaaa"), make_track("bbbbbbbbbbb")]
+
+        with patch.object(Music, "_is_lavalink_available", return_value=True), \
+             patch.object(cog, "_lookup", new_callable=AsyncMock, return_value=tracks) as mock_lookup:
+            await cog.dbz.callback(cog, ctx)
+
+        mock_lookup.assert_awaited_once_with(DBZ_PLAYLIST_URL)
+        snapshot = await cog._snapshots.load(DBZ_PLAYLIST_URL)
+        assert len(snapshot) == 2
+        player.play.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_dbz_serves_fresh_snapshot_without_lavalink(self, tmp_path):
+        from tests.test_playlist_snapshots import make_track
+        DBZ_PLAYLIST_URL = music_cog_module.DBZ_PLAYLIST_URL
+
+        cog = self._make_cog(tmp_path)
+        await cog._snapshots.save(DBZ_PLAYLIST_URL, "DBZ", [make_track("aaaaaaaaaaa")])
+        ctx, player = self._make_ctx_with_player()
+
+        with patch.object(Music, "_is_lavalink_available", return_value=True), \
+             patch.object(cog, "_lookup", new_callable=AsyncMock) as mock_lookup:
+            await cog.dbz.callback(cog, ctx)
+
+        mock_lookup.assert_not_awaited()
+        assert not cog._snapshot_refreshes
+        player.play.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_is_served_and_refreshed_in_background(self, tmp_path):
+        from tests.test_playlist_snapshots import make_track
+        ANIME_PLAYLIST_URL = music_cog_module.ANIME_PLAYLIST_URL
+
+        cog = self._make_cog(tmp_path)
+        await cog._snapshots.save(ANIME_PLAYLIST_URL, "Anime", [make_track("aaaaaaaaaaa")])
+        ctx, player = self._make_ctx_with_player()
+        fresh = [make_track("bbbbbbbbbbb"), make_track("ccccccccccc")]
+
+        with patch.object(Music, "_is_lavalink_available", return_value=True), \
+             patch.object(music_cog_module, "PLAYLIST_SNAPSHOT_MAX_AGE", -1), \
+             patch.object(cog, "_lookup", new_callable=AsyncMock, return_value=fresh):
+            await cog.anime.callback(cog, ctx)
+            await cog._snapshot_refreshes[ANIME_PLAYLIST_URL]
+
+        player.play.assert_awaited_once()
+        snapshot = await cog._snapshots.load(ANIME_PLAYLIST_URL)
+        assert len(snapshot) == 2
+
+
 class TestPublishNowPlaying:
+    def _make_channel(self, guild_id=123, last_message_id=None, old_msg=None):
+        channel = MagicMock()
+        channel.guild = MagicMock()
+        channel.guild.id = guild_id
+        channel.last_message_id = last_message_id
+        sent = MagicMock()
+        sent.id = 2000
+        channel.send = AsyncMock(return_value=sent)
+        if old_msg is not None:
+            channel.get_partial_message = MagicMock(return_value=old_msg)
+        return channel
+
     @pytest.mark.asyncio
     async def test_publish_sends_new_message_when_no_previous(self):
         bot = make_bot()
         cog = Music(bot)
-        channel = MagicMock()
-        channel.guild = MagicMock()
-        channel.guild.id = 123
-        channel.send = AsyncMock(return_value=MagicMock())
+        channel = self._make_channel()
         song = {"title": "Song", "url": "https://example.com"}
 
         with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
@@ -536,285 +1002,979 @@ class TestPublishNowPlaying:
             await cog._publish_now_playing(channel, song)
 
         channel.send.assert_awaited_once()
-        assert 123 in cog._now_playing_messages
-        assert cog._now_playing_messages[123] is channel.send.return_value
+        assert cog._guilds.get(123).now_playing_message_id == 2000
 
     @pytest.mark.asyncio
-    async def test_publish_deletes_previous_message(self):
+    async def test_publish_edits_in_place_when_still_latest(self):
         bot = make_bot()
         cog = Music(bot)
         old_msg = MagicMock()
+        old_msg.edit = AsyncMock()
         old_msg.delete = AsyncMock()
-        cog._now_playing_messages[123] = old_msg
-
-        channel = MagicMock()
-        channel.guild = MagicMock()
-        channel.guild.id = 123
-        channel.send = AsyncMock(return_value=MagicMock())
+        cog._guilds.ensure(123).now_playing_message_id = 1000
+        channel = self._make_channel(last_message_id=1000, old_msg=old_msg)
         song = {"title": "Song", "url": "https://example.com"}
 
         with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
              patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
             await cog._publish_now_playing(channel, song)
 
-        old_msg.delete.assert_awaited_once()
-        channel.send.assert_awaited_once()
+        channel.get_partial_message.assert_called_with(1000)
+        old_msg.edit.assert_awaited_once()
+        old_msg.delete.assert_not_awaited()
+        channel.send.assert_not_awaited()
+        assert cog._guilds.get(123).now_playing_message_id == 1000
 
     @pytest.mark.asyncio
-    async def test_publish_ignores_not_found_on_delete(self):
+    async def test_publish_resends_when_edit_target_is_gone(self):
         bot = make_bot()
         cog = Music(bot)
         old_msg = MagicMock()
-        old_msg.delete = AsyncMock(side_effect=discord.NotFound(MagicMock(), "not found"))
-        cog._now_playing_messages[123] = old_msg
-
-        channel = MagicMock()
-        channel.guild = MagicMock()
-        channel.guild.id = 123
-        channel.send = AsyncMock(return_value=MagicMock())
+        old_msg.edit = AsyncMock(side_effect=discord.NotFound(MagicMock(), "not found"))
+        old_msg.delete = AsyncMock()
+        cog._guilds.ensure(123).now_playing_message_id = 1000
+        channel = self._make_channel(last_message_id=1000, old_msg=old_msg)
         song = {"title": "Song", "url": "https://example.com"}
 
         with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
              patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
             await cog._publish_now_playing(channel, song)
 
-        old_msg.delete.assert_awaited_once()
+        old_msg.delete.assert_not_awaited()
         channel.send.assert_awaited_once()
-        assert 123 in cog._now_playing_messages
+        assert cog._guilds.get(123).now_playing_message_id == 2000
 
     @pytest.mark.asyncio
-    async def test_publish_aborts_on_http_exception(self):
+    async def test_publish_deletes_previous_message(self):
         bot = make_bot()
         cog = Music(bot)
         old_msg = MagicMock()
-        old_msg.delete = AsyncMock(side_effect=discord.HTTPException(MagicMock(), "http error"))
-        cog._now_playing_messages[123] = old_msg
-
-        channel = MagicMock()
-        channel.guild = MagicMock()
-        channel.guild.id = 123
-        channel.send = AsyncMock(return_value=MagicMock())
+        old_msg.delete = AsyncMock()
+        old_msg.edit = AsyncMock()
+        cog._guilds.ensure(123).now_playing_message_id = 1000
+        channel = self._make_channel(last_message_id=1500, old_msg=old_msg)
         song = {"title": "Song", "url": "https://example.com"}
 
         with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
              patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
             await cog._publish_now_playing(channel, song)
 
+        old_msg.edit.assert_not_awaited()
         old_msg.delete.assert_awaited_once()
-        channel.send.assert_not_awaited()
-        assert 123 not in cog._now_playing_messages
+        channel.send.assert_awaited_once()
 
     @pytest.mark.asyncio
-    async def test_publish_uses_lock_per_guild(self):
+    async def test_publish_takes_a_token_for_each_request(self):
         bot = make_bot()
         cog = Music(bot)
-        channel = MagicMock()
-        channel.guild = MagicMock()
-        channel.guild.id = 456
-        channel.send = AsyncMock(return_value=MagicMock())
+        old_msg = MagicMock()
+        old_msg.delete = AsyncMock()
+        cog._guilds.ensure(123).now_playing_message_id = 1000
+        channel = self._make_channel(last_message_id=1500, old_msg=old_msg)
         song = {"title": "Song", "url": "https://example.com"}
 
         with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
-             patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
+             patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()), \
+             patch.object(cog._outbound, "throttle", AsyncMock()) as throttle:
             await cog._publish_now_playing(channel, song)
 
-        assert 456 in cog._now_playing_locks
-        assert isinstance(cog._now_playing_locks[456], asyncio.Lock)
+        assert throttle.await_count == 2
 
     @pytest.mark.asyncio
-    async def test_publish_now_playing_does_not_mark_guild_as_just_published(self):
+    async def test_publish_ignores_not_found_on_delete(self):
         bot = make_bot()
         cog = Music(bot)
-        channel = MagicMock()
-        channel.guild = MagicMock()
-        channel.guild.id = 123
-        channel.send = AsyncMock(return_value=MagicMock())
+        old_msg = MagicMock()
+        old_msg.delete = AsyncMock(side_effect=discord.NotFound(MagicMock(), "not found"))
+        cog._guilds.ensure(123).now_playing_message_id = 1000
+        channel = self._make_channel(last_message_id=1500, old_msg=old_msg)
         song = {"title": "Song", "url": "https://example.com"}
 
         with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
              patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
             await cog._publish_now_playing(channel, song)
 
-        assert 123 not in cog._np_just_published
-
+        old_msg.delete.assert_awaited_once()
+        channel.send.assert_awaited_once()
+        assert cog._guilds.get(123).now_playing_message_id is not None
 
-class TestCogAfterInvoke:
     @pytest.mark.asyncio
-    async def test_after_invoke_publishes_when_song_playing(self):
+    async def test_publish_aborts_on_http_exception(self):
         bot = make_bot()
         cog = Music(bot)
+        old_msg = MagicMock()
+        old_msg.delete = AsyncMock(side_effect=discord.HTTPException(MagicMock(), "http error"))
+        cog._guilds.ensure(123).now_playing_message_id = 1000
+        channel = self._make_channel(last_message_id=1500, old_msg=old_msg)
+        song = {"title": "Song", "url": "https://example.com"}
+
+        with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
+             patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
+            await cog._publish_now_playing(channel, song)
+
+        old_msg.delete.assert_awaited_once()
+        channel.send.assert_not_awaited()
+        assert cog._guilds.get(123).now_playing_message_id is None
+
+    @pytest.mark.asyncio
+    async def test_publish_uses_lock_per_guild(self):
+        bot = make_bot()
+        cog = Music(bot)
+        channel = MagicMock()
+        channel.guild = MagicMock()
+        channel.guild.id = 456
+        channel.send = AsyncMock(return_value=MagicMock())
+        song = {"title": "Song", "url": "https://example.com"}
+
+        with patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
+             patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
+            await cog._publish_now_playing(channel, song)
+
+        assert cog._guilds.get(456).np_lock is not None
+        assert isinstance(cog._guilds.get(456).np_lock, asyncio.Lock)
+
+
+class TestCogAfterInvoke:
+    def _playing_ctx(self, title="Playing Song", uri="https://example.com"):
         ctx = make_ctx()
         player = make_player()
         track = MagicMock(spec=wavelink.Playable)
-        track.title = "Playing Song"
-        track.uri = "https://example.com"
+        track.title = title
+        track.uri = uri
         track.artwork = None
         track.length = 180000
         track.author = "Artist"
         player.current = track
         ctx.voice_client = player
+        ctx.channel.guild = ctx.guild
+        return ctx, player
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+    @pytest.mark.asyncio
+    async def test_after_invoke_requests_publish_when_song_playing(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+
+        with patch.object(cog, "_request_now_playing") as mock_request:
             await cog.cog_after_invoke(ctx)
 
-        mock_publish.assert_awaited_once()
-        args = mock_publish.await_args
-        assert args[0][0] is ctx.channel
-        assert args[0][1]["title"] == "Playing Song"
+        mock_request.assert_called_once_with(ctx.channel, player)
 
     @pytest.mark.asyncio
     async def test_after_invoke_skips_when_no_guild(self):
-        bot = make_bot()
-        cog = Music(bot)
+        cog = Music(make_bot())
         ctx = make_ctx()
         ctx.guild = None
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+        with patch.object(cog, "_request_now_playing") as mock_request:
             await cog.cog_after_invoke(ctx)
 
-        mock_publish.assert_not_awaited()
+        mock_request.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_after_invoke_skips_when_no_player(self):
-        bot = make_bot()
-        cog = Music(bot)
+        cog = Music(make_bot())
         ctx = make_ctx()
         ctx.voice_client = None
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+        with patch.object(cog, "_request_now_playing") as mock_request:
             await cog.cog_after_invoke(ctx)
 
-        mock_publish.assert_not_awaited()
+        mock_request.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_after_invoke_skips_when_nothing_playing(self):
-        bot = make_bot()
-        cog = Music(bot)
+        cog = Music(make_bot())
         ctx = make_ctx()
         player = make_player()
         player.current = None
         ctx.voice_client = player
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+        with patch.object(cog, "_request_now_playing") as mock_request:
             await cog.cog_after_invoke(ctx)
 
-        mock_publish.assert_not_awaited()
+        mock_request.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_after_invoke_syncs_text_channel(self):
+        cog = Music(make_bot())
+        ctx, _ = self._playing_ctx()
+
+        with patch.object(cog, "_request_now_playing"):
+            await cog.cog_after_invoke(ctx)
+
+        assert cog._guilds.get(ctx.guild.id).text_channel_id == ctx.channel.id
+
+
+class TestNowPlayingPublisher:
+    def _playing_ctx(self):
+        return TestCogAfterInvoke()._playing_ctx()
+
+    @pytest.mark.asyncio
+    async def test_burst_of_requests_renders_once(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+
+        with patch.object(music_cog_module, "NOW_PLAYING_DEBOUNCE", 0), \
+             patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+            for _ in range(5):
+                cog._request_now_playing(ctx.channel, player)
+            await cog._guilds.get(ctx.guild.id).np_task
+
+        mock_publish.assert_awaited_once()
+        assert mock_publish.await_args.args[1]["title"] == "Playing Song"
+
+    @pytest.mark.asyncio
+    async def test_track_start_and_after_invoke_are_coalesced(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+        player.guild = ctx.guild
+        cog._set_text_channel(ctx)
+        cog.bot.get_channel.return_value = ctx.channel
+        payload = MagicMock()
+        payload.player = player
+
+        with patch.object(music_cog_module, "NOW_PLAYING_DEBOUNCE", 0), \
+             patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+            await cog.on_wavelink_track_start(payload)
+            await cog.cog_after_invoke(ctx)
+            await cog._guilds.get(ctx.guild.id).np_task
+
+        mock_publish.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_render_uses_latest_player_state(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+
+        with patch.object(music_cog_module, "NOW_PLAYING_DEBOUNCE", 0), \
+             patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+            cog._request_now_playing(ctx.channel, player)
+            player.current.title = "Next Song"
+            await cog._guilds.get(ctx.guild.id).np_task
+
+        assert mock_publish.await_args.args[1]["title"] == "Next Song"
+
+    @pytest.mark.asyncio
+    async def test_unchanged_message_at_bottom_is_not_rerendered(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+        ctx.channel.last_message_id = 1000
+        ctx.channel.send = AsyncMock(return_value=MagicMock(id=1000))
+
+        with patch.object(music_cog_module, "NOW_PLAYING_DEBOUNCE", 0), \
+             patch("cogs.music_cog.build_now_playing_embed", return_value=MagicMock()), \
+             patch("cogs.music_cog.make_music_control_view", return_value=MagicMock()):
+            await cog._publish_now_playing(ctx.channel, _track_to_song(player.current))
+            cog._request_now_playing(ctx.channel, player)
+            await cog._guilds.get(ctx.guild.id).np_task
+
+        ctx.channel.send.assert_awaited_once()
+        ctx.channel.get_partial_message.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_edit_in_place_records_the_rendered_song(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+        ctx.channel.last_message_id = 1000
+        ctx.channel.send = AsyncMock(return_value=MagicMock(id=1000))
+        message = ctx.channel.get_partial_message.return_value
+        message.edit = AsyncMock()
+        state = cog._guilds.ensure(ctx.guild.id)
+
+        with patch.object(music_cog_module, "NOW_PLAYING_DEBOUNCE", 0), \
+             patch.object(music_cog_module, "build_now_playing_embed", side_effect=lambda song: song["title"]), \
+             patch.object(music_cog_module, "make_music_control_view", return_value=MagicMock()):
+            await cog._publish_now_playing(ctx.channel, _track_to_song(player.current))
+            for title in ("Song B", "Playing Song"):
+                player.current.title = title
+                cog._request_now_playing(ctx.channel, player)
+                await state.np_task
+
+        ctx.channel.send.assert_awaited_once()
+        assert [call.kwargs["embed"] for call in message.edit.await_args_list] == ["Song B", "Playing Song"]
+        assert state.np_rendered == _song_key(ctx.channel, _track_to_song(player.current))
+
+    @pytest.mark.asyncio
+    async def test_consecutive_bursts_render_again_when_pushed_up(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+
+        with patch.object(music_cog_module, "NOW_PLAYING_DEBOUNCE", 0), \
+             patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+            cog._request_now_playing(ctx.channel, player)
+            await cog._guilds.get(ctx.guild.id).np_task
+            cog._request_now_playing(ctx.channel, player)
+            await cog._guilds.get(ctx.guild.id).np_task
+
+        assert mock_publish.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_pending_publish(self):
+        cog = Music(make_bot())
+        ctx, player = self._playing_ctx()
+
+        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
+            cog._request_now_playing(ctx.channel, player)
+            task = cog._guilds.get(ctx.guild.id).np_task
+            await cog.stop.callback(cog, ctx)
+            await asyncio.sleep(0)
+
+        assert task.cancelled()
+        mock_publish.assert_not_awaited()
+
+
+class TestOutboundNotices:
+    def _exception_payload(self, guild_id=123):
+        player = make_player()
+        player.guild = MagicMock()
+        player.guild.id = guild_id
+        payload = MagicMock()
+        payload.player = player
+        payload.exception = {"message": "This video is not available"}
+        return payload
+
+    async def _drain(self, cog):
+        workers = [lane.worker for lane in cog._outbound._lanes.values() if lane.worker is not None]
+        await asyncio.gather(*workers)
+
+    @pytest.mark.asyncio
+    async def test_burst_of_unavailable_tracks_sends_one_merged_notice(self):
+        cog = Music(make_bot())
+        channel = MagicMock()
+        channel.id = 55
+        channel.send = AsyncMock()
+        cog._guilds.ensure(123).text_channel_id = channel.id
+        cog.bot.get_channel.return_value = channel
+
+        with patch.object(music_cog_module, "SKIP_NOTICE_HOLD", 0):
+            for _ in range(7):
+                await cog.on_wavelink_track_exception(self._exception_payload())
+            await self._drain(cog)
+
+        channel.send.assert_awaited_once()
+        embed = channel.send.await_args.kwargs["embed"]
+        assert "7 canciones" in embed.description
+
+    @pytest.mark.asyncio
+    async def test_cleanup_drops_queued_now_playing_render(self):
+        cog = Music(make_bot())
+        channel = MagicMock()
+        channel.id = 55
+        channel.guild = MagicMock()
+        channel.guild.id = 123
+        operation = AsyncMock()
+        blocker = asyncio.Event()
+
+        busy = asyncio.ensure_future(cog._outbound.run(channel, blocker.wait))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(
+            cog._outbound.run(channel, operation, replace_key=("now-playing", 123))
+        )
+        await asyncio.sleep(0)
+        cog._cleanup_state(123)
+        blocker.set()
+
+        assert await queued is None
+        await busy
+        operation.assert_not_awaited()
+
+
+class TestPrefetch:
+    def _player(self, ids, *, position=250_000, updated=True):
+        from tests.test_playlist_snapshots import make_track
+        from utils.compact_queue import CompactQueue
+        player = make_player()
+        player.guild = MagicMock()
+        player.guild.id = 123
+        player.current = make_track("cur")
+        player.position = position
+        # updated: ya llegó un playerUpdate del track actual, así que ``position`` es confiable.
+        player._last_update = sys.maxsize if updated else 0
+        player.queue = CompactQueue()
+        player.queue.put([make_track(i, f"Song {i}") for i in ids])
+        return player
+
+    @staticmethod
+    def _unavailable():
+        return wavelink.LavalinkLoadException(
+            data={"message": "This video is not available", "severity": "common", "cause": "x"}
+        )
+
+    @pytest.mark.asyncio
+    async def test_unplayable_entries_are_dropped_before_the_handover(self):
+        from tests.test_playlist_snapshots import make_track
+        cog = Music(make_bot())
+        player = self._player(["bad1", "bad2", "good", "later"])
+        fresh = make_track("good", "Fresh")
+        fetch = AsyncMock(side_effect=[self._unavailable(), self._unavailable(), [fresh]])
+
+        with patch.object(music_cog_module, "PREFETCH_LEAD", 10), \
+             patch("wavelink.Pool.fetch_tracks", fetch), \
+             patch.object(music_cog_module, "_search_source", new_callable=AsyncMock, return_value=None):
+            cog._schedule_prefetch(player)
+            await cog._guilds.get(123).prefetch_task
+
+        assert player.queue.titles() == ["Song good", "Song later"]
+        assert fetch.await_count == 3
+
+        await cog.on_wavelink_track_end(MagicMock(player=player))
+
+        player.play.assert_awaited_once_with(fresh)
+        assert player.queue.titles() == ["Song later"]
+
+    @pytest.mark.asyncio
+    async def test_waits_until_the_lead_window(self):
+        cog = Music(make_bot())
+        player = self._player(["next"], position=0)
+        fetch = AsyncMock(return_value=[])
+
+        with patch("wavelink.Pool.fetch_tracks", fetch):
+            cog._schedule_prefetch(player)
+            await asyncio.sleep(0)
+
+        assert not fetch.called
+        cog._guilds.get(123).prefetch_task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_lavalink_errors_keep_the_queue_as_is(self):
+        cog = Music(make_bot())
+        player = self._player(["next"])
+        fetch = AsyncMock(side_effect=wavelink.LavalinkLoadException(
+            data={"message": "Something broke", "severity": "fault", "cause": "x"}
+        ))
+
+        with patch("wavelink.Pool.fetch_tracks", fetch):
+            cog._schedule_prefetch(player)
+            await cog._guilds.get(123).prefetch_task
+
+        assert player.queue.titles() == ["Song next"]
+        assert cog._guilds.get(123).prefetched is None
+
+    @pytest.mark.asyncio
+    async def test_stale_prefetch_is_ignored_after_the_queue_changes(self):
+        from tests.test_playlist_snapshots import make_track
+        cog = Music(make_bot())
+        player = self._player(["a", "b"])
+
+        with patch("wavelink.Pool.fetch_tracks", AsyncMock(return_value=[make_track("a", "Fresh")])):
+            cog._schedule_prefetch(player)
+            await cog._guilds.get(123).prefetch_task
+        player.queue.move(1, 0)
+        await cog._play_next(player)
+
+        assert player.play.await_args.args[0].identifier == "b"
+        assert cog._guilds.get(123).prefetched is None
+
+    @pytest.mark.asyncio
+    async def test_position_left_over_from_the_previous_track_is_ignored(self):
+        cog = Music(make_bot())
+        player = self._player(["next"], position=250_000, updated=False)
+        fetch = AsyncMock(return_value=[])
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+            raise asyncio.CancelledError
+
+        with patch("wavelink.Pool.fetch_tracks", fetch), \
+             patch.object(music_cog_module.asyncio, "sleep", fake_sleep):
+            cog._schedule_prefetch(player)
+            with suppress(asyncio.CancelledError):
+                await cog._guilds.get(123).prefetch_task
+
+        assert not fetch.called
+        assert sleeps == [music_cog_module.PREFETCH_UPDATE_WAIT]
+
+    @pytest.mark.asyncio
+    async def test_first_player_update_of_the_track_is_trusted(self):
+        cog = Music(make_bot())
+        player = self._player(["next"], position=0, updated=False)
+        fetch = AsyncMock(return_value=[])
+
+        async def player_update(delay):
+            player._last_update = time.monotonic_ns()
+            player.position = 250_000
+
+        with patch("wavelink.Pool.fetch_tracks", fetch), \
+             patch.object(music_cog_module.asyncio, "sleep", player_update):
+            cog._schedule_prefetch(player)
+            await cog._guilds.get(123).prefetch_task
+
+        assert fetch.called
+
+    @pytest.mark.asyncio
+    async def test_new_track_cancels_pending_prefetch(self):
+        cog = Music(make_bot())
+        player = self._player(["next"], position=0)
+
+        cog._schedule_prefetch(player)
+        first = cog._guilds.get(123).prefetch_task
+        cog._schedule_prefetch(player)
+        await asyncio.sleep(0)
+
+        assert first.cancelled()
+        cog._guilds.get(123).prefetch_task.cancel()
+
+
+class TestAlternateSource:
+    def _track(self, identifier, title="Cha-La Head-Cha-La", *, source="youtube", length=254000):
+        from tests.test_playlist_snapshots import make_track
+        track = make_track(identifier, title)
+        track._source = source
+        track._length = length
+        return track
+
+    def _payload(self, track):
+        from utils.compact_queue import CompactQueue
+        player = make_player()
+        player.guild = MagicMock()
+        player.guild.id = 123
+        player.queue = CompactQueue()
+        payload = MagicMock()
+        payload.player = player
+        payload.track = track
+        payload.exception = {"message": "This video is not available"}
+        return payload
+
+    @pytest.mark.asyncio
+    async def test_unavailable_track_is_replaced_from_the_next_source(self):
+        cog = Music(make_bot())
+        payload = self._payload(self._track("dead"))
+        payload.player.queue.put(self._track("next"))
+        match = self._track("sc1", "Cha-La Head-Cha-La (Opening)", source="soundcloud")
+        other = self._track("sc2", "Something Else", source="soundcloud")
+        search = AsyncMock(return_value=[other, match])
+
+        with patch.object(music_cog_module, "_search_source", search):
+            await cog.on_wavelink_track_exception(payload)
+
+        search.assert_awaited_once_with("Hironobu Kageyama Cha-La Head-Cha-La", wavelink.TrackSource.SoundCloud)
+        payload.player.play.assert_awaited_once_with(match)
+        assert payload.player.queue.count == 1
+        assert cog._failed_tracks.get("dead") is match
+
+    @pytest.mark.asyncio
+    async def test_failed_track_without_match_is_skipped_and_remembered(self):
+        cog = Music(make_bot())
+        payload = self._payload(self._track("dead"))
+        payload.player.queue.put(self._track("next"))
+        search = AsyncMock(return_value=[self._track("sc", "Unrelated", source="soundcloud")])
+
+        with patch.object(music_cog_module, "_search_source", search):
+            await cog.on_wavelink_track_exception(payload)
+            assert await cog._recover_track(self._track("dead")) is None
+
+        assert payload.player.play.await_args.args[0].identifier == "next"
+        assert "dead" in cog._failed_tracks
+        search.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_replay_uses_the_remembered_replacement(self):
+        cog = Music(make_bot())
+        payload = self._payload(None)
+        player = payload.player
+        player.queue.put([self._track("dead"), self._track("gone"), self._track("ok")])
+        replacement = self._track("sc1", source="soundcloud")
+        cog._failed_tracks.set("dead", replacement)
+        cog._failed_tracks.set("gone", None)
+
+        await cog._play_next(player)
+        await cog._play_next(player)
+
+        assert [c.args[0].identifier for c in player.play.await_args_list] == ["sc1", "ok"]
+
+    @pytest.mark.asyncio
+    async def test_load_failed_track_end_leaves_the_handover_to_the_exception(self):
+        cog = Music(make_bot())
+        payload = self._payload(self._track("dead"))
+        payload.player.queue.put(self._track("next"))
+        payload.reason = "loadFailed"
+
+        await cog.on_wavelink_track_end(payload)
+
+        payload.player.play.assert_not_awaited()
+
+    def test_match_rejects_different_duration(self):
+        from cogs.music_cog import _match_score
+        original = self._track("a")
+
+        assert _match_score(original, self._track("b", length=254000 + 5000)) == 1.0
+        assert _match_score(original, self._track("c", length=254000 + 60000)) == 0.0
+
+    def test_sources_after_follow_the_search_chain(self):
+        from cogs.music_cog import _sources_after
+
+        assert _sources_after(self._track("a")) == (wavelink.TrackSource.SoundCloud,)
+        assert _sources_after(self._track("a", source="soundcloud")) == ()
+        assert _sources_after(self._track("a", source="spotify")) == music_cog_module.SEARCH_SOURCES
+
+
+class TestPlayerPlacement:
+    def test_fixed_player_uses_balancer_choice(self):
+        from cogs.music_cog import _FixedPlayer
+
+        chosen = MagicMock(spec=wavelink.Node)
+        chosen.players = {}
+        chosen._inactive_player_timeout = None
+        chosen._inactive_channel_tokens = None
+        client = make_bot()
+        client.lavalink_nodes = MagicMock()
+        client.lavalink_nodes.best_node.return_value = chosen
+
+        player = _FixedPlayer(client, MagicMock())
+
+        assert player.node is chosen
+
+
+class TestNodeFailover:
+    def _node(self, identifier, *, connected=True):
+        node = MagicMock(spec=wavelink.Node)
+        node.identifier = identifier
+        node.status = wavelink.NodeStatus.CONNECTED if connected else wavelink.NodeStatus.CONNECTING
+        node._players = {}
+        node.players = node._players
+        node._inactive_player_timeout = None
+        node._inactive_channel_tokens = None
+        node._update_player = AsyncMock()
+        node._destroy_player = AsyncMock()
+        return node
+
+    def _player(self, node, guild_id=123):
+        player = MagicMock(spec=music_cog_module._FixedPlayer)
+        player.guild = MagicMock()
+        player.guild.id = guild_id
+        player.pending_snapshot = None
+        player.snapshot.return_value = music_cog_module._PlaybackSnapshot(MagicMock(), 42_000, 70, False)
+        player.migrate_to = AsyncMock()
+        player.queue = MagicMock()
+        player.disconnect = AsyncMock()
+        node._players[guild_id] = player
+        return player
+
+    @pytest.mark.asyncio
+    async def test_lost_node_players_move_to_healthy_node(self):
         bot = make_bot()
+        lost, healthy = self._node("a", connected=False), self._node("b")
+        bot.lavalink_nodes = MagicMock()
+        bot.lavalink_nodes.best_node.return_value = healthy
         cog = Music(bot)
-        ctx = make_ctx()
-        player = make_player()
-        track = MagicMock(spec=wavelink.Playable)
-        track.title = "Playing Song"
-        track.uri = "https://example.com"
-        track.artwork = None
-        track.length = 180000
-        track.author = "Artist"
-        player.current = track
-        ctx.voice_client = player
+        players = [self._player(lost, 1), self._player(lost, 2)]
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock):
-            await cog.cog_after_invoke(ctx)
+        await cog.on_lavalink_node_unavailable(lost)
 
-        assert cog._text_channels.get(ctx.guild.id) is ctx.channel
+        bot.lavalink_nodes.best_node.assert_called_with(exclude=lost)
+        for player in players:
+            player.migrate_to.assert_awaited_once_with(healthy, snapshot=player.snapshot.return_value)
+            assert player.pending_snapshot is None
 
     @pytest.mark.asyncio
-    async def test_after_invoke_skips_on_skip_command(self):
+    async def test_lost_node_without_target_keeps_snapshot_for_reconnect(self):
         bot = make_bot()
+        lost = self._node("a", connected=False)
+        bot.lavalink_nodes = MagicMock()
+        bot.lavalink_nodes.best_node.return_value = None
         cog = Music(bot)
-        ctx = make_ctx()
-        ctx.command.name = "skip"
-        player = make_player()
-        track = MagicMock(spec=wavelink.Playable)
-        track.title = "Playing Song"
-        track.uri = "https://example.com"
-        track.artwork = None
-        track.length = 180000
-        track.author = "Artist"
-        player.current = track
-        ctx.voice_client = player
+        player = self._player(lost)
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
-            await cog.cog_after_invoke(ctx)
+        await cog.on_lavalink_node_unavailable(lost)
 
-        mock_publish.assert_not_awaited()
+        player.migrate_to.assert_not_awaited()
+        assert player.pending_snapshot == player.snapshot.return_value
 
     @pytest.mark.asyncio
-    async def test_after_invoke_skips_if_just_published(self):
+    async def test_new_session_resumes_leftover_players_instead_of_disconnecting(self):
         bot = make_bot()
+        node = self._node("a")
+        bot.lavalink_nodes = MagicMock()
+        bot.lavalink_nodes.best_node.return_value = node
         cog = Music(bot)
-        ctx = make_ctx()
-        guild_id = ctx.guild.id
-        cog._np_just_published.add(guild_id)
-        player = make_player()
-        track = MagicMock(spec=wavelink.Playable)
-        track.title = "Playing Song"
-        track.uri = "https://example.com"
-        track.artwork = None
-        track.length = 180000
-        track.author = "Artist"
-        player.current = track
-        ctx.voice_client = player
+        cog._queues_restored = True  # las colas guardadas se prueban en TestQueuePersistence
+        player = self._player(node)
+        snapshot = music_cog_module._PlaybackSnapshot(MagicMock(), 10_000, 50, True)
+        player.pending_snapshot = snapshot
+        payload = MagicMock(node=node, resumed=False)
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
-            await cog.cog_after_invoke(ctx)
+        await cog.on_wavelink_node_ready(payload)
 
-        mock_publish.assert_not_awaited()
-        assert guild_id not in cog._np_just_published
+        player.migrate_to.assert_awaited_once_with(node, snapshot=snapshot)
+        player.disconnect.assert_not_awaited()
 
     @pytest.mark.asyncio
-    async def test_after_invoke_republishes_on_consecutive_commands(self):
+    async def test_failed_migration_falls_back_to_disconnect(self):
         bot = make_bot()
+        node = self._node("a")
+        bot.lavalink_nodes = None
         cog = Music(bot)
-        ctx = make_ctx()
-        player = make_player()
-        track = MagicMock(spec=wavelink.Playable)
-        track.title = "Playing Song"
-        track.uri = "https://example.com"
-        track.artwork = None
-        track.length = 180000
-        track.author = "Artist"
-        player.current = track
-        ctx.voice_client = player
+        cog._queues_restored = True
+        player = self._player(node)
+        player.migrate_to.side_effect = RuntimeError("boom")
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
-            await cog.cog_after_invoke(ctx)
-            await cog.cog_after_invoke(ctx)
+        await cog.on_wavelink_node_ready(MagicMock(node=node, resumed=False))
+
+        player.queue.clear.assert_called_once()
+        player.disconnect.assert_awaited_once()
 
-        assert mock_publish.call_count == 2
+    @pytest.mark.asyncio
+    async def test_migrate_to_moves_player_and_resumes_playback(self):
+        old, new = self._node("a"), self._node("b")
+        client = make_bot()
+        player = music_cog_module._FixedPlayer(client, MagicMock(), nodes=[old])
+        player._guild = MagicMock()
+        player._guild.id = 123
+        old._players[123] = player
+        player._voice_state["voice"].update(session_id="s", token="t", endpoint="e", channel_id=9)
+        player.play = AsyncMock()
+        track = MagicMock(spec=wavelink.Playable)
+        snapshot = music_cog_module._PlaybackSnapshot(track, 61_000, 35, True)
+
+        await player.migrate_to(new, snapshot=snapshot)
+
+        assert player.node is new
+        assert 123 not in old._players and new._players[123] is player
+        old._destroy_player.assert_awaited_once_with(123)
+        voice = new._update_player.await_args.kwargs["data"]["voice"]
+        assert voice == {"sessionId": "s", "token": "t", "endpoint": "e", "channelId": "9"}
+        player.play.assert_awaited_once_with(track, start=61_000, volume=35, paused=True, add_history=False)
+
+
+class TestResumedSession:
+    def _remote(self, guild_id, *, title="Song", position=30_000):
+        info = MagicMock()
+        info.guild_id = guild_id
+        info.track = MagicMock(spec=wavelink.Playable)
+        info.track.title = title
+        info.volume = 40
+        info.paused = False
+        info.state.position = position
+        return info
+
+    def _guild(self, *, voice_client=None, channel=None):
+        guild = MagicMock()
+        guild.voice_client = voice_client
+        guild.me.voice = MagicMock(channel=channel) if channel is not None else None
+        return guild
 
     @pytest.mark.asyncio
-    async def test_after_invoke_republishes_after_track_start(self):
+    async def test_resumed_players_are_rebuilt_on_the_same_node(self):
         bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        node = MagicMock(spec=wavelink.Node)
+        node.fetch_players = AsyncMock(return_value=[self._remote(1)])
+        channel = MagicMock()
+        player = MagicMock()
+        channel.connect = AsyncMock(return_value=player)
+        bot.get_guild.return_value = self._guild(channel=channel)
         cog = Music(bot)
+
+        await cog.on_wavelink_node_ready(MagicMock(node=node, resumed=True))
+
+        cls = channel.connect.await_args.kwargs["cls"]
+        assert cls.func is music_cog_module._FixedPlayer
+        assert cls.keywords == {"nodes": [node]}
+        assert player._current.title == "Song"
+        assert player._volume == 40
+        assert player._last_position == 30_000
+        assert 1 in cog._guilds
+
+    @pytest.mark.asyncio
+    async def test_live_players_from_same_process_are_left_alone(self):
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        node = MagicMock(spec=wavelink.Node)
+        node.fetch_players = AsyncMock(return_value=[self._remote(1)])
+        node._destroy_player = AsyncMock()
         channel = MagicMock()
-        cog._text_channels[123] = channel
+        channel.connect = AsyncMock()
+        bot.get_guild.return_value = self._guild(voice_client=MagicMock(node=node), channel=channel)
 
-        payload = MagicMock()
-        payload.player = MagicMock()
-        payload.player.guild.id = 123
-        payload.track = MagicMock(spec=wavelink.Playable)
-        payload.track.title = "Track Song"
-        payload.track.uri = "https://example.com/track"
-        payload.track.artwork = None
-        payload.track.length = 180000
-        payload.track.author = "Artist"
+        await Music(bot).on_wavelink_node_ready(MagicMock(node=node, resumed=True))
 
-        ctx = make_ctx()
+        channel.connect.assert_not_awaited()
+        node._destroy_player.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_remote_player_of_a_guild_restored_elsewhere_is_destroyed(self):
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        node = MagicMock(spec=wavelink.Node)
+        node.fetch_players = AsyncMock(return_value=[self._remote(1)])
+        node._destroy_player = AsyncMock()
+        channel = MagicMock()
+        channel.connect = AsyncMock()
+        bot.get_guild.return_value = self._guild(voice_client=MagicMock(node=MagicMock()), channel=channel)
+
+        await Music(bot).on_wavelink_node_ready(MagicMock(node=node, resumed=True))
+
+        channel.connect.assert_not_awaited()
+        node._destroy_player.assert_awaited_once_with(1)
+
+    @pytest.mark.asyncio
+    async def test_saved_queues_wait_for_nodes_still_resuming(self):
+        from utils.lavalink_supervisor import ConnectionState
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        bot.lavalink_supervisor.states = {
+            "a": ConnectionState.CONNECTED,
+            "b": ConnectionState.CONNECTED,
+            "c": ConnectionState.RECONNECTING,
+        }
+        first, second = MagicMock(spec=wavelink.Node), MagicMock(spec=wavelink.Node)
+        first.identifier, second.identifier = "a", "b"
+        first.fetch_players = AsyncMock(return_value=[])
+        second.fetch_players = AsyncMock(return_value=[])
+        cog = Music(bot)
+        cog._queue_store.load_all = AsyncMock(return_value=[])
+
+        with patch.object(music_cog_module, "RESTORE_NODES_POLL", 0):
+            first_ready = asyncio.create_task(cog.on_wavelink_node_ready(MagicMock(node=first, resumed=True)))
+            for _ in range(5):
+                await asyncio.sleep(0)
+            cog._queue_store.load_all.assert_not_awaited()
+
+            await cog.on_wavelink_node_ready(MagicMock(node=second, resumed=True))
+            await asyncio.wait_for(first_ready, timeout=1)
+
+        cog._queue_store.load_all.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_remote_player_without_voice_channel_is_destroyed(self):
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        node = MagicMock(spec=wavelink.Node)
+        node.fetch_players = AsyncMock(return_value=[self._remote(1)])
+        node._destroy_player = AsyncMock()
+        bot.get_guild.return_value = self._guild()
+
+        await Music(bot).on_wavelink_node_ready(MagicMock(node=node, resumed=True))
+
+        node._destroy_player.assert_awaited_once_with(1)
+
+
+class TestQueuePersistence:
+    def _track_payloads(self, *identifiers):
+        from tests.test_playlist_snapshots import make_track
+        return [make_track(i).raw_data for i in identifiers]
+
+    def _player(self, *, current=None, queue=()):
         player = make_player()
-        track = MagicMock(spec=wavelink.Playable)
-        track.title = "Playing Song"
-        track.uri = "https://example.com/song"
-        track.artwork = None
-        track.length = 180000
-        track.author = "Artist"
-        player.current = track
-        ctx.voice_client = player
+        player.current = current
+        player.position = 42_000.7
+        player.volume = 70
+        player.paused = True
+        player.channel = MagicMock(id=10)
+        player.queue = wavelink.Queue()
+        player.queue.put(list(queue))
+        player.queue.mode = wavelink.QueueMode.loop_all
+        player.node = MagicMock()
+        return player
+
+    def test_saved_queue_uses_encoded_tracks(self):
+        from tests.test_playlist_snapshots import make_track
+        bot = make_bot()
+        player = self._player(current=make_track("cur"), queue=[make_track("a"), make_track("b")])
+        bot.get_guild.return_value.voice_client = player
+        cog = Music(bot)
+        cog._guilds.touch(1).text_channel_id = 20
 
-        with patch.object(cog, "_publish_now_playing", new_callable=AsyncMock) as mock_publish:
-            await cog.on_wavelink_track_start(payload)
-            await cog.cog_after_invoke(ctx)
+        saved = cog._saved_queue(1)
+
+        assert saved.current == "QAAAcur"
+        assert saved.queue == ["QAAAa", "QAAAb"]
+        assert (saved.voice_channel_id, saved.text_channel_id) == (10, 20)
+        assert (saved.position, saved.volume, saved.paused) == (42_000, 70, True)
+        assert saved.loop_mode == wavelink.QueueMode.loop_all.value
+
+    @pytest.mark.asyncio
+    async def test_player_update_saves_playback_without_the_queue(self):
+        from tests.test_playlist_snapshots import make_track
+        bot = make_bot()
+        player = self._player(current=make_track("cur"), queue=[make_track("a")])
+        bot.get_guild.return_value.voice_client = player
+        cog = Music(bot)
+        cog._queue_writer = MagicMock()
+
+        await cog.on_wavelink_player_update(MagicMock(player=player))
+
+        cog._queue_writer.mark_dirty.assert_called_once_with(player.guild.id, queue=False)
+        assert cog._saved_queue(1, False).queue is None
+
+    def test_nothing_to_save_without_player(self):
+        bot = make_bot()
+        bot.get_guild.return_value.voice_client = None
+
+        assert Music(bot)._saved_queue(1) is None
+
+    @pytest.mark.asyncio
+    async def test_restore_rejoins_voice_and_decodes_in_one_request(self):
+        from utils.queue_store import SavedQueue
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        cog = Music(bot)
+        await cog._queue_store.write([
+            SavedQueue(1, 10, 20, "QAAAcur", 42_000, 70, True, 2, ["QAAAa", "QAAAb"])
+        ])
+        player = self._player()
+        player.node.send = AsyncMock(return_value=self._track_payloads("cur", "a", "b"))
+        guild = bot.get_guild.return_value
+        guild.voice_client = None
+        channel = guild.get_channel.return_value
+        channel.members = [MagicMock(bot=False)]
+        channel.connect = AsyncMock(return_value=player)
+
+        await cog._restore_saved_queues()
+
+        guild.get_channel.assert_called_once_with(10)
+        player.node.send.assert_awaited_once_with(
+            "POST", path="v4/decodetracks", data=["QAAAcur", "QAAAa", "QAAAb"]
+        )
+        played = player.play.await_args
+        assert played.args[0].identifier == "cur"
+        assert played.kwargs == {"start": 42_000, "volume": 70, "paused": True, "add_history": False}
+        assert [t.identifier for t in player.queue] == ["a", "b"]
+        assert player.queue.mode is wavelink.QueueMode.loop_all
+        assert cog._guilds.get(1).text_channel_id == 20
+        assert len(await cog._queue_store.load_all()) == 1
+
+    @pytest.mark.asyncio
+    async def test_resumed_player_only_gets_its_queue_back(self):
+        from tests.test_playlist_snapshots import make_track
+        from utils.queue_store import SavedQueue
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        cog = Music(bot)
+        await cog._queue_store.write([SavedQueue(1, 10, 20, "QAAAcur", 0, 70, False, 0, ["QAAAa"])])
+        player = self._player(current=make_track("cur"))
+        player.node.send = AsyncMock(return_value=self._track_payloads("a"))
+        bot.get_guild.return_value.voice_client = player
+
+        await cog._restore_saved_queues()
+
+        player.node.send.assert_awaited_once_with("POST", path="v4/decodetracks", data=["QAAAa"])
+        player.play.assert_not_awaited()
+        assert [t.identifier for t in player.queue] == ["a"]
+        assert cog._guilds.get(1).text_channel_id == 20
+
+    @pytest.mark.asyncio
+    async def test_queues_that_cannot_be_restored_are_dropped(self):
+        from utils.queue_store import SavedQueue
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        bot.get_guild.return_value = None
+        cog = Music(bot)
+        await cog._queue_store.write([SavedQueue(1, 10, 20, "QAAAcur", 0, 70, False, 0, [])])
+
+        await cog._restore_saved_queues()
+
+        assert await cog._queue_store.load_all() == []
+
+    @pytest.mark.asyncio
+    async def test_restores_only_once_per_process(self):
+        bot = make_bot()
+        bot.wait_until_ready = AsyncMock()
+        cog = Music(bot)
+        cog._queue_store.load_all = AsyncMock(return_value=[])
+
+        await cog._restore_saved_queues()
+        await cog._restore_saved_queues()
 
-        assert mock_publish.call_count == 2
+        cog._queue_store.load_all.assert_awaited_once()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tests.conftest import FakeClock
+from utils import outbound as outbound_module
+from utils.outbound import OutboundScheduler
+
+
+@pytest.fixture
+def clock(fake_clock: FakeClock, monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Reloj falso: ``asyncio.sleep`` del scheduler solo avanza el reloj."""
+    fake = fake_clock
+    real_sleep = asyncio.sleep
+    sleeps: list[float] = []
+
+    async def fake_sleep(delay: float) -> None:
+        sleeps.append(delay)
+        fake.now += delay
+        await real_sleep(0)
+
+    monkeypatch.setattr(outbound_module.asyncio, "sleep", fake_sleep)
+    fake.sleeps = sleeps  # type: ignore[attr-defined]
+    return fake
+
+
+def make_channel(channel_id: int = 10) -> MagicMock:
+    channel = MagicMock()
+    channel.id = channel_id
+    channel.send = AsyncMock(side_effect=lambda **kwargs: MagicMock(kwargs=kwargs))
+    return channel
+
+
+async def drain(scheduler: OutboundScheduler) -> None:
+    workers = [lane.worker for lane in scheduler._lanes.values() if lane.worker is not None]
+    await asyncio.gather(*workers)
+
+
+@pytest.mark.asyncio
+async def test_send_returns_sent_message(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(clock=clock)
+    channel = make_channel()
+
+    message = await scheduler.send(channel, content="hola")
+
+    channel.send.assert_awaited_once_with(content="hola")
+    assert message.kwargs == {"content": "hola"}
+    assert scheduler.sent == 1
+
+
+@pytest.mark.asyncio
+async def test_waits_for_bucket_instead_of_hitting_rate_limit(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(rate=2, per=10.0, clock=clock)
+    channel = make_channel()
+
+    for i in range(3):
+        scheduler.post(channel, content=str(i))
+    await drain(scheduler)
+
+    assert [c.kwargs["content"] for c in channel.send.await_args_list] == ["0", "1", "2"]
+    assert clock.sleeps == [pytest.approx(5.0)]
+
+
+@pytest.mark.asyncio
+async def test_channels_have_independent_buckets(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(rate=1, per=10.0, clock=clock)
+    first, second = make_channel(1), make_channel(2)
+
+    await scheduler.send(first, content="a")
+    await scheduler.send(second, content="b")
+
+    assert clock.sleeps == []
+
+
+@pytest.mark.asyncio
+async def test_merges_repeated_notices_while_queued(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(clock=clock)
+    channel = make_channel()
+    single = MagicMock(name="single")
+
+    for _ in range(7):
+        scheduler.post(
+            channel,
+            embed=single,
+            merge_key="skipped",
+            merge=lambda n: f"{n} saltadas",
+            hold=1.0,
+        )
+    await drain(scheduler)
+
+    channel.send.assert_awaited_once_with(embed="7 saltadas")
+    assert scheduler.merged == 6
+
+
+@pytest.mark.asyncio
+async def test_single_notice_uses_original_embed(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(clock=clock)
+    channel = make_channel()
+    single = MagicMock(name="single")
+
+    scheduler.post(channel, embed=single, merge_key="skipped", merge=lambda n: f"{n} saltadas", hold=1.0)
+    await drain(scheduler)
+
+    channel.send.assert_awaited_once_with(embed=single)
+
+
+@pytest.mark.asyncio
+async def test_held_notice_does_not_block_jobs_behind_it(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(clock=clock)
+    channel = make_channel()
+    ran_at: list[float] = []
+
+    async def render() -> None:
+        ran_at.append(clock.now)
+
+    scheduler.post(channel, content="saltada", merge_key="skipped", merge=lambda n: n, hold=1.5)
+    await scheduler.run(channel, render, replace_key="np")
+    await drain(scheduler)
+
+    assert ran_at == [0.0]
+    channel.send.assert_awaited_once_with(content="saltada")
+    assert clock.now == pytest.approx(1.5)
+
+
+@pytest.mark.asyncio
+async def test_run_is_charged_one_token_per_request(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(rate=2, per=10.0, clock=clock)
+    channel = make_channel()
+
+    async def delete_and_send() -> None:
+        await scheduler.throttle(channel)
+        await scheduler.throttle(channel)
+
+    await scheduler.run(channel, delete_and_send)
+    await scheduler.send(channel, content="después")
+
+    assert clock.sleeps == [pytest.approx(5.0)]
+
+
+@pytest.mark.asyncio
+async def test_newer_replace_key_drops_stale_pending_job(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(rate=1, per=10.0, clock=clock)
+    channel = make_channel()
+    operation = AsyncMock(side_effect=["first", "second", "third"])
+
+    first = asyncio.ensure_future(scheduler.run(channel, operation, replace_key="np"))
+    await asyncio.sleep(0)
+    stale = asyncio.ensure_future(scheduler.run(channel, operation, replace_key="np"))
+    fresh = asyncio.ensure_future(scheduler.run(channel, operation, replace_key="np"))
+
+    assert await first == "first"
+    assert await stale is None
+    assert await fresh == "second"
+    assert operation.await_count == 2
+    assert scheduler.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_discard_resolves_pending_job_without_running_it(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(rate=1, per=10.0, clock=clock)
+    channel = make_channel()
+    operation = AsyncMock(return_value="done")
+
+    await scheduler.run(channel, operation)
+    pending = asyncio.ensure_future(scheduler.run(channel, operation, replace_key="np"))
+    await asyncio.sleep(0)
+
+    assert scheduler.discard("np") is True
+    assert await pending is None
+    assert operation.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_post_does_not_stop_the_lane(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(clock=clock)
+    channel = make_channel()
+    channel.send.side_effect = [RuntimeError("boom"), MagicMock()]
+
+    scheduler.post(channel, content="a")
+    scheduler.post(channel, content="b")
+    await drain(scheduler)
+
+    assert channel.send.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_send_propagates_errors_to_caller(clock: FakeClock) -> None:
+    scheduler = OutboundScheduler(clock=clock)
+    channel = make_channel()
+    channel.send.side_effect = RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await scheduler.send(channel, content="a")
+
+
+def test_for_client_shares_one_scheduler_per_bot() -> None:
+    bot, other = MagicMock(), MagicMock()
+
+    assert OutboundScheduler.for_client(bot) is OutboundScheduler.for_client(bot)
+    assert OutboundScheduler.for_client(bot) is not OutboundScheduler.for_client(other)
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+import wavelink
+
+from utils.playlist_snapshots import PlaylistSnapshotStore
+from utils.track_codec import TrackRow, pack_track, unpack_track
+
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLtest"
+
+
+def make_track(identifier: str, title: str = "Cha-La Head-Cha-La") -> wavelink.Playable:
+    return wavelink.Playable(
+        {
+            "encoded": f"QAAA{identifier}",
+            "info": {
+                "identifier": identifier,
+                "isSeekable": True,
+                "author": "Hironobu Kageyama",
+                "length": 254000,
+                "isStream": False,
+                "position": 0,
+                "title": title,
+                "uri": f"https://www.youtube.com/watch?v={identifier}",
+                "artworkUrl": "https://i.ytimg.com/vi/x/hq.jpg",
+                "isrc": None,
+                "sourceName": "youtube",
+            },
+            "pluginInfo": {},
+            "userData": {},
+        }
+    )
+
+
+def test_pack_and_unpack_keep_playback_fields() -> None:
+    track = make_track("YnL70cee6qo")
+
+    row = pack_track(track)
+    rebuilt = unpack_track(row)
+
+    assert isinstance(row, TrackRow)
+    assert rebuilt.encoded == track.encoded
+    assert rebuilt.title == track.title
+    assert rebuilt.author == track.author
+    assert rebuilt.length == track.length
+    assert rebuilt.uri == track.uri
+    assert rebuilt.artwork == track.artwork
+    assert rebuilt == track
+
+
+def test_rows_saved_without_artwork_still_unpack() -> None:
+    row = TrackRow(*pack_track(make_track("YnL70cee6qo"))[:7])
+
+    assert row.artwork is None
+    assert unpack_track(row).artwork is None
+
+
+@pytest.mark.asyncio
+async def test_save_then_load_roundtrip(tmp_path) -> None:
+    store = PlaylistSnapshotStore(str(tmp_path / "nested" / "bot.sqlite3"))
+    tracks = [make_track("aaaaaaaaaaa", "Uno"), make_track("bbbbbbbbbbb", "Dos")]
+
+    await store.save(PLAYLIST_URL, "DBZ", tracks)
+    snapshot = await store.load(PLAYLIST_URL)
+
+    assert snapshot is not None
+    assert snapshot.name == "DBZ"
+    assert len(snapshot) == 2
+    assert [t.title for t in snapshot.tracks()] == ["Uno", "Dos"]
+    assert [t.encoded for t in snapshot.tracks()] == [t.encoded for t in tracks]
+    assert snapshot.age < 5
+
+
+@pytest.mark.asyncio
+async def test_load_missing_snapshot_returns_none(tmp_path) -> None:
+    store = PlaylistSnapshotStore(str(tmp_path / "bot.sqlite3"))
+
+    assert await store.load(PLAYLIST_URL) is None
+
+
+@pytest.mark.asyncio
+async def test_save_replaces_previous_snapshot(tmp_path) -> None:
+    store = PlaylistSnapshotStore(str(tmp_path / "bot.sqlite3"))
+    await store.save(PLAYLIST_URL, "DBZ", [make_track("aaaaaaaaaaa")])
+    before = time.time()
+    await store.save(PLAYLIST_URL, "DBZ", [make_track("bbbbbbbbbbb"), make_track("ccccccccccc")])
+
+    snapshot = await store.load(PLAYLIST_URL)
+
+    assert len(snapshot) == 2
+    assert snapshot.fetched_at >= before
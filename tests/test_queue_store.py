@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from utils import queue_store as queue_store_module
+from utils.queue_store import QueueStateWriter, QueueStore, SavedQueue
+
+
+def make_saved(guild_id: int = 1, *, queue: list[str] | None = None) -> SavedQueue:
+    return SavedQueue(
+        guild_id=guild_id,
+        voice_channel_id=10,
+        text_channel_id=20,
+        current="QAAAcurrent",
+        position=42_000,
+        volume=70,
+        paused=True,
+        loop_mode=2,
+        queue=queue if queue is not None else ["QAAAa", "QAAAb"],
+    )
+
+
+@pytest.mark.asyncio
+async def test_store_round_trip(tmp_path) -> None:
+    store = QueueStore(str(tmp_path / "state" / "bot.sqlite3"))
+
+    assert await store.load_all() == []
+
+    await store.write([make_saved(1), make_saved(2, queue=[])])
+    await store.write([make_saved(1, queue=["QAAAz"])], deleted=[2])
+
+    assert await QueueStore(store.path).load_all() == [make_saved(1, queue=["QAAAz"])]
+
+
+@pytest.mark.asyncio
+async def test_playback_only_write_keeps_the_saved_queue(tmp_path) -> None:
+    store = QueueStore(str(tmp_path / "bot.sqlite3"))
+    await store.write([make_saved(1, queue=["QAAAa"])])
+
+    await store.write([make_saved(1)._replace(position=99_000, queue=None)])
+
+    assert await store.load_all() == [make_saved(1, queue=["QAAAa"])._replace(position=99_000)]
+
+
+@pytest.mark.asyncio
+async def test_player_updates_do_not_read_the_queue() -> None:
+    store = MagicMock()
+    store.write = AsyncMock()
+    asked: list[tuple[int, bool]] = []
+
+    def snapshot(guild_id: int, with_queue: bool) -> SavedQueue:
+        asked.append((guild_id, with_queue))
+        return make_saved(guild_id, queue=None if not with_queue else ["QAAAa"])
+
+    writer = QueueStateWriter(store, snapshot, delay=0)
+    writer.mark_dirty(1, queue=False)
+    writer.mark_dirty(2, queue=False)
+    writer.mark_dirty(2)
+    writer.mark_dirty(2, queue=False)
+    await writer._task
+
+    assert sorted(asked) == [(1, False), (2, True)]
+
+
+@pytest.mark.asyncio
+async def test_writer_batches_changes_into_one_write() -> None:
+    store = MagicMock()
+    store.write = AsyncMock()
+    states = {1: make_saved(1), 2: None}
+    writer = QueueStateWriter(store, lambda guild_id, with_queue: states[guild_id], delay=0)
+
+    for _ in range(5):
+        writer.mark_dirty(1)
+    writer.mark_dirty(2)
+    await writer._task
+
+    store.write.assert_awaited_once_with([states[1]], [2])
+    assert writer.writes == 1
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_writer_reads_state_at_write_time() -> None:
+    store = MagicMock()
+    store.write = AsyncMock()
+    states = {1: make_saved(1, queue=["QAAAold"])}
+    writer = QueueStateWriter(store, lambda guild_id, with_queue: states[guild_id], delay=0)
+
+    writer.mark_dirty(1)
+    states[1] = make_saved(1, queue=["QAAAnew"])
+    await writer._task
+
+    assert store.write.await_args.args[0] == [states[1]]
+
+
+@pytest.mark.asyncio
+async def test_failed_write_keeps_guilds_pending() -> None:
+    store = MagicMock()
+    store.write = AsyncMock(side_effect=[OSError("disk full"), None])
+    writer = QueueStateWriter(store, lambda guild_id, with_queue: make_saved(guild_id), delay=0)
+
+    writer.mark_dirty(1)
+    assert await writer.flush() is False
+    assert writer.pending == 1 and writer.failures == 1
+
+    await writer.flush()
+    assert writer.pending == 0
+    assert store.write.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried_without_new_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = MagicMock()
+    store.write = AsyncMock(side_effect=[OSError("disk full"), None])
+    writer = QueueStateWriter(store, lambda guild_id, with_queue: None, delay=0)
+    sleeps: list[float] = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay: float) -> None:
+        sleeps.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(queue_store_module.asyncio, "sleep", fake_sleep)
+
+    writer.mark_dirty(1)
+    await writer._task
+
+    assert store.write.await_args_list[-1].args == ([], [1])
+    assert store.write.await_count == 2
+    assert sleeps == [0, 1.0]
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_guild_marked_during_a_write_is_written_too() -> None:
+    store = MagicMock()
+    writer = QueueStateWriter(store, lambda guild_id, with_queue: None, delay=0)
+
+    async def write(saved, deleted):
+        if deleted == [1]:
+            writer.mark_dirty(2)
+
+    store.write = AsyncMock(side_effect=write)
+
+    writer.mark_dirty(1)
+    await writer._task
+
+    assert [call.args[1] for call in store.write.await_args_list] == [[1], [2]]
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_without_waiting_for_the_delay() -> None:
+    store = MagicMock()
+    store.write = AsyncMock()
+    writer = QueueStateWriter(store, lambda guild_id, with_queue: make_saved(guild_id), delay=3600)
+
+    writer.mark_dirty(1)
+    await asyncio.wait_for(writer.close(), timeout=1)
+
+    store.write.assert_awaited_once()
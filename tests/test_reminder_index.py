@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from utils.reminder_index import PendingReminderIndex
+
+NOW = datetime(2026, 5, 25, 12, 0, tzinfo=timezone.utc)
+
+
+def _reminder(reminder_id: str, minutes: int, created_by: str = "42", target_ids: list[str] | None = None) -> dict:
+    return {
+        "id": reminder_id,
+        "message": "ver la peli",
+        "target_ids": target_ids or ["111"],
+        "fire_at": (NOW + timedelta(minutes=minutes)).isoformat(),
+        "channel_id": "333",
+        "created_by": created_by,
+        "done": False,
+    }
+
+
+def _index(*reminders: dict) -> PendingReminderIndex:
+    index = PendingReminderIndex(clock=NOW.timestamp)
+    for reminder in reminders:
+        index.add(reminder)
+    return index
+
+
+def test_due_before_is_ordered_and_cut_at_until() -> None:
+    index = _index(_reminder("c", 30), _reminder("a", 10), _reminder("b", 10))
+
+    due = index.due_before((NOW + timedelta(minutes=10)).timestamp())
+
+    assert [reminder["id"] for reminder in due] == ["a", "b"]
+
+
+def test_add_replaces_and_remove_forgets() -> None:
+    index = _index(_reminder("a", 10))
+
+    index.add(_reminder("a", 50))
+    assert index.due_before((NOW + timedelta(minutes=20)).timestamp()) == []
+
+    assert index.remove("a")["id"] == "a"
+    assert index.remove("a") is None
+    assert len(index) == 0
+
+
+def test_page_for_creator_pages_by_cursor_and_skips_past() -> None:
+    index = _index(
+        _reminder("old", -5),
+        *(_reminder(f"r{i}", i + 1) for i in range(7)),
+        _reminder("other", 3, created_by="99"),
+    )
+
+    first = index.page_for_creator("42", limit=5)
+    second = index.page_for_creator("42", cursor=first.next_cursor, limit=5)
+
+    assert [reminder["id"] for reminder in first.items] == ["r0", "r1", "r2", "r3", "r4"]
+    assert first.next_cursor == (first.items[-1]["fire_at"], "r4")
+    assert [reminder["id"] for reminder in second.items] == ["r5", "r6"]
+    assert second.next_cursor is None
+
+
+def test_page_for_creator_filters_by_target() -> None:
+    index = _index(_reminder("a", 1, target_ids=["111"]), _reminder("b", 2, target_ids=["111", "222"]))
+
+    page = index.page_for_creator("42", target_id="222")
+
+    assert [reminder["id"] for reminder in page.items] == ["b"]
+
+
+def test_replace_window_reports_changed_and_removed() -> None:
+    index = _index(_reminder("kept", 5), _reminder("moved", 10), _reminder("gone", 15), _reminder("later", 90))
+    until = (NOW + timedelta(minutes=60)).timestamp()
+
+    changed, removed = index.replace_window(
+        until, [_reminder("kept", 5), _reminder("moved", 20), _reminder("new", 30)]
+    )
+
+    assert sorted(reminder["id"] for reminder in changed) == ["moved", "new"]
+    assert [reminder["id"] for reminder in removed] == ["gone"]
+    assert "later" in index
+    assert "gone" not in index
+
+
+def test_replace_creator_marks_it_complete() -> None:
+    index = _index(_reminder("a", 1), _reminder("b", 2))
+
+    index.replace_creator("42", [_reminder("b", 2)])
+
+    assert "42" in index.complete_creators
+    assert [reminder["id"] for reminder in index.page_for_creator("42").items] == ["b"]
+    index.remove("b")
+    assert index.page_for_creator("42").items == []
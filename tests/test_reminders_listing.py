@@ -1,14 +1,19 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
+from unittest.mock import AsyncMock, MagicMock
+
 import discord
+import pytest
 
 from cogs.reminders_cog import (
     DISPLAY_TZ,
     ReminderActionsView,
+    ReminderListView,
+    Reminders,
     build_reminders_list_embed,
-    filter_user_reminders,
 )
+from utils.reminders_store import ReminderPage
 
 
 def _reminder(reminder_id: str, created_by: str) -> dict:
@@ -26,17 +31,6 @@ def _reminder(reminder_id: str, created_by: str) -> dict:
     }
 
 
-def test_filter_user_reminders_keeps_only_current_user() -> None:
-    reminders = [
-        _reminder("12345678-abcd-0000", "42"),
-        _reminder("87654321-abcd-0000", "99"),
-    ]
-
-    result = filter_user_reminders(reminders, user_id=42)
-
-    assert [item["id"] for item in result] == ["12345678-abcd-0000"]
-
-
 def test_build_reminders_list_embed_renders_ids_and_mentions() -> None:
     embed = build_reminders_list_embed(
         [
@@ -76,3 +70,109 @@ def test_reminder_actions_view_creates_one_button_per_reminder() -> None:
     assert len(view.children) == 2
     assert view.children[0].label == "Cancelar 12345678"
     assert view.children[1].label == "Cancelar 87654321"
+
+
+def _upcoming(reminder_id: str, hours: int, target_ids: list[str] | None = None) -> dict:
+    return {
+        "id": reminder_id,
+        "message": "ver la peli",
+        "target_ids": target_ids or ["111"],
+        "fire_at": (datetime.now(timezone.utc) + timedelta(hours=hours)).isoformat(),
+        "channel_id": "333",
+        "created_by": "42",
+        "done": False,
+    }
+
+
+def _listing_cog(*pages: ReminderPage) -> Reminders:
+    cog = Reminders(MagicMock())
+    cog.supabase_url = "https://example.supabase.co"
+    cog.supabase_key = "test-key"
+    cog.reminders_channel_id = "333"
+    cog.reminder_user_ella_id = "222"
+    cog.store = MagicMock()
+    cog.store.list_for_user = AsyncMock(side_effect=list(pages))
+    return cog
+
+
+def _interaction(user_id: int = 42) -> MagicMock:
+    interaction = MagicMock()
+    interaction.user.id = user_id
+    interaction.response.send_message = AsyncMock()
+    interaction.response.edit_message = AsyncMock()
+    return interaction
+
+
+@pytest.mark.asyncio
+async def test_first_listing_fills_the_user_from_the_store_then_reads_locally() -> None:
+    rows = [_upcoming(f"rem-{i}", i + 1) for i in range(7)]
+    cog = _listing_cog(ReminderPage(rows, None))
+    interaction = _interaction()
+
+    await cog.show_reminders.callback(cog, interaction)
+    await cog.show_reminders.callback(cog, interaction)
+
+    cog.store.list_for_user.assert_awaited_once_with("42", cursor=None, limit=100)
+    kwargs = interaction.response.send_message.call_args.kwargs
+    assert kwargs["ephemeral"] is True
+    assert kwargs["embed"].footer.text == "Página 1"
+    assert kwargs["embed"].description.count("ver la peli") == 5
+    view = kwargs["view"]
+    assert [child.custom_id for child in view.children][-2:] == ["reminders:prev", "reminders:next"]
+    assert view.children[-2].disabled is True
+    assert view.children[-1].disabled is False
+
+
+@pytest.mark.asyncio
+async def test_paging_buttons_walk_forward_and_back_by_cursor() -> None:
+    cog = _listing_cog(ReminderPage([_upcoming(f"rem-{i}", i + 1) for i in range(7)], None))
+    first = await cog.reminders_page("42")
+    view = ReminderListView(cog, first, "42", cursors=[None])
+    interaction = _interaction()
+
+    await view.next_page(interaction)
+    next_view = interaction.response.edit_message.call_args.kwargs["view"]
+    await next_view.prev_page(interaction)
+
+    assert [row["id"] for row in next_view.page.items] == ["rem-5", "rem-6"]
+    assert next_view.cursors == [None, first.next_cursor]
+    assert next_view.children[-1].disabled is True
+    assert interaction.response.edit_message.call_args.kwargs["view"].cursors == [None]
+    cog.store.list_for_user.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_show_reminders_filters_by_target() -> None:
+    cog = _listing_cog(ReminderPage([_upcoming("rem-1", 1, ["111"])], None))
+    interaction = _interaction()
+    para = MagicMock()
+    para.value = "ella"
+
+    await cog.show_reminders.callback(cog, interaction, para)
+
+    kwargs = interaction.response.send_message.call_args.kwargs
+    assert kwargs["embed"].description == "No tienes recordatorios pendientes."
+    assert "view" not in kwargs
+
+
+@pytest.mark.asyncio
+async def test_created_and_cancelled_reminders_update_the_local_listing() -> None:
+    cog = _listing_cog(ReminderPage([_upcoming("rem-1", 1)], None))
+    cog.store.mark_done = AsyncMock()
+    await cog.reminders_page("42")
+
+    cog.index.add(_upcoming("rem-2", 2))
+    await cog.cancel_reminder("rem-1")
+
+    page = await cog.reminders_page("42")
+    assert [row["id"] for row in page.items] == ["rem-2"]
+    cog.store.list_for_user.assert_awaited_once()
+    await cog.cog_unload()
+
+
+def test_single_page_has_no_paging_buttons() -> None:
+    view = ReminderListView(
+        _listing_cog(), ReminderPage([_reminder("12345678-abcd-0000", "42")], None), "42", cursors=[None]
+    )
+
+    assert [child.custom_id for child in view.children] == ["reminder:cancel:12345678-abcd-0000"]
@@ -2,10 +2,13 @@ import asyncio
 from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock
 
+import discord
 import pytest
 
-from cogs import reminders_cog
 from cogs.reminders_cog import Reminders
+from tests.conftest import FakeClock
+from utils.reminder_scheduler import ReminderScheduler
+from utils.reminders_store import ReminderDoneWriter
 
 
 def _future_reminder() -> dict:
@@ -21,51 +24,63 @@ def _future_reminder() -> dict:
 
 
 @pytest.mark.asyncio
-async def test_schedule_reminder_delivers_message_and_marks_done(
-    monkeypatch: pytest.MonkeyPatch,
-) -> None:
+async def test_schedule_reminder_delivers_message_and_marks_done() -> None:
     bot = MagicMock()
     channel = MagicMock()
     channel.send = AsyncMock()
     bot.get_channel.return_value = channel
 
     cog = Reminders(bot)
+    delivered = asyncio.Event()
     cog.store = MagicMock()
-    cog.store.mark_done = AsyncMock()
-
-    fake_sleep = AsyncMock()
-    monkeypatch.setattr(reminders_cog.asyncio, "sleep", fake_sleep)
+    cog.store.mark_done_many = AsyncMock(side_effect=lambda *_: delivered.set())
+    cog.done_writer = ReminderDoneWriter(cog.store, delay=0)
 
     reminder = _future_reminder()
+    reminder["fire_at"] = datetime.now(timezone.utc).isoformat()
 
-    task = cog.schedule_reminder(reminder)
-    assert task is not None
+    assert cog.schedule_reminder(reminder) is False
+    await asyncio.wait_for(delivered.wait(), timeout=1)
 
-    await task
-
-    fake_sleep.assert_awaited_once()
     channel.send.assert_awaited_once()
     assert channel.send.call_args.kwargs["content"] == "<@111> <@222>"
     assert channel.send.call_args.kwargs["embed"].title == "⏰ Recordatorio"
-    cog.store.mark_done.assert_awaited_once_with(reminder["id"])
+    cog.store.mark_done_many.assert_awaited_once_with([reminder["id"]])
+    assert cog.scheduler.depth == 0
+    assert reminder["id"] not in cog.index
+    await cog.cog_unload()
 
 
 @pytest.mark.asyncio
-async def test_cancel_reminder_cancels_task_and_marks_done() -> None:
+async def test_future_reminders_share_one_dispatcher_task() -> None:
+    cog = Reminders(MagicMock())
+    before = len(asyncio.all_tasks())
+
+    for i in range(100):
+        reminder = _future_reminder()
+        reminder["id"] = f"rem-{i}"
+        assert cog.schedule_reminder(reminder) is True
+    await asyncio.sleep(0)
+
+    assert cog.scheduler.depth == 100
+    assert len(asyncio.all_tasks()) == before + 1
+    await cog.cog_unload()
+
+
+@pytest.mark.asyncio
+async def test_cancel_reminder_unschedules_and_marks_done() -> None:
     bot = MagicMock()
     cog = Reminders(bot)
     cog.store = MagicMock()
     cog.store.mark_done = AsyncMock()
+    reminder = _future_reminder()
+    cog.schedule_reminder(reminder)
 
-    blocker = asyncio.Event()
-    task = asyncio.create_task(blocker.wait())
-    cog.tasks["rem-1"] = task
-
-    await cog.cancel_reminder("rem-1")
+    await cog.cancel_reminder(reminder["id"])
 
-    assert task.cancelled() is True
-    cog.store.mark_done.assert_awaited_once_with("rem-1")
-    assert "rem-1" not in cog.tasks
+    cog.store.mark_done.assert_awaited_once_with(reminder["id"])
+    assert reminder["id"] not in cog.scheduler
+    await cog.cog_unload()
 
 
 @pytest.mark.asyncio
@@ -76,7 +91,8 @@ async def test_cog_load_reschedules_pending_reminders() -> None:
     cog.supabase_key = "test-key"
     cog.reminders_channel_id = "333"
     cog.store = MagicMock()
-    cog.store.get_pending = AsyncMock(
+    cog.store.expire_overdue = AsyncMock(return_value=0)
+    cog.store.get_due_before = AsyncMock(
         return_value=[_future_reminder(), _future_reminder()]
     )
     cog.schedule_reminder = MagicMock()
@@ -84,3 +100,316 @@ async def test_cog_load_reschedules_pending_reminders() -> None:
     await cog.cog_load()
 
     assert cog.schedule_reminder.call_count == 2
+    assert cog.store.get_due_before.await_args.kwargs == {"after": cog.loaded_from}
+    await cog.cog_unload()
+
+
+@pytest.mark.asyncio
+async def test_first_window_expires_reminders_older_than_the_catchup() -> None:
+    cog = Reminders(MagicMock())
+    cog.store = MagicMock()
+    cog.store.expire_overdue = AsyncMock(return_value=3)
+    cog.store.get_due_before = AsyncMock(return_value=[])
+
+    await cog.load_next_window()
+    await cog.load_next_window()
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=cog.catchup)
+    cog.store.expire_overdue.assert_awaited_once_with(cog.loaded_from)
+    assert abs(cog.loaded_from - cutoff) < timedelta(seconds=5)
+    first_call = cog.store.get_due_before.await_args_list[0]
+    assert first_call.kwargs == {"after": cog.loaded_from}
+
+
+@pytest.mark.asyncio
+async def test_next_window_only_reads_the_new_range() -> None:
+    cog = Reminders(MagicMock())
+    cog.store = MagicMock()
+    cog.store.get_due_before = AsyncMock(return_value=[])
+
+    await cog.load_next_window()
+    first_until = cog.loaded_until
+    await cog.load_next_window()
+
+    until, = cog.store.get_due_before.await_args.args
+    assert cog.store.get_due_before.await_args.kwargs == {"after": first_until}
+    assert until == cog.loaded_until > first_until
+    assert first_until - datetime.now(timezone.utc) <= timedelta(seconds=cog.horizon)
+
+
+@pytest.mark.asyncio
+async def test_failed_window_is_read_again() -> None:
+    cog = Reminders(MagicMock())
+    cog.store = MagicMock()
+    cog.store.get_due_before = AsyncMock(side_effect=RuntimeError("supabase down"))
+
+    await cog.load_next_window()
+
+    assert cog.loaded_until is None
+
+
+@pytest.mark.asyncio
+async def test_new_reminder_beyond_the_horizon_stays_in_the_store() -> None:
+    cog = Reminders(MagicMock())
+    cog.loaded_until = datetime.now(timezone.utc) + timedelta(hours=1)
+    near = _future_reminder()
+    far = _future_reminder()
+    far["fire_at"] = (datetime.now(timezone.utc) + timedelta(days=90)).isoformat()
+
+    assert cog.is_loaded(near) is True
+    assert cog.is_loaded(far) is False
+
+
+@pytest.mark.asyncio
+async def test_reconcile_applies_external_changes_to_the_window() -> None:
+    cog = Reminders(MagicMock())
+    kept, gone, new = _future_reminder(), _future_reminder(), _future_reminder()
+    kept["id"], gone["id"], new["id"] = "kept", "gone", "new"
+    cog.store = MagicMock()
+    cog.store.get_due_before = AsyncMock(return_value=[kept, gone])
+    await cog.load_next_window()
+
+    cog.store.get_due_before = AsyncMock(return_value=[kept, new])
+    await cog.reconcile()
+
+    assert "gone" not in cog.scheduler and "gone" not in cog.index
+    assert "new" in cog.scheduler and "new" in cog.index
+    assert "kept" in cog.scheduler
+    cog.store.get_due_before.assert_awaited_once_with(cog.loaded_until, after=cog.loaded_from)
+    await cog.cog_unload()
+
+
+def _overdue_reminder() -> dict:
+    reminder = _future_reminder()
+    reminder["fire_at"] = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    return reminder
+
+
+@pytest.mark.asyncio
+async def test_reconcile_leaves_in_flight_deliveries_alone() -> None:
+    cog = Reminders(MagicMock())
+    sending = asyncio.Event()
+    release = asyncio.Event()
+
+    async def send(*_args, **_kwargs) -> None:
+        sending.set()
+        await release.wait()
+
+    cog.outbound = MagicMock()
+    cog.outbound.send = AsyncMock(side_effect=send)
+    reminder = _overdue_reminder()
+    cog.store = MagicMock()
+    cog.store.get_due_before = AsyncMock(return_value=[reminder])
+    await cog.load_next_window()
+    await asyncio.wait_for(sending.wait(), timeout=1)
+
+    await cog.reconcile()
+
+    assert cog.scheduler.in_flight(reminder["id"])
+    assert reminder["id"] not in cog.scheduler
+    release.set()
+    await cog.cog_unload()
+
+
+@pytest.mark.asyncio
+async def test_reconcile_ignores_rows_marked_done_during_the_query() -> None:
+    cog = Reminders(MagicMock())
+    cog.outbound = MagicMock()
+    cog.outbound.send = AsyncMock()
+    reminder = _overdue_reminder()
+    cog.store = MagicMock()
+    cog.store.mark_done_many = AsyncMock()
+    cog.done_writer = ReminderDoneWriter(cog.store, delay=0)
+    cog.store.get_due_before = AsyncMock(return_value=[reminder])
+    await cog.load_next_window()
+
+    async def stale_query(until, *, after=None):
+        # La entrega y su lote terminan mientras la consulta sigue en vuelo.
+        while cog.store.mark_done_many.await_count == 0 or cog.done_writer.pending:
+            await asyncio.sleep(0)
+        return [reminder]
+
+    cog.store.get_due_before = AsyncMock(side_effect=stale_query)
+    await cog.reconcile()
+
+    assert reminder["id"] not in cog.scheduler
+    assert not cog.scheduler.in_flight(reminder["id"])
+    cog.outbound.send.assert_awaited_once()
+    await cog.cog_unload()
+
+
+def _unresolved_channel_cog(error: Exception) -> Reminders:
+    bot = MagicMock()
+    bot.get_channel.return_value = None
+    bot.fetch_channel = AsyncMock(side_effect=error)
+    cog = Reminders(bot)
+    cog.outbound = MagicMock()
+    cog.outbound.send = AsyncMock()
+    cog.store = MagicMock()
+    cog.done_writer = MagicMock()
+    return cog
+
+
+@pytest.mark.asyncio
+async def test_reminder_for_a_deleted_channel_is_marked_done() -> None:
+    cog = _unresolved_channel_cog(discord.NotFound(MagicMock(status=404), "Unknown Channel"))
+    reminder = _future_reminder()
+    cog.index.add(reminder)
+
+    await cog._deliver_reminder(reminder)
+
+    cog.outbound.send.assert_not_awaited()
+    cog.done_writer.mark_done.assert_called_once_with(reminder["id"])
+    assert reminder["id"] not in cog.index
+
+
+@pytest.mark.asyncio
+async def test_transient_channel_error_leaves_the_reminder_pending() -> None:
+    cog = _unresolved_channel_cog(discord.HTTPException(MagicMock(status=503), "Service Unavailable"))
+    reminder = _future_reminder()
+    cog.index.add(reminder)
+
+    await cog._deliver_reminder(reminder)
+
+    cog.done_writer.mark_done.assert_not_called()
+    assert reminder["id"] in cog.index
+
+
+@pytest.mark.asyncio
+async def test_overdue_burst_is_marked_done_in_one_update() -> None:
+    cog = Reminders(MagicMock())
+    cog.outbound = MagicMock()
+    cog.outbound.send = AsyncMock()
+    cog.store = MagicMock()
+    cog.store.mark_done = AsyncMock()
+    written = asyncio.Event()
+    cog.store.mark_done_many = AsyncMock(side_effect=lambda *_: written.set())
+    cog.done_writer = ReminderDoneWriter(cog.store, delay=0.05)
+    overdue = []
+    for i in range(30):
+        reminder = _future_reminder()
+        reminder["id"] = f"rem-{i}"
+        reminder["fire_at"] = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+        overdue.append(reminder)
+    cog.store.get_due_before = AsyncMock(return_value=overdue)
+
+    await cog.load_next_window()
+    await asyncio.wait_for(written.wait(), timeout=1)
+
+    cog.store.mark_done.assert_not_awaited()
+    cog.store.mark_done_many.assert_awaited_once()
+    assert sorted(cog.store.mark_done_many.await_args.args[0]) == sorted(r["id"] for r in overdue)
+    await cog.cog_unload()
+
+
+@pytest.mark.asyncio
+async def test_reconcile_skips_reminders_waiting_for_their_done_batch() -> None:
+    cog = Reminders(MagicMock())
+    reminder = _future_reminder()
+    cog.store = MagicMock()
+    cog.store.get_due_before = AsyncMock(return_value=[reminder])
+    cog.store.mark_done_many = AsyncMock()
+    cog.done_writer = ReminderDoneWriter(cog.store, delay=0)
+    await cog.load_next_window()
+    cog.scheduler.cancel(reminder["id"])
+    cog.index.remove(reminder["id"])
+    cog.done_writer.mark_done(reminder["id"])
+
+    await cog.reconcile()
+
+    assert reminder["id"] not in cog.scheduler
+    await cog.cog_unload()
+    cog.store.mark_done_many.assert_awaited_once_with([reminder["id"]])
+
+
+@pytest.fixture
+def clock(fake_clock: FakeClock) -> FakeClock:
+    fake_clock.now = 1_000.0
+    return fake_clock
+
+
+@pytest.mark.asyncio
+async def test_scheduler_delivers_in_fire_at_order(clock: FakeClock) -> None:
+    delivered: list[str] = []
+    done = asyncio.Event()
+
+    async def deliver(payload: str) -> None:
+        delivered.append(payload)
+        if len(delivered) == 3:
+            done.set()
+
+    scheduler = ReminderScheduler(deliver, clock=clock)
+    scheduler.schedule("b", 1_002.0, "b")
+    scheduler.schedule("c", 1_003.0, "c")
+    scheduler.schedule("a", 1_001.0, "a")
+
+    clock.now = 1_010.0
+    scheduler._wake()
+    await asyncio.wait_for(done.wait(), timeout=1)
+
+    assert delivered == ["a", "b", "c"]
+    assert scheduler.dispatched == 3
+    assert scheduler.max_lag == pytest.approx(9.0)
+    scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancel_and_reschedule_by_id(clock: FakeClock) -> None:
+    scheduler = ReminderScheduler(AsyncMock(), clock=clock)
+    scheduler.schedule("a", 1_100.0, "a")
+    scheduler.schedule("b", 1_200.0, "b")
+
+    assert scheduler.cancel("a") is True
+    assert scheduler.cancel("a") is False
+    scheduler.schedule("b", 1_050.0, "b2")
+
+    assert scheduler.depth == 1
+    assert scheduler.next_fire_at() == 1_050.0
+    scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_earlier_reminder_wakes_the_dispatcher(clock: FakeClock) -> None:
+    deliver = AsyncMock()
+    scheduler = ReminderScheduler(deliver, clock=clock)
+    scheduler.schedule("late", 1_000_000.0, "late")
+    await asyncio.sleep(0)
+
+    scheduler.schedule("now", 1_000.0, "now")
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    deliver.assert_awaited_once_with("now")
+    assert scheduler.depth == 1
+    scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_reports_lag_of_overdue_head(clock: FakeClock) -> None:
+    scheduler = ReminderScheduler(AsyncMock(), clock=clock)
+    scheduler._ensure_running = lambda: None  # sin despachador: solo se mide
+
+    scheduler.schedule("a", 995.0, "a")
+
+    assert scheduler.lag == pytest.approx(5.0)
+    assert scheduler.stats()["depth"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_does_not_stop_the_dispatcher(clock: FakeClock) -> None:
+    done = asyncio.Event()
+    calls: list[str] = []
+
+    async def deliver(payload: str) -> None:
+        calls.append(payload)
+        if payload == "bad":
+            raise RuntimeError("boom")
+        done.set()
+
+    scheduler = ReminderScheduler(deliver, clock=clock)
+    scheduler.schedule("bad", 990.0, "bad")
+    scheduler.schedule("good", 991.0, "good")
+    await asyncio.wait_for(done.wait(), timeout=1)
+
+    assert calls == ["bad", "good"]
+    scheduler.close()
@@ -5,7 +5,7 @@ from unittest.mock import AsyncMock, MagicMock
 import pytest
 
 from utils import reminders_store
-from utils.reminders_store import RemindersStore
+from utils.reminders_store import ReminderDoneWriter, RemindersStore
 
 
 @pytest.mark.asyncio
@@ -112,6 +112,106 @@ async def test_get_pending_returns_rows(monkeypatch: pytest.MonkeyPatch) -> None
     assert result[0]["id"] == "rem-1"
 
 
+@pytest.mark.asyncio
+async def test_get_due_before_queries_a_fire_at_range(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client = MagicMock()
+    query = MagicMock()
+    query.eq.return_value = query
+    query.lte.return_value = query
+    query.gt.return_value = query
+    query.order.return_value = query
+    query.execute = AsyncMock(return_value=SimpleNamespace(data=[{"id": "rem-1"}]))
+    table = MagicMock()
+    table.select.return_value = query
+    client.table.return_value = table
+
+    async def fake_create_client(url: str, key: str):
+        return client
+
+    monkeypatch.setattr(
+        reminders_store, "_create_async_supabase_client", fake_create_client
+    )
+
+    store = RemindersStore("https://example.supabase.co", "test-key")
+    after = datetime(2026, 5, 26, 1, 0, tzinfo=timezone.utc)
+    until = datetime(2026, 5, 26, 2, 0, tzinfo=timezone.utc)
+
+    result = await store.get_due_before(until, after=after)
+
+    query.eq.assert_called_once_with("done", False)
+    query.lte.assert_called_once_with("fire_at", "2026-05-26T02:00:00+00:00")
+    query.gt.assert_called_once_with("fire_at", "2026-05-26T01:00:00+00:00")
+    query.order.assert_called_once_with("fire_at")
+    assert result == [{"id": "rem-1"}]
+
+
+def _list_client(rows: list[dict]) -> tuple[MagicMock, MagicMock]:
+    client = MagicMock()
+    query = MagicMock()
+    for method in ("eq", "contains", "gt", "or_", "order", "limit"):
+        getattr(query, method).return_value = query
+    query.execute = AsyncMock(return_value=SimpleNamespace(data=rows))
+    client.table.return_value.select.return_value = query
+    return client, query
+
+
+@pytest.mark.asyncio
+async def test_list_for_user_filters_server_side_and_returns_cursor(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    rows = [
+        {"id": f"rem-{i}", "fire_at": f"2026-05-26T0{i}:00:00+00:00"} for i in range(3)
+    ]
+    client, query = _list_client(rows)
+
+    async def fake_create_client(url: str, key: str):
+        return client
+
+    monkeypatch.setattr(
+        reminders_store, "_create_async_supabase_client", fake_create_client
+    )
+
+    store = RemindersStore("https://example.supabase.co", "test-key")
+
+    page = await store.list_for_user("444", target_id="111", limit=2)
+
+    assert query.eq.call_args_list[0].args == ("created_by", "444")
+    query.contains.assert_called_once_with("target_ids", ["111"])
+    assert query.gt.call_args.args[0] == "fire_at"
+    query.limit.assert_called_once_with(3)
+    assert [row["id"] for row in page.items] == ["rem-0", "rem-1"]
+    assert page.next_cursor == ("2026-05-26T01:00:00+00:00", "rem-1")
+
+
+@pytest.mark.asyncio
+async def test_list_for_user_continues_after_cursor(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client, query = _list_client([{"id": "rem-2", "fire_at": "2026-05-26T02:00:00+00:00"}])
+
+    async def fake_create_client(url: str, key: str):
+        return client
+
+    monkeypatch.setattr(
+        reminders_store, "_create_async_supabase_client", fake_create_client
+    )
+
+    store = RemindersStore("https://example.supabase.co", "test-key")
+
+    page = await store.list_for_user(
+        "444", cursor=("2026-05-26T01:00:00+00:00", "rem-1"), limit=2
+    )
+
+    query.or_.assert_called_once_with(
+        'fire_at.gt."2026-05-26T01:00:00+00:00",'
+        'and(fire_at.eq."2026-05-26T01:00:00+00:00",id.gt.rem-1)'
+    )
+    query.gt.assert_not_called()
+    assert page.next_cursor is None
+
+
 @pytest.mark.asyncio
 async def test_mark_done_updates_row(monkeypatch: pytest.MonkeyPatch) -> None:
     client = MagicMock()
@@ -138,6 +238,90 @@ async def test_mark_done_updates_row(monkeypatch: pytest.MonkeyPatch) -> None:
     query.eq.assert_called_once_with("id", "rem-1")
 
 
+@pytest.mark.asyncio
+async def test_mark_done_many_updates_rows_in_one_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = MagicMock()
+    query = MagicMock()
+    query.in_.return_value = query
+    query.execute = AsyncMock(return_value=SimpleNamespace(data=[]))
+    client.table.return_value.update.return_value = query
+
+    async def fake_create_client(url: str, key: str):
+        return client
+
+    monkeypatch.setattr(
+        reminders_store, "_create_async_supabase_client", fake_create_client
+    )
+
+    store = RemindersStore("https://example.supabase.co", "test-key")
+
+    await store.mark_done_many(["rem-1", "rem-2"])
+    await store.mark_done_many([])
+
+    client.table.return_value.update.assert_called_once_with({"done": True})
+    query.in_.assert_called_once_with("id", ["rem-1", "rem-2"])
+    query.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_expire_overdue_marks_old_pending_rows_done(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = MagicMock()
+    query = MagicMock()
+    query.eq.return_value = query
+    query.lt.return_value = query
+    query.execute = AsyncMock(return_value=SimpleNamespace(data=[{"id": "a"}, {"id": "b"}]))
+    client.table.return_value.update.return_value = query
+
+    async def fake_create_client(url: str, key: str):
+        return client
+
+    monkeypatch.setattr(
+        reminders_store, "_create_async_supabase_client", fake_create_client
+    )
+
+    store = RemindersStore("https://example.supabase.co", "test-key")
+    before = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+    assert await store.expire_overdue(before) == 2
+
+    client.table.return_value.update.assert_called_once_with({"done": True})
+    query.eq.assert_called_once_with("done", False)
+    query.lt.assert_called_once_with("fire_at", before.isoformat())
+
+
+@pytest.mark.asyncio
+async def test_done_writer_batches_ids_marked_within_the_delay() -> None:
+    store = MagicMock()
+    store.mark_done_many = AsyncMock()
+    writer = ReminderDoneWriter(store, delay=0, batch_size=2)
+
+    for reminder_id in ("a", "b", "c", "a"):
+        writer.mark_done(reminder_id)
+    assert "c" in writer
+    await writer._task
+
+    assert [call.args[0] for call in store.mark_done_many.await_args_list] == [["a", "b"], ["c"]]
+    assert writer.writes == 2
+    assert writer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_done_writer_retries_a_failed_batch() -> None:
+    store = MagicMock()
+    store.mark_done_many = AsyncMock(side_effect=[RuntimeError("supabase down"), None])
+    writer = ReminderDoneWriter(store, delay=0)
+
+    writer.mark_done("a")
+    assert await writer.flush() is False
+    assert "a" in writer and writer.failures == 1
+
+    writer.mark_done("b")
+    await writer.close()
+
+    assert store.mark_done_many.await_args.args[0] == ["a", "b"]
+    assert writer.pending == 0 and writer.failures == 0
+
+
 @pytest.mark.asyncio
 async def test_create_rejects_naive_datetime(
     monkeypatch: pytest.MonkeyPatch,
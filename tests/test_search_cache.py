@@ -0,0 +1,151 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from tests.conftest import FakeClock
+from utils.search_cache import (
+    SearchCache,
+    SingleFlight,
+    TTLCache,
+    copy_result,
+    normalize_query,
+)
+
+
+def test_normalize_query_folds_text_but_keeps_urls() -> None:
+    assert normalize_query("  Cha-La   HEAD ") == "cha-la head"
+    assert normalize_query(" https://youtu.be/YnL70cee6qo ") == "https://youtu.be/YnL70cee6qo"
+
+
+def test_ttl_cache_expires_entries(fake_clock: FakeClock) -> None:
+    cache = TTLCache(maxsize=10, ttl=5, clock=fake_clock)
+    cache.set("a", 1)
+
+    fake_clock.now = 4.9
+    assert cache.get("a") == 1
+
+    fake_clock.now = 5.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.evictions == 1
+
+
+def test_search_cache_counts_hits_and_misses() -> None:
+    cache = SearchCache(maxsize=10, ttl=60, negative_ttl=10)
+    track = MagicMock()
+
+    assert cache.get("d4vd", "auto") is SearchCache.MISS
+    cache.put("d4vd", "auto", [track])
+
+    assert cache.get("D4VD ", "auto") == [track]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_search_cache_keys_by_source() -> None:
+    cache = SearchCache()
+    cache.put("d4vd", "auto", [MagicMock()])
+
+    assert cache.get("d4vd", "url") is SearchCache.MISS
+
+
+def test_search_cache_stores_negative_results_separately() -> None:
+    cache = SearchCache(maxsize=10, ttl=60, negative_ttl=10)
+    cache.put("nada", "auto", None)
+
+    assert cache.get("nada", "auto") is None
+    stats = cache.stats()
+    assert stats["negative_hits"] == 1
+    assert stats["negative_size"] == 1
+    assert stats["size"] == 0
+
+
+def test_search_cache_returns_independent_lists() -> None:
+    cache = SearchCache()
+    tracks = [MagicMock(), MagicMock()]
+    cache.put("q", "auto", tracks)
+
+    first = cache.get("q", "auto")
+    first.reverse()
+
+    assert cache.get("q", "auto") == tracks
+
+
+def test_copy_result_copies_playlist_tracks() -> None:
+    playlist = MagicMock()
+    playlist.tracks = [MagicMock(), MagicMock()]
+
+    clone = copy_result(playlist)
+    clone.tracks.pop()
+
+    assert len(playlist.tracks) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_request() -> None:
+    flights = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return ["a", "b"]
+
+    waiters = [asyncio.create_task(flights.do("q", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert flights.shared == 2
+    assert all(result == ["a", "b"] for result in results)
+    assert len({id(result) for result in results}) == 3
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_caller() -> None:
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return ["a"]
+
+    leader = asyncio.create_task(flights.do("q", fetch))
+    follower = asyncio.create_task(flights.do("q", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    assert await follower == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_every_caller() -> None:
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        raise RuntimeError("lavalink caído")
+
+    results = await asyncio.gather(
+        flights.do("q", fetch), flights.do("q", fetch), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flights) == 0
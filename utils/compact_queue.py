@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import operator
+import random
+import sys
+from array import array
+from collections.abc import MutableSequence, Sequence
+from typing import Any, Iterable, Iterator
+
+import wavelink
+
+from utils.track_codec import TrackRow, build_playable
+
+_FIELDS = ("encoded", "identifier", "title", "author", "length", "uri", "source", "artwork")
+
+
+def _track_fields(item: wavelink.Playable | TrackRow | tuple) -> tuple:
+    if isinstance(item, wavelink.Playable):
+        return (
+            item.encoded,
+            item.identifier,
+            item.title,
+            sys.intern(item.author or ""),
+            int(item.length or 0),
+            item.uri,
+            sys.intern(item.source or ""),
+            item.artwork,
+        )
+    encoded, identifier, title, author, length, uri, source, artwork = TrackRow(*item)
+    return (encoded, identifier, title, sys.intern(author or ""), int(length or 0), uri, sys.intern(source or ""), artwork)
+
+
+class TrackColumns(MutableSequence):
+    """Lista de tracks guardada por columnas.
+
+    Cada campo vive en su propia lista (las duraciones en un ``array``) en
+    vez de un ``Playable`` por track con su payload crudo, sus dicts y sus
+    objetos ``Album``/``Artist``. Autor y fuente se internan porque se repiten
+    a lo largo de una playlist. Leer un elemento arma el ``Playable`` en ese
+    momento, así que solo existen objetos completos para los tracks que van
+    a sonar. Para listar o buscar se leen las columnas directamente.
+    """
+
+    __slots__ = _FIELDS
+
+    def __init__(self, items: Iterable[wavelink.Playable | TrackRow] = ()) -> None:
+        self.encoded: list[str] = []
+        self.identifier: list[str] = []
+        self.title: list[str] = []
+        self.author: list[str] = []
+        self.length = array("q")
+        self.uri: list[str | None] = []
+        self.source: list[str] = []
+        self.artwork: list[str | None] = []
+        self.extend(items)
+
+    def _columns(self) -> tuple:
+        return tuple(getattr(self, name) for name in _FIELDS)
+
+    def _index(self, index: Any) -> int:
+        i = operator.index(index)
+        size = len(self.encoded)
+        if i < 0:
+            i += size
+        if not 0 <= i < size:
+            raise IndexError("track index out of range")
+        return i
+
+    def _playable(self, i: int) -> wavelink.Playable:
+        return build_playable(
+            self.encoded[i],
+            self.identifier[i],
+            self.title[i],
+            self.author[i],
+            self.length[i],
+            self.uri[i],
+            self.source[i],
+            self.artwork[i],
+        )
+
+    def row(self, index: int) -> TrackRow:
+        i = self._index(index)
+        return TrackRow(
+            self.encoded[i],
+            self.identifier[i],
+            self.title[i],
+            self.author[i],
+            self.length[i],
+            self.uri[i],
+            self.source[i],
+            self.artwork[i],
+        )
+
+    # ── Protocolo de secuencia ──────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.encoded)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self._playable(i) for i in range(*index.indices(len(self)))]
+        return self._playable(self._index(index))
+
+    def __setitem__(self, index, value) -> None:  # type: ignore[override]
+        if isinstance(index, slice):
+            rows = [_track_fields(item) for item in value]
+            columns = zip(*rows) if rows else [()] * len(_FIELDS)
+            for column, fields in zip(self._columns(), columns):
+                column[index] = array("q", fields) if isinstance(column, array) else list(fields)
+            return
+        i = self._index(index)
+        for column, field in zip(self._columns(), _track_fields(value)):
+            column[i] = field
+
+    def __delitem__(self, index) -> None:  # type: ignore[override]
+        if not isinstance(index, slice):
+            index = self._index(index)
+        for column in self._columns():
+            del column[index]
+
+    def __iter__(self) -> Iterator[wavelink.Playable]:
+        for i in range(len(self)):
+            yield self._playable(i)
+
+    def __contains__(self, item: object) -> bool:
+        try:
+            self.index(item)  # type: ignore[arg-type]
+        except ValueError:
+            return False
+        return True
+
+    def insert(self, index: int, value: wavelink.Playable | TrackRow) -> None:
+        for column, field in zip(self._columns(), _track_fields(value)):
+            column.insert(index, field)
+
+    def append(self, value: wavelink.Playable | TrackRow) -> None:
+        for column, field in zip(self._columns(), _track_fields(value)):
+            column.append(field)
+
+    def extend(self, values: Iterable[wavelink.Playable | TrackRow]) -> None:
+        if isinstance(values, TrackColumns):
+            for column, other in zip(self._columns(), values._columns()):
+                column.extend(other)
+            return
+        rows = [_track_fields(item) for item in values]
+        if not rows:
+            return
+        for column, fields in zip(self._columns(), zip(*rows)):
+            column.extend(fields)
+
+    def pop(self, index: int = -1) -> wavelink.Playable:
+        i = self._index(index)
+        track = self._playable(i)
+        del self[i]
+        return track
+
+    def clear(self) -> None:
+        for column in self._columns():
+            del column[:]
+
+    def copy(self) -> TrackColumns:
+        clone = TrackColumns()
+        clone.extend(self)
+        return clone
+
+    def index(self, item: wavelink.Playable, start: int = 0, stop: int | None = None) -> int:
+        """Posición del track; compara como ``Playable.__eq__`` (encoded o identifier)."""
+        encoded, identifier = item.encoded, item.identifier
+        stop = len(self) if stop is None else stop
+        for i in range(start, min(stop, len(self))):
+            if self.encoded[i] == encoded or self.identifier[i] == identifier:
+                return i
+        raise ValueError(f"{item!r} is not in queue")
+
+    def move(self, source: int, target: int) -> None:
+        """Mueve el track de ``source`` a ``target`` en todas las columnas."""
+        source, target = self._index(source), self._index(target)
+        for column in self._columns():
+            column.insert(target, column.pop(source))
+
+    def permute(self, order: Sequence[int]) -> None:
+        """Deja en las columnas los elementos de ``order``, en ese orden, sin armar ``Playable``.
+
+        Sirve para mezclar (una permutación) y para filtrar (un subconjunto).
+        """
+        for column in self._columns():
+            reordered = [column[i] for i in order]
+            column[:] = array("q", reordered) if isinstance(column, array) else reordered
+
+    def memory_size(self) -> int:
+        """Bytes aproximados: las columnas y los strings que contienen (los internados cuentan una vez)."""
+        size = sys.getsizeof(self)
+        seen: set[int] = set()
+        for column in self._columns():
+            size += sys.getsizeof(column)
+            if isinstance(column, array):
+                continue
+            for value in column:
+                if value is not None and id(value) not in seen:
+                    seen.add(id(value))
+                    size += sys.getsizeof(value)
+        return size
+
+
+class CompactQueue(wavelink.Queue):
+    """``wavelink.Queue`` respaldada por ``TrackColumns``.
+
+    Acepta ``Playable`` y filas ``TrackRow`` (p. ej. de un snapshot), y
+    devuelve ``Playable`` armados al sacar un track. El historial también es
+    compacto. Mezclar y quitar tracks trabaja sobre las columnas.
+    """
+
+    def __init__(self, *, history: bool = True) -> None:
+        super().__init__(history=False)
+        self._items = TrackColumns()  # type: ignore[assignment]
+        self._history = CompactQueue(history=False) if history else None
+
+    @staticmethod
+    def _check_compatibility(item: object) -> bool:
+        if not isinstance(item, (wavelink.Playable, TrackRow)):
+            raise TypeError("This queue is restricted to Playable objects.")
+        return True
+
+    @property
+    def columns(self) -> TrackColumns:
+        return self._items  # type: ignore[return-value]
+
+    def titles(self, start: int = 0, stop: int | None = None) -> list[str]:
+        return self.columns.title[start:stop]
+
+    def shuffle(self) -> None:
+        order = list(range(len(self.columns)))
+        random.shuffle(order)
+        self.columns.permute(order)
+
+    def remove(self, item: wavelink.Playable, /, count: int | None = 1) -> int:
+        columns = self.columns
+        matches: list[int] = []
+        start = 0
+        while count is None or len(matches) < count:
+            try:
+                start = columns.index(item, start)
+            except ValueError:
+                break
+            matches.append(start)
+            start += 1
+        for i in reversed(matches):
+            del columns[i]
+        return len(matches)
+
+    def move(self, source: int, target: int, /) -> None:
+        """Mueve un track por posición (índices desde 0)."""
+        self.columns.move(source, target)
+
+    def delete_range(self, start: int, stop: int, /) -> int:
+        """Quita los tracks de ``start`` a ``stop`` (sin incluir) y devuelve cuántos quitó."""
+        columns = self.columns
+        before = len(columns)
+        del columns[start:stop]
+        return before - len(columns)
+
+    def dedupe(self) -> int:
+        """Quita los tracks repetidos (mismo identifier), dejando la primera aparición."""
+        seen: set[str] = set()
+        keep: list[int] = []
+        for i, identifier in enumerate(self.columns.identifier):
+            if identifier not in seen:
+                seen.add(identifier)
+                keep.append(i)
+        removed = len(self.columns) - len(keep)
+        if removed:
+            self.columns.permute(keep)
+        return removed
+
+    def copy(self) -> CompactQueue:
+        clone = CompactQueue(history=False)
+        clone._items = self.columns.copy()  # type: ignore[assignment]
+        return clone
+
+    def memory_size(self) -> int:
+        return self.columns.memory_size()
+
+
+class QueueListing(Sequence):
+    """Vista viva de una cola como dicts ``{"title": ...}`` para ``build_queue_embed``.
+
+    Solo lee los títulos del tramo que se pide (una página), sin copiar la
+    cola ni armar un ``Playable`` por track.
+    """
+
+    def __init__(self, queue: wavelink.Queue) -> None:
+        self._queue = queue
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            if isinstance(self._queue, CompactQueue) and index.step in (None, 1):
+                titles = self._queue.titles(index.start or 0, index.stop)
+            else:
+                titles = [track.title for track in self._queue[index]]
+            return [{"title": title} for title in titles]
+        if isinstance(self._queue, CompactQueue):
+            return {"title": self._queue.columns.title[index]}
+        return {"title": self._queue[index].title}
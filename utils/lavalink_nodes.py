@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import logging
+import time
+from typing import Callable, NamedTuple
+from urllib.parse import urlparse
+
+import discord
+import wavelink
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se piden las stats a cada nodo.
+NODE_STATS_INTERVAL = 30.0
+# Cada cuánto se revisa el estado de conexión de los nodos (sin tocar la red).
+NODE_WATCH_INTERVAL = 1.0
+# Segundos máximos de espera por un /v4/stats antes de dar el nodo por degradado.
+NODE_STATS_TIMEOUT = 5.0
+# Penalidad a partir de la cual un nodo conectado se considera degradado.
+DEGRADED_PENALTY = 500.0
+
+
+class NodeConfig(NamedTuple):
+    identifier: str
+    uri: str
+    password: str
+
+
+def parse_node_configs(uris: str | None, passwords: str | None) -> list[NodeConfig]:
+    """Lee la lista de nodos desde ``LAVALINK_URI``/``LAVALINK_PASSWORD``.
+
+    Ambas variables aceptan valores separados por comas. Si hay una sola
+    contraseña se usa para todos los nodos. El identificador de cada nodo es
+    su ``host:puerto``.
+    """
+    uri_list = [u.strip() for u in (uris or "").split(",") if u.strip()]
+    password_list = [p.strip() for p in (passwords or "").split(",") if p.strip()]
+    if not uri_list:
+        return []
+    if len(password_list) == 1:
+        password_list *= len(uri_list)
+    if len(password_list) != len(uri_list):
+        raise ValueError(
+            f"LAVALINK_PASSWORD tiene {len(password_list)} valores para {len(uri_list)} nodos"
+        )
+
+    configs: list[NodeConfig] = []
+    seen: set[str] = set()
+    for uri, password in zip(uri_list, password_list):
+        identifier = urlparse(uri).netloc or uri
+        if identifier in seen:
+            identifier = f"{identifier}#{len(configs) + 1}"
+        seen.add(identifier)
+        configs.append(NodeConfig(identifier, uri, password))
+    return configs
+
+
+class NodeHealth(enum.Enum):
+    HEALTHY = "healthy"
+    DEGRADED = "degraded"
+    DRAINING = "draining"
+    UNHEALTHY = "unhealthy"
+
+
+class NodeLoad:
+    """Última foto de carga de un nodo, tomada de ``/v4/stats``."""
+
+    __slots__ = ("players", "playing", "system_load", "cores", "deficit", "nulled", "fetched_at")
+
+    def __init__(
+        self,
+        *,
+        players: int = 0,
+        playing: int = 0,
+        system_load: float = 0.0,
+        cores: int = 1,
+        deficit: int = 0,
+        nulled: int = 0,
+        fetched_at: float = 0.0,
+    ) -> None:
+        self.players = players
+        self.playing = playing
+        self.system_load = system_load
+        self.cores = cores
+        self.deficit = deficit
+        self.nulled = nulled
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_stats(cls, stats: wavelink.StatsResponsePayload, fetched_at: float) -> NodeLoad:
+        frames = stats.frames
+        return cls(
+            players=stats.players,
+            playing=stats.playing,
+            system_load=stats.cpu.system_load,
+            cores=stats.cpu.cores,
+            deficit=frames.deficit if frames else 0,
+            nulled=frames.nulled if frames else 0,
+            fetched_at=fetched_at,
+        )
+
+    def penalty(self, playing: int | None = None) -> float:
+        """Penalidad de carga, al estilo del balanceo de Lavalink.
+
+        Cada player reproduciendo suma 1; la CPU y los frames perdidos (nulos
+        o en déficit, por minuto) crecen de forma exponencial, así que un nodo
+        que ya está cortando audio queda muy por detrás de uno solo ocupado.
+        """
+        playing = self.playing if playing is None else playing
+        cpu = 1.05 ** (100 * self.system_load) * 10 - 10
+        deficit = 1.03 ** (500 * self.deficit / 3000) * 600 - 600
+        nulled = (1.03 ** (500 * self.nulled / 3000) * 300 - 300) * 2
+        return playing + cpu + deficit + nulled
+
+
+class NodeBalancer:
+    """Elige el nodo de Lavalink para cada player nuevo según su carga.
+
+    Un task en segundo plano consulta ``fetch_stats`` de cada nodo cada
+    ``interval`` segundos. Entre consultas, los players que el bot creó en un
+    nodo se suman a su carga para no mandar una ráfaga de guilds al mismo.
+
+    Estado de salud por nodo:
+
+    - ``UNHEALTHY``: el websocket no está conectado; nunca recibe players.
+    - ``DRAINING``: se está vaciando a propósito (``drain``); no recibe players.
+    - ``DEGRADED``: conectado, pero las stats fallan o la penalidad supera
+      ``DEGRADED_PENALTY``; solo se usa si no queda ningún nodo sano.
+    - ``HEALTHY``: el resto.
+
+    Cuando un nodo pierde la conexión o se pone a drenar, se despacha el
+    evento ``lavalink_node_unavailable(node)`` en el cliente de Discord para
+    que el cog de música mueva sus players a otro nodo. Si los nodos los
+    vigila un ``LavalinkSupervisor``, se crea con ``watch_connections=False``
+    y el supervisor avisa la pérdida con ``node_lost`` recién después de
+    reponer los players que wavelink borró al cerrarse el websocket; así un
+    solo poller decide el orden.
+    """
+
+    def __init__(
+        self,
+        nodes: list[wavelink.Node] | None = None,
+        *,
+        client: discord.Client | None = None,
+        interval: float = NODE_STATS_INTERVAL,
+        watch_interval: float = NODE_WATCH_INTERVAL,
+        timeout: float = NODE_STATS_TIMEOUT,
+        watch_connections: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.client = client
+        self.watch_connections = watch_connections
+        self.interval = interval
+        self.watch_interval = watch_interval
+        self.timeout = timeout
+        self._clock = clock
+        self._nodes: dict[str, wavelink.Node] = {}
+        self._loads: dict[str, NodeLoad] = {}
+        self._stats_failed: set[str] = set()
+        self._draining: set[str] = set()
+        self._was_connected: dict[str, bool] = {}
+        self._last_refresh: float | None = None
+        self._task: asyncio.Task | None = None
+        for node in nodes or []:
+            self.add(node)
+
+    @property
+    def nodes(self) -> list[wavelink.Node]:
+        return list(self._nodes.values())
+
+    def add(self, node: wavelink.Node) -> None:
+        self._nodes[node.identifier] = node
+
+    def remove(self, node: wavelink.Node) -> None:
+        self._nodes.pop(node.identifier, None)
+        self._loads.pop(node.identifier, None)
+        self._stats_failed.discard(node.identifier)
+        self._draining.discard(node.identifier)
+        self._was_connected.pop(node.identifier, None)
+
+    def get(self, identifier: str) -> wavelink.Node | None:
+        return self._nodes.get(identifier)
+
+    # ── Drenado y pérdida de nodos ──────────────────────────────────────────
+
+    def drain(self, node: wavelink.Node) -> None:
+        """Deja de ubicar players en el nodo y pide mover los que ya tiene."""
+        self._draining.add(node.identifier)
+        self._dispatch_unavailable(node)
+
+    def undrain(self, node: wavelink.Node) -> None:
+        self._draining.discard(node.identifier)
+
+    def check_connections(self) -> list[wavelink.Node]:
+        """Detecta nodos que pasaron de conectados a desconectados y avisa."""
+        lost: list[wavelink.Node] = []
+        for node in self.nodes:
+            connected = node.status is wavelink.NodeStatus.CONNECTED
+            if self._was_connected.get(node.identifier) and not connected:
+                lost.append(node)
+                self.node_lost(node)
+            self._was_connected[node.identifier] = connected
+        return lost
+
+    def node_lost(self, node: wavelink.Node) -> None:
+        """Avisa que ``node`` perdió la conexión y sus players tienen que moverse."""
+        logger.warning("Nodo de Lavalink %s perdió la conexión", node.identifier)
+        self._was_connected[node.identifier] = False
+        self._dispatch_unavailable(node)
+
+    def _dispatch_unavailable(self, node: wavelink.Node) -> None:
+        if self.client is not None:
+            self.client.dispatch("lavalink_node_unavailable", node)
+
+    # ── Stats ───────────────────────────────────────────────────────────────
+
+    async def refresh(self) -> None:
+        await asyncio.gather(*(self._refresh_node(node) for node in self.nodes))
+
+    async def _refresh_node(self, node: wavelink.Node) -> None:
+        if node.status is not wavelink.NodeStatus.CONNECTED:
+            return
+        try:
+            stats = await asyncio.wait_for(node.fetch_stats(), timeout=self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if node.identifier not in self._stats_failed:
+                logger.warning("No se pudieron leer las stats del nodo %s: %s", node.identifier, exc)
+            self._stats_failed.add(node.identifier)
+            return
+        self._stats_failed.discard(node.identifier)
+        self._loads[node.identifier] = NodeLoad.from_stats(stats, self._clock())
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll(), name="lavalink-node-stats")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _poll(self) -> None:
+        while True:
+            if self.watch_connections:
+                self.check_connections()
+            now = self._clock()
+            if self._last_refresh is None or now - self._last_refresh >= self.interval:
+                self._last_refresh = now
+                try:
+                    await self.refresh()
+                except Exception:
+                    logger.exception("Falló la consulta de stats de Lavalink")
+            await asyncio.sleep(self.watch_interval)
+
+    # ── Selección ───────────────────────────────────────────────────────────
+
+    def load(self, node: wavelink.Node) -> NodeLoad | None:
+        return self._loads.get(node.identifier)
+
+    def penalty(self, node: wavelink.Node) -> float:
+        load = self._loads.get(node.identifier)
+        local_players = len(node.players)
+        if load is None:
+            return float(local_players)
+        # Los players creados desde la última consulta todavía no aparecen en las stats.
+        return load.penalty(max(load.playing, local_players))
+
+    def health(self, node: wavelink.Node) -> NodeHealth:
+        if node.status is not wavelink.NodeStatus.CONNECTED:
+            return NodeHealth.UNHEALTHY
+        if node.identifier in self._draining:
+            return NodeHealth.DRAINING
+        if node.identifier in self._stats_failed or self.penalty(node) >= DEGRADED_PENALTY:
+            return NodeHealth.DEGRADED
+        return NodeHealth.HEALTHY
+
+    def best_node(self, *, exclude: wavelink.Node | None = None) -> wavelink.Node | None:
+        """Nodo sano con menor penalidad; uno degradado si no hay sanos."""
+        candidates: list[tuple[int, float, wavelink.Node]] = []
+        for node in self.nodes:
+            if exclude is not None and node.identifier == exclude.identifier:
+                continue
+            health = self.health(node)
+            if health in (NodeHealth.UNHEALTHY, NodeHealth.DRAINING):
+                continue
+            rank = 0 if health is NodeHealth.HEALTHY else 1
+            candidates.append((rank, self.penalty(node), node))
+        if not candidates:
+            return None
+        return min(candidates, key=lambda item: item[:2])[2]
+
+    def report(self) -> list[dict]:
+        """Resumen por nodo para logs y diagnóstico."""
+        out = []
+        for node in self.nodes:
+            load = self._loads.get(node.identifier)
+            out.append(
+                {
+                    "identifier": node.identifier,
+                    "health": self.health(node).value,
+                    "players": len(node.players),
+                    "playing": load.playing if load else None,
+                    "system_load": load.system_load if load else None,
+                    "deficit": load.deficit if load else None,
+                    "penalty": round(self.penalty(node), 2),
+                }
+            )
+        return out
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from utils.local_db import LocalDatabase
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lavalink_sessions (
+    node TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class LavalinkSessionStore:
+    """Último session ID de Lavalink por nodo, guardado en el SQLite local.
+
+    Al arrancar, el bot se conecta presentando ese ID (header ``Session-Id``)
+    y Lavalink retoma la sesión anterior si no pasó el ``resume_timeout``,
+    con sus players y el audio que seguían sonando.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._db = LocalDatabase(path, _SCHEMA)
+
+    def _load_sync(self) -> dict[str, str]:
+        with self._db.transaction() as conn:
+            rows = conn.execute("SELECT node, session_id FROM lavalink_sessions").fetchall()
+        return dict(rows)
+
+    def _save_sync(self, node: str, session_id: str) -> None:
+        with self._db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO lavalink_sessions (node, session_id, updated_at) VALUES (?, ?, ?)",
+                (node, session_id, time.time()),
+            )
+
+    async def load(self) -> dict[str, str]:
+        """Session IDs por identificador de nodo.
+
+        Un ID vencido no es un problema: Lavalink simplemente abre una sesión
+        nueva y ``on_wavelink_node_ready`` llega con ``resumed=False``.
+        """
+        return await asyncio.to_thread(self._load_sync)
+
+    async def save(self, node: str, session_id: str) -> None:
+        await asyncio.to_thread(self._save_sync, node, session_id)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import logging
+import random
+import time
+from typing import Callable
+
+import discord
+import wavelink
+
+logger = logging.getLogger(__name__)
+
+# Backoff de reconexión: base * 2^intento, con tope, y jitter para no sincronizar reintentos.
+RECONNECT_BASE = 1.0
+RECONNECT_CAP = 60.0
+# Cada cuánto se revisa el estado de los nodos conectados.
+SUPERVISOR_WATCH_INTERVAL = 1.0
+
+
+class ConnectionState(enum.Enum):
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"
+    STOPPED = "stopped"
+
+
+class Backoff:
+    """Backoff exponencial con jitter ("equal jitter").
+
+    La espera del intento ``n`` cae en ``[d/2, d]`` con ``d = min(cap, base * 2^n)``:
+    crece como la exponencial pero varios procesos no reintentan a la vez, y
+    la mitad fija da un ETA razonable para mostrarle al usuario.
+    """
+
+    def __init__(
+        self,
+        *,
+        base: float = RECONNECT_BASE,
+        cap: float = RECONNECT_CAP,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        self.base = base
+        self.cap = cap
+        self._rand = rand
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        ceiling = min(self.cap, self.base * 2 ** self.attempts)
+        self.attempts += 1
+        return ceiling / 2 + self._rand() * ceiling / 2
+
+    def reset(self) -> None:
+        self.attempts = 0
+
+
+class _NodeWatch:
+    __slots__ = ("node", "backoff", "state", "next_attempt_at", "session_id", "players", "task")
+
+    def __init__(self, node: wavelink.Node, backoff: Backoff) -> None:
+        self.node = node
+        self.backoff = backoff
+        self.state = ConnectionState.CONNECTING
+        self.next_attempt_at: float | None = None
+        self.session_id: str | None = None
+        self.players: dict[int, wavelink.Player] = {}
+        self.task: asyncio.Task | None = None
+
+
+class LavalinkSupervisor:
+    """Mantiene conectados los nodos de Lavalink.
+
+    Cada nodo tiene su propio task: el primer intento de conexión de un nodo
+    caído no bloquea a los demás, y cada nodo desconectado se reintenta con
+    backoff exponencial con jitter, sin límite. Los nodos deben crearse con
+    ``retries=0`` para que wavelink haga un solo intento por llamada y el
+    ritmo de reintentos lo marque el supervisor.
+
+    Cuando un intento falla, wavelink limpia el session ID y el mapa de
+    players del nodo; el supervisor los repone para que la reconexión pueda
+    retomar la sesión y los players que no se movieron a otro nodo. Cuando
+    un nodo conectado se cae, ``on_lost(node)`` se llama después de
+    reponerlos, para que quien mueva los players los encuentre en el nodo.
+    """
+
+    def __init__(
+        self,
+        client: discord.Client,
+        nodes: list[wavelink.Node],
+        *,
+        base: float = RECONNECT_BASE,
+        cap: float = RECONNECT_CAP,
+        watch_interval: float = SUPERVISOR_WATCH_INTERVAL,
+        rand: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.monotonic,
+        on_lost: Callable[[wavelink.Node], None] | None = None,
+    ) -> None:
+        self.client = client
+        self.watch_interval = watch_interval
+        self._on_lost = on_lost
+        self._clock = clock
+        self._watches = {
+            node.identifier: _NodeWatch(node, Backoff(base=base, cap=cap, rand=rand))
+            for node in nodes
+        }
+
+    # ── Estado expuesto ─────────────────────────────────────────────────────
+
+    def state(self, node: wavelink.Node) -> ConnectionState | None:
+        watch = self._watches.get(node.identifier)
+        return watch.state if watch else None
+
+    @property
+    def states(self) -> dict[str, ConnectionState]:
+        return {identifier: watch.state for identifier, watch in self._watches.items()}
+
+    @property
+    def available(self) -> bool:
+        return any(w.node.status is wavelink.NodeStatus.CONNECTED for w in self._watches.values())
+
+    def retry_eta(self) -> float | None:
+        """Segundos hasta el próximo intento de reconexión, o None si no hay ninguno agendado."""
+        now = self._clock()
+        pending = [
+            max(0.0, w.next_attempt_at - now)
+            for w in self._watches.values()
+            if w.state is ConnectionState.RECONNECTING and w.next_attempt_at is not None
+        ]
+        return min(pending) if pending else None
+
+    # ── Ciclo de vida ───────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        for watch in self._watches.values():
+            if watch.task is None or watch.task.done():
+                watch.task = asyncio.create_task(
+                    self._supervise(watch), name=f"lavalink-supervisor:{watch.node.identifier}"
+                )
+
+    async def close(self) -> None:
+        tasks = [w.task for w in self._watches.values() if w.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for watch in self._watches.values():
+            watch.task = None
+            watch.state = ConnectionState.STOPPED
+
+    async def _supervise(self, watch: _NodeWatch) -> None:
+        node = watch.node
+        await self._attempt(watch, register=True)
+        while True:
+            status = node.status
+            if status is wavelink.NodeStatus.CONNECTED:
+                if watch.state is not ConnectionState.CONNECTED:
+                    logger.info("Lavalink %s conectado", node.identifier)
+                watch.state = ConnectionState.CONNECTED
+                watch.next_attempt_at = None
+                watch.backoff.reset()
+                watch.session_id = node.session_id
+                watch.players = dict(node._players)
+                await asyncio.sleep(self.watch_interval)
+                continue
+            if status is wavelink.NodeStatus.CONNECTING:
+                # wavelink reintenta solo una vez al cerrarse el websocket; se espera su resultado.
+                await asyncio.sleep(self.watch_interval)
+                continue
+
+            was_connected = watch.state is ConnectionState.CONNECTED
+            self._restore(watch)
+            if was_connected and self._on_lost is not None:
+                try:
+                    self._on_lost(node)
+                except Exception:
+                    logger.exception("Falló el aviso de pérdida del nodo %s", node.identifier)
+            delay = watch.backoff.next_delay()
+            watch.state = ConnectionState.RECONNECTING
+            watch.next_attempt_at = self._clock() + delay
+            logger.warning("Lavalink %s desconectado; reintento en %.1fs", node.identifier, delay)
+            await asyncio.sleep(delay)
+            await self._attempt(watch)
+
+    async def _attempt(self, watch: _NodeWatch, *, register: bool = False) -> None:
+        watch.state = ConnectionState.CONNECTING
+        watch.next_attempt_at = None
+        try:
+            if register:
+                # Pool.connect registra el nodo aunque el primer intento falle.
+                await wavelink.Pool.connect(nodes=[watch.node], client=self.client)
+            else:
+                await watch.node._connect(client=self.client)
+        except asyncio.CancelledError:
+            raise
+        except wavelink.AuthorizationFailedException:
+            logger.error("Lavalink %s rechazó la contraseña", watch.node.identifier)
+        except Exception as e:
+            logger.warning("Falló la conexión a Lavalink %s: %s", watch.node.identifier, e)
+
+    def _restore(self, watch: _NodeWatch) -> None:
+        node = watch.node
+        if node._session_id is None and watch.session_id is not None:
+            node._session_id = watch.session_id
+        for guild_id, player in watch.players.items():
+            # Los players que ya se movieron a otro nodo no vuelven.
+            if getattr(player, "_node", None) is node and guild_id not in node._players:
+                node._players[guild_id] = player
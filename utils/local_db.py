@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class LocalDatabase:
+    """Acceso al SQLite local compartido por los stores del bot.
+
+    Cada store declara sus tablas en ``schema`` (un script SQL); la primera
+    conexión crea el directorio del archivo y las tablas. ``transaction`` abre una conexión por
+    operación, hace commit (o rollback si hubo error) y la cierra siempre:
+    el ``with`` de ``sqlite3.Connection`` solo maneja la transacción y
+    dejaba la conexión abierta. Se usa desde ``asyncio.to_thread``, así que
+    no se comparte ninguna conexión entre hilos.
+    """
+
+    def __init__(self, path: str, schema: str) -> None:
+        self.path = path
+        self.schema = schema
+        self._schema_ready = False
+
+    def _open(self) -> sqlite3.Connection:
+        if not self._schema_ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        if not self._schema_ready:
+            try:
+                conn.executescript(self.schema)
+            except BaseException:
+                conn.close()
+                raise
+            self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._open()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from typing import Any, Callable, Iterator
+
+# Segundos sin actividad tras los cuales el estado de una guild sin player se descarta.
+GUILD_STATE_IDLE_TTL = 30 * 60
+# Cada cuánto, como mucho, se barre el registro buscando guilds inactivas.
+GUILD_STATE_SWEEP_INTERVAL = 60.0
+
+
+class GuildMusicState:
+    """Estado de música de una guild.
+
+    Guarda IDs en vez de objetos de Discord (canales, mensajes) para no
+    retener caches de discord.py vivas; el canal se resuelve con
+    ``bot.get_channel`` cuando hace falta.
+    """
+
+    __slots__ = (
+        "guild_id",
+        "text_channel_id",
+        "now_playing_message_id",
+        "np_lock",
+        "np_request",
+        "np_task",
+        "np_rendered",
+        "loading_task",
+        "prefetch_task",
+        "prefetched",
+        "last_activity",
+    )
+
+    def __init__(self, guild_id: int, now: float) -> None:
+        self.guild_id = guild_id
+        self.text_channel_id: int | None = None
+        self.now_playing_message_id: int | None = None
+        self.np_lock: asyncio.Lock | None = None
+        # Último pedido de re-publicar el now-playing (canal, player); vive solo durante el debounce.
+        self.np_request: tuple[Any, Any] | None = None
+        self.np_task: asyncio.Task | None = None
+        self.np_rendered: tuple | None = None
+        self.loading_task: asyncio.Task | None = None
+        self.prefetch_task: asyncio.Task | None = None
+        # Siguiente track ya verificado: (encoded de la entrada en cola, Playable listo para sonar).
+        self.prefetched: tuple[str, Any] | None = None
+        self.last_activity = now
+
+    @property
+    def busy(self) -> bool:
+        """Hay trabajo en curso que no se puede tirar (publicación o carga de playlist)."""
+        return any(
+            task is not None and not task.done()
+            for task in (self.np_task, self.loading_task)
+        )
+
+    def cancel_tasks(self) -> None:
+        current = asyncio.current_task() if _has_running_loop() else None
+        for name in ("np_task", "loading_task", "prefetch_task"):
+            task = getattr(self, name)
+            setattr(self, name, None)
+            if task is not None and task is not current:
+                task.cancel()
+        self.np_request = None
+        self.prefetched = None
+
+    def memory_size(self) -> int:
+        """Bytes aproximados: el objeto más sus valores (sin seguir referencias)."""
+        size = sys.getsizeof(self)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
+
+
+def _has_running_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class GuildStateRegistry:
+    """Registro de ``GuildMusicState`` con desalojo de guilds inactivas.
+
+    ``ensure`` crea el estado bajo demanda. Como mucho cada
+    ``sweep_interval`` segundos se descartan los estados que llevan más de
+    ``idle_ttl`` sin actividad, no tienen tareas en curso y para los que
+    ``is_active`` (p. ej. "hay un player conectado") devuelve False. El
+    barrido corre al crear o tocar un estado y, con ``start``, también desde
+    un task propio, así se desaloja aunque no llegue actividad nueva.
+    """
+
+    def __init__(
+        self,
+        *,
+        idle_ttl: float = GUILD_STATE_IDLE_TTL,
+        sweep_interval: float = GUILD_STATE_SWEEP_INTERVAL,
+        is_active: Callable[[int], bool] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._is_active = is_active or (lambda guild_id: False)
+        self._clock = clock
+        self._states: dict[int, GuildMusicState] = {}
+        self._last_sweep = clock()
+        self._sweeper: asyncio.Task | None = None
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._states
+
+    def __iter__(self) -> Iterator[GuildMusicState]:
+        return iter(list(self._states.values()))
+
+    def get(self, guild_id: int) -> GuildMusicState | None:
+        return self._states.get(guild_id)
+
+    def ensure(self, guild_id: int) -> GuildMusicState:
+        state = self._states.get(guild_id)
+        if state is None:
+            self._maybe_sweep()
+            state = self._states[guild_id] = GuildMusicState(guild_id, self._clock())
+        return state
+
+    def touch(self, guild_id: int) -> GuildMusicState:
+        state = self.ensure(guild_id)
+        state.last_activity = self._clock()
+        self._maybe_sweep()
+        return state
+
+    def discard(self, guild_id: int) -> GuildMusicState | None:
+        """Quita el estado de la guild cancelando sus tareas."""
+        state = self._states.pop(guild_id, None)
+        if state is not None:
+            state.cancel_tasks()
+        return state
+
+    def evict_idle(self) -> list[int]:
+        now = self._clock()
+        self._last_sweep = now
+        evicted = [
+            guild_id
+            for guild_id, state in self._states.items()
+            if now - state.last_activity >= self.idle_ttl
+            and not state.busy
+            and not self._is_active(guild_id)
+        ]
+        for guild_id in evicted:
+            self.discard(guild_id)
+        self.evictions += len(evicted)
+        return evicted
+
+    def _maybe_sweep(self) -> None:
+        if self._clock() - self._last_sweep >= self.sweep_interval:
+            self.evict_idle()
+
+    def start(self) -> None:
+        """Arranca el barrido periódico (hace falta un event loop corriendo)."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._run_sweeper(), name="guild-state-sweeper")
+
+    def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    async def _run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self._maybe_sweep()
+
+    def memory_report(self) -> dict[int, int]:
+        """Bytes aproximados por guild."""
+        return {guild_id: state.memory_size() for guild_id, state in self._states.items()}
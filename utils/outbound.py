@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord permite ~5 mensajes cada 5 s por canal; se respeta antes de pegarle al 429.
+CHANNEL_RATE = 5
+CHANNEL_PER = 5.0
+
+
+class _TokenBucket:
+    def __init__(self, rate: int, per: float, clock: Callable[[], float]) -> None:
+        self.rate = rate
+        self.per = per
+        self._clock = clock
+        self.tokens = float(rate)
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.rate, self.tokens + elapsed * self.rate / self.per)
+        self.updated_at = now
+
+    def delay(self) -> float:
+        """Segundos hasta que haya un token disponible (0 si ya lo hay)."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.per / self.rate
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.rate
+
+
+class _Job:
+    __slots__ = ("factory", "merge_key", "replace_key", "not_before", "charge", "count", "waiters")
+
+    def __init__(
+        self,
+        factory: Callable[[int], Awaitable[Any]],
+        *,
+        merge_key: Hashable | None = None,
+        replace_key: Hashable | None = None,
+        not_before: float = 0.0,
+        charge: bool = True,
+    ) -> None:
+        self.factory = factory
+        self.merge_key = merge_key
+        self.replace_key = replace_key
+        self.not_before = not_before
+        # False si el trabajo toma sus propios tokens con ``throttle`` (uno por llamada REST).
+        self.charge = charge
+        self.count = 1
+        self.waiters: list[asyncio.Future] = []
+
+    def resolve(self, result: Any = None, exc: BaseException | None = None) -> None:
+        for waiter in self.waiters:
+            if waiter.done():
+                continue
+            if exc is None:
+                waiter.set_result(result)
+            else:
+                waiter.set_exception(exc)
+
+
+class _Lane:
+    __slots__ = ("bucket", "jobs", "worker")
+
+    def __init__(self, bucket: _TokenBucket) -> None:
+        self.bucket = bucket
+        self.jobs: deque[_Job] = deque()
+        self.worker: asyncio.Task | None = None
+
+
+_schedulers: weakref.WeakKeyDictionary[Any, OutboundScheduler] = weakref.WeakKeyDictionary()
+
+
+class OutboundScheduler:
+    """Cola de salida de mensajes a Discord, una por canal.
+
+    Cada canal tiene su propio worker y token bucket, así que los envíos de un
+    canal se serializan y se espacian antes de llegar al límite de Discord en
+    vez de chocar con un 429. Mientras esperan en cola:
+
+    - los avisos con el mismo ``merge_key`` se funden en uno solo, que se
+      renderiza con la cantidad acumulada ("7 canciones saltadas");
+    - un trabajo con ``replace_key`` descarta al pendiente con la misma clave
+      (p. ej. un now-playing viejo que ya fue reemplazado por uno nuevo).
+
+    Los trabajos descartados resuelven con ``None``. Un trabajo retenido con
+    ``hold`` no frena a los que vienen detrás: el worker toma el primero que
+    ya esté listo.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: int = CHANNEL_RATE,
+        per: float = CHANNEL_PER,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.per = per
+        self._clock = clock
+        self._lanes: dict[Hashable, _Lane] = {}
+        self.sent = 0
+        self.merged = 0
+        self.dropped = 0
+
+    @classmethod
+    def for_client(cls, client: Any) -> OutboundScheduler:
+        """Scheduler compartido por todos los cogs de un mismo bot."""
+        scheduler = _schedulers.get(client)
+        if scheduler is None:
+            scheduler = _schedulers[client] = cls()
+        return scheduler
+
+    def pending(self, channel_id: Hashable | None = None) -> int:
+        if channel_id is not None:
+            lane = self._lanes.get(channel_id)
+            return len(lane.jobs) if lane else 0
+        return sum(len(lane.jobs) for lane in self._lanes.values())
+
+    # ── API pública ─────────────────────────────────────────────────────────
+
+    def post(
+        self,
+        channel: discord.abc.Messageable,
+        *,
+        merge_key: Hashable | None = None,
+        merge: Callable[[int], discord.Embed] | None = None,
+        replace_key: Hashable | None = None,
+        hold: float = 0.0,
+        **kwargs: Any,
+    ) -> None:
+        """Encola un ``channel.send`` sin esperar el resultado.
+
+        Con ``merge_key`` y ``merge``, los envíos que se acumulen mientras el
+        primero sigue en cola se funden: al enviarse se usa ``merge(n)`` como
+        embed, con ``n`` la cantidad de avisos fundidos. ``hold`` retiene el
+        envío unos segundos para darle tiempo a la ráfaga de acumularse.
+        """
+        self._enqueue(channel, self._send_factory(channel, merge, kwargs),
+                      merge_key=merge_key, replace_key=replace_key, hold=hold)
+
+    async def send(
+        self,
+        channel: discord.abc.Messageable,
+        *,
+        replace_key: Hashable | None = None,
+        **kwargs: Any,
+    ) -> discord.Message | None:
+        """Encola un ``channel.send`` y espera el mensaje enviado."""
+        future = self._enqueue(channel, self._send_factory(channel, None, kwargs),
+                               replace_key=replace_key, wait=True)
+        return await future
+
+    async def run(
+        self,
+        channel: discord.abc.Messageable,
+        operation: Callable[[], Awaitable[Any]],
+        *,
+        replace_key: Hashable | None = None,
+    ) -> Any:
+        """Ejecuta ``operation`` (edits/deletes/sends) en la cola del canal.
+
+        ``operation`` puede hacer más de una llamada a Discord, así que no se
+        le cobra un token de entrada: debe llamar a ``throttle`` antes de cada una.
+        """
+        future = self._enqueue(channel, lambda _count: operation(),
+                               replace_key=replace_key, charge=False, wait=True)
+        return await future
+
+    async def throttle(self, channel: discord.abc.Messageable) -> None:
+        """Espera y toma un token del canal para una llamada REST."""
+        lane = self._lane(getattr(channel, "id", None))
+        while (delay := lane.bucket.delay()) > 0:
+            await asyncio.sleep(delay)
+        lane.bucket.take()
+
+    def discard(self, replace_key: Hashable, channel_id: Hashable | None = None) -> bool:
+        """Descarta el trabajo pendiente con ``replace_key``.
+
+        Sin ``channel_id`` lo busca en todos los canales.
+        """
+        if channel_id is None:
+            lanes = list(self._lanes.values())
+        else:
+            lane = self._lanes.get(channel_id)
+            lanes = [lane] if lane is not None else []
+        for lane in lanes:
+            for job in lane.jobs:
+                if job.replace_key == replace_key:
+                    lane.jobs.remove(job)
+                    self.dropped += 1
+                    job.resolve(None)
+                    return True
+        return False
+
+    async def close(self) -> None:
+        for lane in self._lanes.values():
+            while lane.jobs:
+                lane.jobs.popleft().resolve(None)
+            if lane.worker is not None:
+                lane.worker.cancel()
+        workers = [lane.worker for lane in self._lanes.values() if lane.worker is not None]
+        self._lanes.clear()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    # ── Internos ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _send_factory(
+        channel: discord.abc.Messageable,
+        merge: Callable[[int], discord.Embed] | None,
+        kwargs: dict[str, Any],
+    ) -> Callable[[int], Awaitable[Any]]:
+        def factory(count: int) -> Awaitable[Any]:
+            if merge is not None and count > 1:
+                return channel.send(**{**kwargs, "embed": merge(count)})
+            return channel.send(**kwargs)
+
+        return factory
+
+    def _lane(self, channel_id: Hashable) -> _Lane:
+        lane = self._lanes.get(channel_id)
+        if lane is None:
+            self._prune()
+            lane = self._lanes[channel_id] = _Lane(_TokenBucket(self.rate, self.per, self._clock))
+        return lane
+
+    def _prune(self) -> None:
+        idle = [
+            key for key, lane in self._lanes.items()
+            if not lane.jobs and lane.worker is None and lane.bucket.full
+        ]
+        for key in idle:
+            del self._lanes[key]
+
+    def _enqueue(
+        self,
+        channel: discord.abc.Messageable,
+        factory: Callable[[int], Awaitable[Any]],
+        *,
+        merge_key: Hashable | None = None,
+        replace_key: Hashable | None = None,
+        hold: float = 0.0,
+        charge: bool = True,
+        wait: bool = False,
+    ) -> asyncio.Future | None:
+        channel_id = getattr(channel, "id", None)
+        lane = self._lane(channel_id)
+        future = asyncio.get_running_loop().create_future() if wait else None
+
+        if merge_key is not None:
+            for job in lane.jobs:
+                if job.merge_key == merge_key:
+                    job.count += 1
+                    self.merged += 1
+                    if future is not None:
+                        job.waiters.append(future)
+                    return future
+
+        if replace_key is not None:
+            self.discard(replace_key, channel_id)
+
+        not_before = self._clock() + hold if hold > 0 else 0.0
+        job = _Job(factory, merge_key=merge_key, replace_key=replace_key, not_before=not_before, charge=charge)
+        if future is not None:
+            job.waiters.append(future)
+        lane.jobs.append(job)
+        if lane.worker is None or lane.worker.done():
+            lane.worker = asyncio.create_task(self._drain(channel_id, lane), name=f"outbound:{channel_id}")
+        return future
+
+    async def _drain(self, channel_id: Hashable, lane: _Lane) -> None:
+        try:
+            while lane.jobs:
+                now = self._clock()
+                job = next((j for j in lane.jobs if j.not_before <= now), None)
+                if job is None:
+                    await asyncio.sleep(min(j.not_before for j in lane.jobs) - now)
+                    continue
+                if job.charge:
+                    delay = lane.bucket.delay()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        continue
+                    lane.bucket.take()
+                lane.jobs.remove(job)
+                try:
+                    result = await job.factory(job.count)
+                except asyncio.CancelledError:
+                    job.resolve(None)
+                    raise
+                except Exception as exc:
+                    if not job.waiters:
+                        logger.warning("Falló un envío en cola al canal %s: %s", channel_id, exc)
+                    job.resolve(exc=exc)
+                else:
+                    self.sent += 1
+                    job.resolve(result)
+        finally:
+            if lane.worker is asyncio.current_task():
+                lane.worker = None
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import wavelink
+
+from utils.local_db import LocalDatabase
+from utils.track_codec import TrackRow, pack_track, unpack_track
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlist_snapshots (
+    url TEXT PRIMARY KEY,
+    name TEXT,
+    fetched_at REAL NOT NULL,
+    tracks TEXT NOT NULL
+)
+"""
+
+
+class PlaylistSnapshot:
+    def __init__(self, url: str, name: str | None, fetched_at: float, rows: list[TrackRow]) -> None:
+        self.url = url
+        self.name = name
+        self.fetched_at = fetched_at
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def tracks(self) -> list[wavelink.Playable]:
+        return [unpack_track(row) for row in self.rows]
+
+
+class PlaylistSnapshotStore:
+    """Snapshots de playlists resueltas, guardados en un SQLite local.
+
+    Cada snapshot es una fila con la lista de tracks compactos en JSON, así que
+    cargar una playlist entera es una sola lectura. El acceso a SQLite corre en
+    un hilo aparte para no bloquear el event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._db = LocalDatabase(path, _SCHEMA)
+
+    def _load_sync(self, url: str) -> PlaylistSnapshot | None:
+        with self._db.transaction() as conn:
+            row = conn.execute(
+                "SELECT name, fetched_at, tracks FROM playlist_snapshots WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        name, fetched_at, payload = row
+        rows = [TrackRow(*item) for item in json.loads(payload)]
+        return PlaylistSnapshot(url, name, fetched_at, rows)
+
+    def _save_sync(self, snapshot: PlaylistSnapshot) -> None:
+        payload = json.dumps(snapshot.rows, separators=(",", ":"), ensure_ascii=False)
+        with self._db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO playlist_snapshots (url, name, fetched_at, tracks) "
+                "VALUES (?, ?, ?, ?)",
+                (snapshot.url, snapshot.name, snapshot.fetched_at, payload),
+            )
+
+    async def load(self, url: str) -> PlaylistSnapshot | None:
+        return await asyncio.to_thread(self._load_sync, url)
+
+    async def save(
+        self, url: str, name: str | None, tracks: list[wavelink.Playable]
+    ) -> PlaylistSnapshot:
+        snapshot = PlaylistSnapshot(url, name, time.time(), [pack_track(t) for t in tracks])
+        await asyncio.to_thread(self._save_sync, snapshot)
+        return snapshot
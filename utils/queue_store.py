@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import suppress
+from typing import Callable, Iterable, NamedTuple
+
+from utils.local_db import LocalDatabase
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se acumulan cambios antes de escribirlos juntos en SQLite.
+QUEUE_SAVE_DELAY = 5.0
+# Tope de espera entre reintentos de una escritura que falló.
+QUEUE_SAVE_MAX_BACKOFF = 60.0
+
+# El estado de reproducción (posición, pausa, track actual) cambia con cada
+# playerUpdate de Lavalink; la cola puede tener miles de tracks. Van en tablas
+# separadas para que actualizar la posición no reescriba la cola entera.
+# ``guild_queues`` es el formato anterior (todo en una fila) y se descarta.
+_SCHEMA = """
+DROP TABLE IF EXISTS guild_queues;
+CREATE TABLE IF NOT EXISTS guild_playback (
+    guild_id INTEGER PRIMARY KEY,
+    voice_channel_id INTEGER,
+    text_channel_id INTEGER,
+    current TEXT,
+    position INTEGER NOT NULL,
+    volume INTEGER NOT NULL,
+    paused INTEGER NOT NULL,
+    loop_mode INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS guild_queue_tracks (
+    guild_id INTEGER PRIMARY KEY,
+    queue TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SavedQueue(NamedTuple):
+    """Estado de reproducción de una guild, con los tracks como strings ``encoded``.
+
+    Lavalink reconstruye cada track a partir de su ``encoded``, así que no se
+    guarda nada más por track: la cola completa es una lista JSON de strings.
+    Al escribir, ``queue=None`` deja la cola guardada como estaba y solo
+    actualiza el estado de reproducción.
+    """
+
+    guild_id: int
+    voice_channel_id: int | None
+    text_channel_id: int | None
+    current: str | None
+    position: int
+    volume: int
+    paused: bool
+    loop_mode: int
+    queue: list[str] | None
+
+
+class QueueStore:
+    """Colas y estado de reproducción por guild, guardados en el SQLite local."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._db = LocalDatabase(path, _SCHEMA)
+
+    def _load_all_sync(self) -> list[SavedQueue]:
+        with self._db.transaction() as conn:
+            rows = conn.execute(
+                "SELECT p.guild_id, p.voice_channel_id, p.text_channel_id, p.current, p.position, "
+                "p.volume, p.paused, p.loop_mode, q.queue FROM guild_playback AS p "
+                "LEFT JOIN guild_queue_tracks AS q ON q.guild_id = p.guild_id"
+            ).fetchall()
+        return [
+            SavedQueue(
+                gid, voice, text, current, position, volume, bool(paused), mode,
+                json.loads(queue) if queue is not None else [],
+            )
+            for gid, voice, text, current, position, volume, paused, mode, queue in rows
+        ]
+
+    def _write_sync(self, saved: list[SavedQueue], deleted: list[int]) -> None:
+        now = time.time()
+        with self._db.transaction() as conn:
+            if deleted:
+                params = [(gid,) for gid in deleted]
+                conn.executemany("DELETE FROM guild_playback WHERE guild_id = ?", params)
+                conn.executemany("DELETE FROM guild_queue_tracks WHERE guild_id = ?", params)
+            if saved:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO guild_playback (guild_id, voice_channel_id, text_channel_id, "
+                    "current, position, volume, paused, loop_mode, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            s.guild_id,
+                            s.voice_channel_id,
+                            s.text_channel_id,
+                            s.current,
+                            s.position,
+                            s.volume,
+                            int(s.paused),
+                            s.loop_mode,
+                            now,
+                        )
+                        for s in saved
+                    ],
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO guild_queue_tracks (guild_id, queue, updated_at) VALUES (?, ?, ?)",
+                    [
+                        (s.guild_id, json.dumps(s.queue, separators=(",", ":")), now)
+                        for s in saved
+                        if s.queue is not None
+                    ],
+                )
+
+    async def load_all(self) -> list[SavedQueue]:
+        return await asyncio.to_thread(self._load_all_sync)
+
+    async def write(self, saved: Iterable[SavedQueue] = (), deleted: Iterable[int] = ()) -> None:
+        """Guarda y borra varias guilds en una sola transacción."""
+        await asyncio.to_thread(self._write_sync, list(saved), list(deleted))
+
+    async def delete(self, guild_id: int) -> None:
+        await self.write(deleted=[guild_id])
+
+
+class QueueStateWriter:
+    """Junta los cambios de cola de todas las guilds y los escribe por lotes.
+
+    ``mark_dirty`` solo anota la guild; la primera marca arranca un task que
+    espera ``delay`` segundos y escribe el estado de todas las guilds marcadas
+    hasta entonces en una sola transacción. El estado se lee con ``snapshot``
+    recién al escribir, así que guarda siempre lo último; si devuelve None la
+    guild se borra del store. Con ``queue=False`` (p. ej. un playerUpdate)
+    solo cambió la reproducción y ``snapshot`` se pide sin la cola, así no se
+    vuelve a serializar. El task sigue mientras queden guilds marcadas
+    (también las marcadas durante una escritura) y una escritura fallida se
+    reintenta con espera creciente, hasta ``max_backoff``.
+    """
+
+    def __init__(
+        self,
+        store: QueueStore,
+        snapshot: Callable[[int, bool], SavedQueue | None],
+        *,
+        delay: float = QUEUE_SAVE_DELAY,
+        max_backoff: float = QUEUE_SAVE_MAX_BACKOFF,
+    ) -> None:
+        self.store = store
+        self._snapshot = snapshot
+        self.delay = delay
+        self.max_backoff = max_backoff
+        # guild -> si cambió la cola (True) o solo el estado de reproducción (False).
+        self._dirty: dict[int, bool] = {}
+        self._task: asyncio.Task | None = None
+        self.failures = 0
+        self.writes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def mark_dirty(self, guild_id: int, *, queue: bool = True) -> None:
+        self._dirty[guild_id] = self._dirty.get(guild_id, False) or queue
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="queue-state-writer")
+
+    async def _run(self) -> None:
+        delay = self.delay
+        while self._dirty:
+            await asyncio.sleep(delay)
+            if await self.flush():
+                delay = self.delay
+            else:
+                delay = min(max(self.delay, 1.0) * 2 ** (self.failures - 1), self.max_backoff)
+
+    async def flush(self) -> bool:
+        """Escribe ya todo lo pendiente (también se usa al descargar el cog).
+
+        Devuelve False si la escritura falló; las guilds quedan marcadas para reintentar.
+        """
+        if not self._dirty:
+            return True
+        dirty, self._dirty = self._dirty, {}
+        saved: list[SavedQueue] = []
+        deleted: list[int] = []
+        for guild_id, queue_changed in dirty.items():
+            try:
+                state = self._snapshot(guild_id, queue_changed)
+            except Exception:
+                logger.exception("No se pudo leer el estado de la cola de guild %s", guild_id)
+                continue
+            if state is None:
+                deleted.append(guild_id)
+            else:
+                saved.append(state)
+        try:
+            await self.store.write(saved, deleted)
+        except Exception:
+            logger.exception("No se pudo guardar el estado de %d cola(s)", len(dirty))
+            for guild_id, queue_changed in dirty.items():
+                self._dirty[guild_id] = self._dirty.get(guild_id, False) or queue_changed
+            self.failures += 1
+            return False
+        self.failures = 0
+        self.writes += 1
+        return True
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        self._task = None
+        await self.flush()
+
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import bisect
+import time
+from datetime import datetime, timezone
+from typing import Iterable
+
+from utils.reminders_store import REMINDERS_PAGE_SIZE, ReminderPage
+
+
+# Mayor que cualquier id: (t, _LAST_ID) queda después de todas las claves con fire_at t.
+_LAST_ID = "\uffff"
+
+
+def _timestamp(value: datetime | str) -> float:
+    fire_at = value if isinstance(value, datetime) else datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if fire_at.tzinfo is None:
+        fire_at = fire_at.replace(tzinfo=timezone.utc)
+    return fire_at.timestamp()
+
+
+class PendingReminderIndex:
+    """Índice en memoria de recordatorios pendientes: por id, por creador y por vencimiento.
+
+    Modelo de consistencia:
+
+    * Supabase es la fuente de verdad y este bot su único escritor. Cada
+      escritura (crear, cancelar, entregar) va primero al store y solo si
+      el store la acepta se refleja acá (write-through); si falla, el índice
+      sigue igual que el store. La excepción son las entregas: se marcan
+      por lotes (``ReminderDoneWriter``) y salen del índice al anotarse; la
+      reconciliación ignora los ids que todavía esperan su lote.
+    * El índice no tiene todo: guarda la ventana que ya cargó el scheduler
+      y, completos, los pendientes de cada creador que ya listó alguna vez
+      (``complete_creators``). Solo esos listados se sirven desde memoria;
+      el resto se lee del store y desde ahí queda completo.
+    * Un cambio hecho por fuera del bot (p. ej. desde el editor SQL) se ve
+      recién en la siguiente reconciliación, que reemplaza la ventana y los
+      creadores completos con lo que diga el store.
+    """
+
+    def __init__(self, *, clock=time.time) -> None:
+        self._clock = clock
+        self._by_id: dict[str, dict] = {}
+        self._by_creator: dict[str, set[str]] = {}
+        # (fire_at, id) ordenado, para listar y cortar por vencimiento sin ordenar cada vez.
+        self._due: list[tuple[float, str]] = []
+        self.complete_creators: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, reminder_id: str) -> bool:
+        return reminder_id in self._by_id
+
+    def get(self, reminder_id: str) -> dict | None:
+        return self._by_id.get(reminder_id)
+
+    def add(self, reminder: dict) -> None:
+        reminder_id = str(reminder["id"])
+        self.remove(reminder_id)
+        creator = str(reminder.get("created_by"))
+        self._by_id[reminder_id] = reminder
+        self._by_creator.setdefault(creator, set()).add(reminder_id)
+        bisect.insort(self._due, (_timestamp(reminder["fire_at"]), reminder_id))
+
+    def remove(self, reminder_id: str) -> dict | None:
+        reminder = self._by_id.pop(reminder_id, None)
+        if reminder is None:
+            return None
+        creator = str(reminder.get("created_by"))
+        ids = self._by_creator.get(creator)
+        if ids is not None:
+            ids.discard(reminder_id)
+            if not ids and creator not in self.complete_creators:
+                del self._by_creator[creator]
+        key = (_timestamp(reminder["fire_at"]), reminder_id)
+        position = bisect.bisect_left(self._due, key)
+        if position < len(self._due) and self._due[position] == key:
+            del self._due[position]
+        return reminder
+
+    def due_before(self, until: float) -> list[dict]:
+        """Pendientes con ``fire_at <= until``, en orden."""
+        stop = bisect.bisect_right(self._due, (until, _LAST_ID))
+        return [self._by_id[reminder_id] for _, reminder_id in self._due[:stop]]
+
+    def page_for_creator(
+        self,
+        created_by: str,
+        *,
+        target_id: str | None = None,
+        cursor: tuple[str, str] | None = None,
+        limit: int = REMINDERS_PAGE_SIZE,
+    ) -> ReminderPage:
+        """Misma página que ``RemindersStore.list_for_user``, armada en memoria."""
+        ids = self._by_creator.get(str(created_by), set())
+        if cursor is None:
+            start = (self._clock(), _LAST_ID)
+        else:
+            start = (_timestamp(cursor[0]), cursor[1])
+        keys = sorted(
+            (_timestamp(self._by_id[reminder_id]["fire_at"]), reminder_id)
+            for reminder_id in ids
+        )
+        rows = []
+        for _, reminder_id in keys[bisect.bisect_right(keys, start):]:
+            reminder = self._by_id[reminder_id]
+            if target_id is None or str(target_id) in reminder["target_ids"]:
+                rows.append(reminder)
+        if len(rows) <= limit:
+            return ReminderPage(rows, None)
+        last = rows[limit - 1]
+        return ReminderPage(rows[:limit], (str(last["fire_at"]), str(last["id"])))
+
+    def replace_creator(self, created_by: str, reminders: Iterable[dict]) -> None:
+        """Deja exactamente ``reminders`` como pendientes de ``created_by`` y lo marca completo."""
+        creator = str(created_by)
+        for reminder_id in list(self._by_creator.get(creator, ())):
+            self.remove(reminder_id)
+        self.complete_creators.add(creator)
+        self._by_creator.setdefault(creator, set())
+        for reminder in reminders:
+            self.add(reminder)
+
+    def replace_window(self, until: float, reminders: Iterable[dict]) -> tuple[list[dict], list[dict]]:
+        """Reemplaza los pendientes con ``fire_at <= until`` por ``reminders``.
+
+        Devuelve ``(nuevos_o_cambiados, quitados)`` para que el scheduler se ajuste.
+        """
+        fresh = {str(reminder["id"]): reminder for reminder in reminders}
+        removed = [
+            reminder
+            for reminder in self.due_before(until)
+            if str(reminder["id"]) not in fresh
+        ]
+        for reminder in removed:
+            self.remove(str(reminder["id"]))
+        changed = []
+        for reminder_id, reminder in fresh.items():
+            current = self._by_id.get(reminder_id)
+            if current is None or _timestamp(current["fire_at"]) != _timestamp(reminder["fire_at"]):
+                changed.append(reminder)
+            self.add(reminder)
+        return changed, removed
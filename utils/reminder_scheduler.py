@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Máximo de segundos que el despachador duerme de un tirón antes de volver a mirar el reloj.
+SCHEDULER_MAX_SLEEP = 60.0
+
+
+class ReminderScheduler:
+    """Agenda de recordatorios con un solo task despachador.
+
+    Las entradas viven en un min-heap ordenado por ``fire_at`` (epoch en
+    segundos). El despachador duerme hasta la primera que vence, o hasta que
+    se agenda una más próxima, y nunca más de ``max_sleep`` seguidos: al
+    despertar vuelve a comparar con el reloj, así un salto de reloj se
+    corrige en la siguiente vuelta en vez de quedar fijo en un ``sleep`` largo.
+
+    Cancelar marca la entrada como muerta (se descarta cuando llega a la cima
+    del heap) y reprogramar es cancelar + insertar: O(log n) en ambos casos.
+    Cada entrega corre en su propio task para que una lenta no atrase al resto.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[Any], Awaitable[None]],
+        *,
+        max_sleep: float = SCHEDULER_MAX_SLEEP,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._deliver = deliver
+        self.max_sleep = max_sleep
+        self._clock = clock
+        # Entradas [fire_at, secuencia, id, payload]; payload None = cancelada.
+        self._heap: list[list[Any]] = []
+        self._entries: dict[str, list[Any]] = {}
+        self._counter = itertools.count()
+        self._waiter: asyncio.Future | None = None
+        self._task: asyncio.Task | None = None
+        # Entregas en curso por id: ya salieron del heap pero todavía no terminaron.
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.dispatched = 0
+        self.max_lag = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, reminder_id: str) -> bool:
+        return reminder_id in self._entries
+
+    def in_flight(self, reminder_id: str) -> bool:
+        """El recordatorio ya se despachó y su entrega todavía no terminó."""
+        return reminder_id in self._inflight
+
+    @property
+    def depth(self) -> int:
+        """Recordatorios agendados que todavía no se despacharon."""
+        return len(self._entries)
+
+    @property
+    def lag(self) -> float:
+        """Segundos de atraso del recordatorio vencido más antiguo (0 si no hay ninguno vencido)."""
+        head = self._peek()
+        if head is None:
+            return 0.0
+        return max(0.0, self._clock() - head[0])
+
+    def next_fire_at(self) -> float | None:
+        head = self._peek()
+        return None if head is None else head[0]
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "depth": self.depth,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "dispatched": self.dispatched,
+            "in_flight": len(self._inflight),
+        }
+
+    def schedule(self, reminder_id: str, fire_at: float, payload: Any) -> None:
+        """Agenda (o reprograma, si el id ya estaba) una entrega para ``fire_at``."""
+        self.cancel(reminder_id)
+        entry = [fire_at, next(self._counter), reminder_id, payload]
+        self._entries[reminder_id] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wake()
+        self._ensure_running()
+
+    def cancel(self, reminder_id: str) -> bool:
+        entry = self._entries.pop(reminder_id, None)
+        if entry is None:
+            return False
+        entry[3] = None
+        # Las entradas muertas se compactan si ya son la mayoría del heap.
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [item for item in self._heap if item[3] is not None]
+            heapq.heapify(self._heap)
+        return True
+
+    def _peek(self) -> list[Any] | None:
+        while self._heap and self._heap[0][3] is None:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="reminder-scheduler")
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def _sleep(self, timeout: float | None) -> None:
+        """Espera ``timeout`` segundos o hasta ``_wake``, con un solo timer y sin tasks extra."""
+        loop = asyncio.get_running_loop()
+        self._waiter = waiter = loop.create_future()
+        handle = loop.call_later(timeout, self._wake) if timeout is not None else None
+        try:
+            await waiter
+        finally:
+            self._waiter = None
+            if handle is not None:
+                handle.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            head = self._peek()
+            if head is None:
+                await self._sleep(None)
+                continue
+            delay = head[0] - self._clock()
+            if delay > 0:
+                await self._sleep(min(delay, self.max_sleep))
+                continue
+            heapq.heappop(self._heap)
+            _, _, reminder_id, payload = head
+            del self._entries[reminder_id]
+            self.max_lag = max(self.max_lag, -delay)
+            self.dispatched += 1
+            task = asyncio.create_task(self._dispatch(reminder_id, payload), name=f"reminder:{reminder_id}")
+            self._inflight[reminder_id] = task
+            task.add_done_callback(lambda done, key=reminder_id: self._forget(key, done))
+
+    def _forget(self, reminder_id: str, task: asyncio.Task) -> None:
+        if self._inflight.get(reminder_id) is task:
+            del self._inflight[reminder_id]
+
+    async def _dispatch(self, reminder_id: str, payload: Any) -> None:
+        try:
+            await self._deliver(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falló la ejecución del recordatorio %s", reminder_id)
+
+    def close(self) -> None:
+        """Detiene el despachador y las entregas en curso; las entradas agendadas se descartan."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+        self._heap.clear()
+        self._entries.clear()
@@ -3,7 +3,12 @@ from __future__ import annotations
 from datetime import date, datetime, time, timedelta, timezone
 from zoneinfo import ZoneInfo
 import asyncio
-from typing import Any
+import itertools
+import logging
+from contextlib import suppress
+from typing import Any, Iterable, NamedTuple
+
+logger = logging.getLogger(__name__)
 
 REMINDER_DATE_ERROR = "Fecha inválida. Usa: hoy, mañana, o dd/mm"
 REMINDER_TIME_ERROR = "Hora inválida. Formato: hh:mm (ej: 21:00)"
@@ -80,6 +85,23 @@ def parse_when(fecha: str, hora: str, tz: str) -> datetime:
     return local_fire_at.astimezone(timezone.utc)
 
 
+# Recordatorios por página en los listados por usuario.
+REMINDERS_PAGE_SIZE = 5
+# Segundos que se juntan recordatorios entregados antes de marcarlos en un solo UPDATE.
+REMINDER_DONE_DELAY = 1.0
+# Máximo de ids por UPDATE: van en la URL del filtro ``in``.
+REMINDER_DONE_BATCH = 100
+# Tope de espera entre reintentos de un lote que falló.
+REMINDER_DONE_MAX_BACKOFF = 60.0
+
+
+class ReminderPage(NamedTuple):
+    """Una página de recordatorios y el cursor (fire_at, id) para pedir la siguiente."""
+
+    items: list[dict]
+    next_cursor: tuple[str, str] | None
+
+
 async def _create_async_supabase_client(supabase_url: str, supabase_key: str):
     from supabase import acreate_client
 
@@ -141,6 +163,76 @@ class RemindersStore:
         )
         return list(response.data or [])
 
+    async def get_due_before(
+        self, until: datetime, *, after: datetime | None = None
+    ) -> list[dict]:
+        """Pendientes con ``after < fire_at <= until``, ordenados por ``fire_at``.
+
+        Sin ``after`` incluye también los vencidos que nunca se entregaron
+        (p. ej. porque el bot estaba caído a esa hora).
+        """
+        client = await self._get_client()
+        query = (
+            client.table("reminders")
+            .select("*")
+            .eq("done", False)
+            .lte("fire_at", until.astimezone(timezone.utc).isoformat())
+        )
+        if after is not None:
+            query = query.gt("fire_at", after.astimezone(timezone.utc).isoformat())
+        response = await query.order("fire_at").execute()
+        return list(response.data or [])
+
+    async def expire_overdue(self, before: datetime) -> int:
+        """Marca ``done`` sin entregar los pendientes con ``fire_at < before``; devuelve cuántos."""
+        client = await self._get_client()
+        response = await (
+            client.table("reminders")
+            .update({"done": True})
+            .eq("done", False)
+            .lt("fire_at", before.astimezone(timezone.utc).isoformat())
+            .execute()
+        )
+        return len(response.data or [])
+
+    async def list_for_user(
+        self,
+        created_by: str,
+        *,
+        target_id: str | None = None,
+        cursor: tuple[str, str] | None = None,
+        limit: int = REMINDERS_PAGE_SIZE,
+    ) -> ReminderPage:
+        """Pendientes creados por ``created_by`` (y que mencionan a ``target_id``), por páginas.
+
+        Pagina por keyset sobre ``(fire_at, id)``: cada página arranca justo
+        después del último de la anterior, así que el costo depende solo de
+        la página y lo cubre el índice ``reminders_pending_by_creator``. Se
+        pide una fila de más para saber si hay otra página.
+        """
+        client = await self._get_client()
+        query = (
+            client.table("reminders")
+            .select("*")
+            .eq("created_by", str(created_by))
+            .eq("done", False)
+        )
+        if target_id is not None:
+            query = query.contains("target_ids", [str(target_id)])
+        if cursor is None:
+            query = query.gt("fire_at", datetime.now(timezone.utc).isoformat())
+        else:
+            fire_at, last_id = cursor
+            query = query.or_(
+                f'fire_at.gt."{fire_at}",and(fire_at.eq."{fire_at}",id.gt.{last_id})'
+            )
+        response = await query.order("fire_at").order("id").limit(limit + 1).execute()
+        rows = list(response.data or [])
+        if len(rows) <= limit:
+            return ReminderPage(rows, None)
+        last = rows[limit - 1]
+        return ReminderPage(rows[:limit], (str(last["fire_at"]), str(last["id"])))
+
     async def mark_done(self, reminder_id: str) -> None:
         client = await self._get_client()
         await (
@@ -149,3 +241,104 @@ class RemindersStore:
             .eq("id", reminder_id)
             .execute()
         )
+
+    async def mark_done_many(self, reminder_ids: Iterable[str]) -> None:
+        ids = [str(reminder_id) for reminder_id in reminder_ids]
+        if not ids:
+            return
+        client = await self._get_client()
+        await (
+            client.table("reminders")
+            .update({"done": True})
+            .in_("id", ids)
+            .execute()
+        )
+
+
+class ReminderDoneWriter:
+    """Junta los recordatorios entregados y los marca ``done`` por lotes.
+
+    ``mark_done`` solo anota el id; el primero arranca un task que espera
+    ``delay`` segundos y escribe todo lo anotado hasta entonces con un UPDATE
+    por cada ``batch_size`` ids. Así, ponerse al día después de una caída
+    cuesta unas pocas consultas en vez de una por recordatorio. Un lote que
+    falla vuelve a quedar pendiente y se reintenta con espera creciente
+    (hasta ``max_backoff``). Mientras un id está pendiente o escribiéndose,
+    ``id in writer`` es verdadero; una vez escrito queda en ``take_written``
+    hasta que alguien lo retire.
+    """
+
+    def __init__(
+        self,
+        store: RemindersStore,
+        *,
+        delay: float = REMINDER_DONE_DELAY,
+        batch_size: int = REMINDER_DONE_BATCH,
+        max_backoff: float = REMINDER_DONE_MAX_BACKOFF,
+    ) -> None:
+        self.store = store
+        self.delay = delay
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        # dict como conjunto ordenado: se escriben en el orden en que se entregaron.
+        self._pending: dict[str, None] = {}
+        self._writing: set[str] = set()
+        self._written: set[str] = set()
+        self._task: asyncio.Task | None = None
+        self.failures = 0
+        self.writes = 0
+
+    def __contains__(self, reminder_id: str) -> bool:
+        return reminder_id in self._pending or reminder_id in self._writing
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending) + len(self._writing)
+
+    def take_written(self) -> set[str]:
+        """Ids marcados en el store desde la llamada anterior."""
+        written, self._written = self._written, set()
+        return written
+
+    def mark_done(self, reminder_id: str) -> None:
+        self._pending[str(reminder_id)] = None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="reminders:done-writer")
+
+    async def _run(self) -> None:
+        delay = self.delay
+        while self._pending:
+            await asyncio.sleep(delay)
+            if await self.flush():
+                delay = self.delay
+            else:
+                delay = min(max(self.delay, 1.0) * 2 ** (self.failures - 1), self.max_backoff)
+
+    async def flush(self) -> bool:
+        """Escribe ya todo lo pendiente; devuelve False si un lote falló y quedó para reintentar."""
+        while self._pending:
+            batch = list(itertools.islice(self._pending, self.batch_size))
+            for reminder_id in batch:
+                del self._pending[reminder_id]
+            self._writing.update(batch)
+            try:
+                await self.store.mark_done_many(batch)
+            except Exception:
+                logger.exception("No se pudieron marcar %d recordatorio(s) como entregados", len(batch))
+                self._pending = dict.fromkeys(batch) | self._pending
+                self.failures += 1
+                return False
+            finally:
+                self._writing.difference_update(batch)
+            self._written.update(batch)
+            self.failures = 0
+            self.writes += 1
+        return True
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        self._task = None
+        await self.flush()
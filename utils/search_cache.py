@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza una query para usarla como clave de caché.
+
+    Las URLs solo se recortan (los IDs de YouTube distinguen mayúsculas);
+    las búsquedas de texto además se pasan a minúsculas y se colapsan espacios.
+    """
+    stripped = query.strip()
+    if stripped.startswith("http"):
+        return stripped
+    return " ".join(stripped.casefold().split())
+
+
+def copy_result(value: Any) -> Any:
+    """Copia superficial de un resultado de búsqueda.
+
+    Cada caller recibe su propia lista para poder mezclarla o recortarla sin
+    tocar lo que quedó guardado en caché.
+    """
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return list(value)
+    clone = copy.copy(value)
+    tracks = getattr(value, "tracks", None)
+    if isinstance(tracks, list):
+        clone.tracks = list(tracks)
+    return clone
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por entrada."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> tuple[float, Any] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._lookup(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_MISSING = object()
+
+
+class SearchCache:
+    """Caché de resultados de búsqueda de Lavalink.
+
+    La clave es ``(query normalizada, fuente)``. Los resultados vacíos se
+    guardan aparte con un TTL más corto para no fijar un "sin resultados"
+    transitorio durante mucho tiempo.
+    """
+
+    MISS = _MISSING
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600.0, negative_ttl: float = 60.0) -> None:
+        self._positive = TTLCache(maxsize, ttl)
+        self._negative = TTLCache(maxsize, negative_ttl)
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query: str, source: str) -> tuple[str, str]:
+        return normalize_query(query), source
+
+    def get(self, query: str, source: str) -> Any:
+        """Devuelve una copia del resultado, ``None`` si es un miss negativo
+        cacheado, o el centinela ``SearchCache.MISS`` si no hay entrada."""
+        key = self.key(query, source)
+        value = self._positive.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return copy_result(value)
+        if key in self._negative:
+            self.negative_hits += 1
+            return None
+        self.misses += 1
+        return _MISSING
+
+    def put(self, query: str, source: str, value: Any) -> None:
+        key = self.key(query, source)
+        if value:
+            self._negative.pop(key)
+            self._positive.set(key, copy_result(value))
+        else:
+            self._positive.pop(key)
+            self._negative.set(key, True)
+
+    def invalidate(self, query: str, source: str) -> None:
+        key = self.key(query, source)
+        self._positive.pop(key)
+        self._negative.pop(key)
+
+    def clear(self) -> None:
+        self._positive.clear()
+        self._negative.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._positive),
+            "negative_size": len(self._negative),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self._positive.evictions + self._negative.evictions,
+        }
+
+
+class SingleFlight:
+    """Agrupa lookups idénticos concurrentes en una sola petición.
+
+    El primer caller lanza la petición como ``Task``; los que llegan mientras
+    sigue en vuelo esperan el mismo resultado. Cancelar a un caller no cancela
+    la petición compartida. Cada caller recibe su propia copia del resultado.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.shared += 1
+        return copy_result(await asyncio.shield(task))
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # evita "exception was never retrieved" si nadie esperaba
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import wavelink
+
+
+class TrackRow(NamedTuple):
+    """Forma compacta de un track: lo justo para reproducirlo y mostrarlo.
+
+    Lavalink reproduce a partir de ``encoded``; el resto solo alimenta los
+    embeds, así que no hace falta guardar el payload completo. ``artwork``
+    tiene valor por defecto para seguir leyendo filas guardadas sin él.
+    """
+
+    encoded: str
+    identifier: str
+    title: str
+    author: str
+    length: int
+    uri: str | None
+    source: str
+    artwork: str | None = None
+
+
+def pack_track(track: wavelink.Playable) -> TrackRow:
+    return TrackRow(
+        encoded=track.encoded,
+        identifier=track.identifier,
+        title=track.title,
+        author=track.author,
+        length=int(track.length or 0),
+        uri=track.uri,
+        source=track.source,
+        artwork=track.artwork,
+    )
+
+
+def unpack_track(row: TrackRow | tuple | list) -> wavelink.Playable:
+    return build_playable(*row)
+
+
+def build_playable(
+    encoded: str,
+    identifier: str,
+    title: str,
+    author: str,
+    length: int,
+    uri: str | None,
+    source: str,
+    artwork: str | None = None,
+) -> wavelink.Playable:
+    """Arma un ``Playable`` con lo mínimo que usan el bot y Lavalink."""
+    return wavelink.Playable(
+        {
+            "encoded": encoded,
+            "info": {
+                "identifier": identifier,
+                "isSeekable": True,
+                "author": author,
+                "length": length,
+                "isStream": False,
+                "position": 0,
+                "title": title,
+                "uri": uri,
+                "artworkUrl": artwork,
+                "isrc": None,
+                "sourceName": source,
+            },
+            "pluginInfo": {},
+            "userData": {},
+        }
+    )
@@ -5,6 +5,8 @@ import math
 import re
 import discord
 
+from utils.compact_queue import QueueListing
+
 COLOR_PRIMARY = 0x6C3483
 COLOR_SUCCESS = 0x2980B9
 COLOR_ERROR = 0x922B21
@@ -153,6 +155,14 @@ def build_search_results_embed(results: list) -> discord.Embed:
 
 
 class QueuePaginationView(discord.ui.View):
+    """Paginador de la cola que renderiza solo la página pedida.
+
+    ``queue`` es una secuencia viva (``QueueListing``) o una lista; cada botón
+    vuelve a leer su largo y el tramo de la página, así que la vista refleja
+    los cambios de la cola sin guardar una copia. ``now_playing`` puede ser
+    un texto fijo o una función que lo devuelve en cada render.
+    """
+
     def __init__(self, queue, now_playing, page_size=10):
         super().__init__(timeout=120)
         self.queue = queue
@@ -162,11 +172,26 @@ class QueuePaginationView(discord.ui.View):
         self.message = None
         self._update_buttons()
 
+    @property
+    def total_pages(self) -> int:
+        return max(1, math.ceil(len(self.queue) / self.page_size))
+
     def _update_buttons(self):
-        total_pages = max(1, math.ceil(len(self.queue) / self.page_size))
-        self.current_page = min(self.current_page, total_pages)
-        self.prev_button.disabled = self.current_page == 1
-        self.next_button.disabled = self.current_page >= total_pages
+        total_pages = self.total_pages
+        self.current_page = max(1, min(self.current_page, total_pages))
+        self.first_button.disabled = self.prev_button.disabled = self.current_page == 1
+        self.next_button.disabled = self.last_button.disabled = self.current_page >= total_pages
+        self.jump_button.disabled = total_pages == 1
+
+    def render(self) -> discord.Embed:
+        now_playing = self.now_playing() if callable(self.now_playing) else self.now_playing
+        return build_queue_embed(self.queue, now_playing, page=self.current_page, page_size=self.page_size)
+
+    async def show_page(self, interaction: discord.Interaction, page: int):
+        self.current_page = page
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+        self.message = interaction.message
 
     async def on_timeout(self):
         for child in self.children:
@@ -177,24 +202,49 @@ class QueuePaginationView(discord.ui.View):
             except Exception:
                 pass
 
+    @discord.ui.button(emoji="⏮️", style=discord.ButtonStyle.secondary, custom_id="queue_first")
+    async def first_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, 1)
+
     @discord.ui.button(emoji="⬅️", style=discord.ButtonStyle.secondary, custom_id="queue_prev")
     async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        total_pages = max(1, math.ceil(len(self.queue) / self.page_size))
-        self.current_page = min(self.current_page, total_pages)
-        self.current_page = max(1, self.current_page - 1)
-        self._update_buttons()
-        embed = build_queue_embed(self.queue, self.now_playing, page=self.current_page, page_size=self.page_size)
-        await interaction.response.edit_message(embed=embed, view=self)
-        self.message = interaction.message
+        await self.show_page(interaction, min(self.current_page, self.total_pages) - 1)
+
+    @discord.ui.button(emoji="🔢", style=discord.ButtonStyle.secondary, custom_id="queue_jump")
+    async def jump_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(QueueJumpModal(self))
 
     @discord.ui.button(emoji="➡️", style=discord.ButtonStyle.secondary, custom_id="queue_next")
     async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        total_pages = max(1, math.ceil(len(self.queue) / self.page_size))
-        self.current_page = min(total_pages, self.current_page + 1)
-        self._update_buttons()
-        embed = build_queue_embed(self.queue, self.now_playing, page=self.current_page, page_size=self.page_size)
-        await interaction.response.edit_message(embed=embed, view=self)
-        self.message = interaction.message
+        await self.show_page(interaction, self.current_page + 1)
+
+    @discord.ui.button(emoji="⏭️", style=discord.ButtonStyle.secondary, custom_id="queue_last")
+    async def last_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.total_pages)
+
+
+class QueueJumpModal(discord.ui.Modal):
+    def __init__(self, view: QueuePaginationView) -> None:
+        super().__init__(title="Ir a la página")
+        self.view = view
+        self.page_input = discord.ui.TextInput(
+            label=f"Página (1-{view.total_pages})",
+            placeholder=str(view.current_page),
+            required=True,
+            max_length=6,
+        )
+        self.add_item(self.page_input)
+
+    async def on_submit(self, interaction: discord.Interaction) -> None:
+        try:
+            page = int(self.page_input.value.strip())
+        except ValueError:
+            await interaction.response.send_message(
+                embed=build_error_embed("Escribí un número de página."),
+                ephemeral=True,
+            )
+            return
+        await self.view.show_page(interaction, page)
 
 
 class MusicControlView(discord.ui.View):
@@ -317,20 +367,16 @@ class MusicControlView(discord.ui.View):
         button: discord.ui.Button,
     ):
         voice_client = interaction.guild.voice_client if interaction.guild else None
-        queue_tracks = list(voice_client.queue) if voice_client else []
-        # Convert wavelink.Playable objects to dicts compatible with build_queue_embed
-        queue_list = [{"title": t.title if hasattr(t, "title") else str(t)} for t in queue_tracks]
-        now_playing = voice_client.current.title if (voice_client and voice_client.current) else "Nada"
+        # Vista viva de la cola: cada página lee solo sus títulos
+        queue_list = QueueListing(voice_client.queue) if voice_client else []
 
         if queue_list:
-            embed = build_queue_embed(
+            view = QueuePaginationView(
                 queue_list,
-                now_playing=now_playing,
-                page=1,
+                lambda: voice_client.current.title if voice_client.current else "Nada",
             )
-            total_pages = max(1, math.ceil(len(queue_list) / 10))
-            if total_pages > 1:
-                view = QueuePaginationView(queue_list, now_playing)
+            embed = view.render()
+            if view.total_pages > 1:
                 await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
                 with contextlib.suppress(discord.HTTPException):
                     view.message = await interaction.original_response()